@@ -1,12 +1,28 @@
+import io
 import os
 import json
+import time
+import contextlib
+import asyncio
+import functools
+import aiohttp
 import requests
-from typing import Dict, Union, Any, List
+import urllib3
+from requests_toolbelt import MultipartEncoder
+from typing import Dict, Union, Any, List, Callable, Hashable, Awaitable, Iterator
 from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+from apis.transport import make_session
+from apis.rate_limit import TokenBucket, RETRY_STATUS_CODES, IDEMPOTENT_METHODS, retry_delay
 
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 
+# Etsy's QPS limits are per application, so every client in the process paces itself against the same bucket. Starts at
+# Etsy's default of 10 requests per second and adapts to the rate limit headers on each response
+ETSY_RATE_LIMITER = TokenBucket(rate=10)
+
 
 class ListingNotFoundError(Exception):
     pass
@@ -16,6 +32,151 @@ class ProductNotFoundError(Exception):
     pass
 
 
+class RequestError(LookupError):
+    """
+    LookupError that keeps the status code of the response, so callers can tell a request Etsy rejected from one that
+    failed on the way
+    """
+
+    def __init__(self, status_code: int, data: Any):
+        super().__init__(data)
+        self.status_code = status_code
+
+
+class ReferenceCache:
+    """
+    Request scoped cache for shop level reference data (shops, return policies, shipping profiles, production partners,
+    etc.). This data is the same for nearly every transaction in a sync, so each distinct lookup only needs to go to the
+    Etsy API once per ttl seconds. Hits and misses are counted so the savings can be reported at the end of a run.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._pending = {}
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = fetch()
+        self._entries[key] = (now, value)
+        return value
+
+    async def get_or_fetch_async(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Same as get_or_fetch for coroutines. Concurrent lookups of a key that is already being fetched wait on the
+        in-flight request instead of sending a duplicate one.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        task = asyncio.ensure_future(fetch())
+        self._pending[key] = task
+        try:
+            value = await task
+        finally:
+            self._pending.pop(key, None)
+
+        self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+def _reference_key(method_name: str, args, kwargs) -> tuple:
+    return (method_name,) + tuple(str(arg) for arg in args) + tuple(
+        (name, str(kwargs[name])) for name in sorted(kwargs))
+
+
+def reference_data(method):
+    """
+    Routes an API method through the client's reference cache, keyed by the method name and the IDs it was called with.
+    IDs are keyed as strings so that 40548296 and '40548296' resolve to the same entry.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = _reference_key(method.__name__, args, kwargs)
+        return self.reference_cache.get_or_fetch(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+def async_reference_data(method):
+    """
+    reference_data for AsyncAPI coroutines
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = _reference_key(method.__name__, args, kwargs)
+        return await self.reference_cache.get_or_fetch_async(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+def _rewind_files(files: Dict[str, Any]):
+    """
+    Seeks any file objects in a requests files dict back to the start so a retried upload sends the whole file again
+    """
+    if not files:
+        return
+    for value in files.values():
+        file_object = value[1] if isinstance(value, tuple) else value
+        if hasattr(file_object, 'seek'):
+            file_object.seek(0)
+
+
+def _failed_before_sending(error: requests.RequestException) -> bool:
+    """
+    True if the request never reached the server, i.e. the connection could not be opened, so it is safe to send again
+    whatever it does
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+
+
+def _multipart_fields(fields: Dict[str, Any], stack: contextlib.ExitStack) -> Dict[str, Any]:
+    """
+    Turns upload fields into MultipartEncoder fields so the body is streamed in chunks instead of built in memory.
+    File fields are (file name, content[, content type]) tuples or open files; content can be a path, which is opened
+    on stack, bytes, which are wrapped in a BytesIO, or an open binary file. Other values are sent as text
+    """
+    multipart = {}
+    for key, value in fields.items():
+        if isinstance(value, tuple):
+            file_name, content, *content_type = value
+            if isinstance(content, str):
+                content = stack.enter_context(open(content, 'rb'))
+            elif isinstance(content, (bytes, bytearray)):
+                content = io.BytesIO(content)
+            multipart[key] = (file_name, content, *content_type)
+        elif hasattr(value, 'read'):
+            multipart[key] = (os.path.basename(getattr(value, 'name', key)), value)
+        elif isinstance(value, bool):
+            multipart[key] = 'true' if value else 'false'
+        else:
+            multipart[key] = str(value)
+    return multipart
+
+
 class Secrets:
 
     def __init__(self):
@@ -52,13 +213,22 @@ class Secrets:
     def refresh_token(self):
         return self._refresh_token
 
+    @property
+    def access_token(self):
+        return self._access_token
+
 
 class API(Secrets):
     BASE_ETSY_URL = 'https://api.etsy.com/v3'
     BASE_SERVER_URL = 'http://localhost:3003/'
 
-    def __init__(self):
+    def __init__(self, reference_cache_ttl: float = 300, session: requests.Session = None,
+                 rate_limiter: TokenBucket = None, max_retries: int = 5):
         super(API, self).__init__()
+        self._session = session if session is not None else make_session()
+        self.reference_cache = ReferenceCache(ttl=reference_cache_ttl)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else ETSY_RATE_LIMITER
+        self.max_retries = max_retries
         self._get_new_access_token()
         self._signed_header = {
             "Content-Type": "application/x-www-form-urlencoded",
@@ -66,6 +236,51 @@ class API(Secrets):
             "Authorization": f"Bearer {self._access_token}"
         }
 
+    def _request(self, method: str, url: str, multipart: Dict[str, Any] = None, idempotent: bool = None,
+                 **kwargs) -> requests.Response:
+        """
+        Sends a request once the rate limiter allows it. 429s, 5xxs and dropped connections are retried up to
+        max_retries times with jittered exponential backoff; a 429 also holds back every other request sharing the rate
+        limiter for the retry-after period. The last response is returned whatever its status.
+
+        Only idempotent requests are retried on 5xxs and timeouts, Etsy may already have applied a request that failed
+        that way. Others are only retried on 429s and when the connection could not be opened. idempotent defaults to
+        whether the method is in IDEMPOTENT_METHODS; pass True for a POST / PATCH that is safe to repeat.
+
+        multipart fields (see _multipart_fields) are sent as a streamed multipart/form-data body. The encoder is a one
+        shot stream, so it is rebuilt from the rewound files for every attempt.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            _rewind_files(kwargs.get('files'))
+            if multipart is not None:
+                _rewind_files(multipart)
+                encoder = MultipartEncoder(multipart)
+                kwargs['data'] = encoder
+                kwargs['headers'] = {**kwargs.get('headers', {}), 'Content-Type': encoder.content_type}
+            try:
+                response = self._session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or _failed_before_sending(e)):
+                    raise
+                time.sleep(retry_delay(attempt))
+                continue
+
+            self.rate_limiter.update_from_headers(response.headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            if response.status_code != 429 and not idempotent:
+                return response
+
+            delay = retry_delay(attempt, response.headers)
+            if response.status_code == 429:
+                self.rate_limiter.penalize(delay)
+            else:
+                time.sleep(delay)
+
     def _ping(self):
         """
         This just requests data from the api ping endpoint so connection can be tested. If the ping is not successful
@@ -77,7 +292,7 @@ class API(Secrets):
             'x-api-key': self._keystring,
         }
 
-        response = requests.get(url, headers=headers)
+        response = self._request('GET', url, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -103,7 +318,7 @@ class API(Secrets):
             'refresh_token': self._refresh_token
         }
 
-        response = requests.post(url, headers=headers, json=body)
+        response = self._request('POST', url, headers=headers, json=body)
         if response.status_code == 200:
             data = response.json()
             new_access_token = data['access_token']
@@ -130,7 +345,7 @@ class API(Secrets):
         header = self._signed_header
         header['Content-Type'] = 'application/json'
 
-        response = requests.post(url, headers=header, data=json.dumps(listing_info))
+        response = self._request('POST', url, headers=header, data=json.dumps(listing_info))
 
         if response.status_code == 201:
             return response.json()
@@ -143,40 +358,63 @@ class API(Secrets):
         header = self._signed_header
         header['Content-Type'] = 'application/json'
 
-        response = requests.put(url, headers=header, data=json.dumps(inventory_data))
+        response = self._request('PUT', url, headers=header, data=json.dumps(inventory_data))
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
-    def upload_listing_image(self, shop_id: str, listing_id: str, image_data: Dict[str, str]):
+    def upload_listing_image(self, shop_id: str, listing_id: str, image_data: Dict[str, Any]):
+        """
+        Args:
+            shop_id (str):
+            listing_id (str):
+            image_data (Dict[str, Any]): Form fields, i.e. {'image': (file name, path / bytes / file), 'rank': 1}. The
+                image is streamed from disk or memory, files opened here are closed once the upload is done.
+                {'listing_image_id': id, 'rank': 2, 'overwrite': True} moves an image already on the listing
+        """
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id,
                            'images')
 
         header = self._signed_header
         header = {key: header[key] for key in header.keys() if key != 'Content-Type'}
 
-        response = requests.post(url, headers=header, files=image_data)
+        with contextlib.ExitStack() as stack:
+            # With overwrite the image replaces whatever is at its rank, so sending it twice is harmless
+            response = self._request('POST', url, headers=header, multipart=_multipart_fields(image_data, stack),
+                                     idempotent=bool(image_data.get('overwrite')))
 
         if response.status_code == 201:
             return response.json()
         else:
-            raise LookupError(response.json())
+            raise RequestError(response.status_code, response.json())
 
-    def upload_listing_file(self, shop_id: str, listing_id: str, file_data: Dict[str, str], name: str):
+    def upload_listing_file(self, shop_id: str, listing_id: str, file_data: Dict[str, Any], name: str):
+        """
+        Args:
+            shop_id (str):
+            listing_id (str):
+            file_data (Dict[str, Any]): Form fields, i.e. {'file': (file name, path / bytes / file), 'rank': 1}. The
+                file is streamed from disk or memory, files opened here are closed once the upload is done.
+                {'listing_file_id': id, 'rank': 2} moves a file already on the listing
+            name (str): Name the buyer sees for the file
+        """
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id,
                            'files')
 
         header = self._signed_header
         header = {key: header[key] for key in header.keys() if key != 'Content-Type'}
 
-        response = requests.post(url, headers=header, files=file_data, data={'name': name})
+        with contextlib.ExitStack() as stack:
+            fields = _multipart_fields(file_data, stack)
+            fields['name'] = name
+            response = self._request('POST', url, headers=header, multipart=fields)
 
         if response.status_code == 201:
             return response.json()
         else:
-            raise LookupError(response.json())
+            raise RequestError(response.status_code, response.json())
 
     def update_listing(self, shop_id: str, listing_id: str, listing_data: Dict[str, Any]):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id)
@@ -185,7 +423,8 @@ class API(Secrets):
 
         header = self._signed_header
 
-        response = requests.patch(url, headers=header)
+        # Sets the given fields to absolute values, so sending it twice is harmless
+        response = self._request('PATCH', url, headers=header, idempotent=True)
 
         if response.status_code == 200:
             return response.json()
@@ -198,12 +437,12 @@ class API(Secrets):
 
         header = self._signed_header
 
-        response = requests.delete(url, headers=header)
+        response = self._request('DELETE', url, headers=header)
 
         if response.status_code == 204:
             return 'success'
         else:
-            raise LookupError(response.json())
+            raise RequestError(response.status_code, response.json())
 
     def get_listing_images(self, shop_id: str, listing_id: str):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id,
@@ -211,13 +450,57 @@ class API(Secrets):
 
         header = self._signed_header
 
-        response = requests.get(url, headers=header)
+        response = self._request('GET', url, headers=header)
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise LookupError(response.json())
+
+    def get_listing_files(self, shop_id: str, listing_id: str):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id,
+                           'files')
+
+        header = self._signed_header
+
+        response = self._request('GET', url, headers=header)
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise LookupError(response.json())
+
+    def iter_listing_images(self, shop_id: str, listing_id: str, prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the images of a listing. Etsy returns every image of a listing in a single response, so this is one
+        page, but it lets callers treat images the same way as the other paginated endpoints.
+        """
+        return self._paginate(lambda limit, offset: self.get_listing_images(shop_id, listing_id), prefetch=prefetch)
+
+    def get_shop_listings(self, shop_id: str, state: str = None, limit: int = None, offset: int = None):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings')
+
+        params = {}
+        if state is not None:
+            params['state'] = state
+        if limit is not None:
+            params['limit'] = str(limit)
+        if offset is not None:
+            params['offset'] = str(offset)
+
+        response = self._request('GET', url, headers=self._signed_header, params=params)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    def iter_shop_listings(self, shop_id: str, state: str = None, page_size: int = 100,
+                           prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        return self._paginate(
+            lambda limit, offset: self.get_shop_listings(shop_id, state=state, limit=limit, offset=offset),
+            page_size=page_size, prefetch=prefetch)
+
     def update_variation_images(self, shop_id, listing_id, variation_images: List[Dict[str, Any]]):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id,
                            'variation-images')
@@ -229,7 +512,8 @@ class API(Secrets):
             'variation_images': variation_images
         }
 
-        response = requests.post(url, headers=header, data=json.dumps(data))
+        # Replaces the listing's whole set of variation images, so sending it twice is harmless
+        response = self._request('POST', url, headers=header, data=json.dumps(data), idempotent=True)
 
         if response.status_code == 200:
             return response.json()
@@ -239,31 +523,140 @@ class API(Secrets):
     def get_shop_return_policies(self, shop_id):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'policies', 'return')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
-    def get_receipts(self, min_created: Union[int, str] = None):
+    def _paginate(self, fetch_page: Callable[[int, int], Dict[str, Any]], page_size: int = 100,
+                  prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the results of a paginated endpoint one at a time, requesting page_size results per call and moving the
+        offset along until count results have been seen. Only one page is held in memory at a time. With prefetch the
+        next page is requested in a background thread while the caller works through the current one.
+
+        Args:
+            fetch_page (Callable[[int, int], Dict[str, Any]]): Called with (limit, offset), returns the page response
+            page_size (int): Results requested per page. Etsy allows at most 100
+            prefetch (bool): Request the next page in the background
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = 0
+            page = fetch_page(page_size, offset)
+            while True:
+                results = page['results']
+                offset += len(results)
+                if 'count' in page:
+                    has_more = bool(results) and offset < page['count']
+                else:
+                    has_more = len(results) == page_size
+
+                next_page = executor.submit(fetch_page, page_size, offset) if has_more and prefetch else None
+
+                yield from results
+
+                if not has_more:
+                    return
+                page = next_page.result() if next_page is not None else fetch_page(page_size, offset)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_receipts(self, min_created: Union[int, str] = None, limit: int = None, offset: int = None,
+                     sort_on: str = None, sort_order: str = None, min_last_modified: Union[int, str] = None):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts')
 
         params = {}
         if min_created is not None:
             params['min_created'] = str(min_created)
-
-        response = requests.get(url, headers=self._signed_header, params=params)
+        if min_last_modified is not None:
+            params['min_last_modified'] = str(min_last_modified)
+        if limit is not None:
+            params['limit'] = str(limit)
+        if offset is not None:
+            params['offset'] = str(offset)
+        if sort_on is not None:
+            params['sort_on'] = sort_on
+        if sort_order is not None:
+            params['sort_order'] = sort_order
+
+        response = self._request('GET', url, headers=self._signed_header, params=params)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    def iter_receipts(self, min_created: Union[int, str] = None, page_size: int = 100,
+                      prefetch: bool = False, min_last_modified: Union[int, str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streams every receipt created since min_created, oldest first. Sorting ascending means receipts created while
+        paging land after the current offset instead of shifting pages that are still to come.
+
+        If min_last_modified is given, only receipts modified since then are returned, least recently modified first.
+        Those are paged by their updated_timestamp instead of by offset, see _iter_receipts_modified_since
+        """
+        if min_last_modified is not None:
+            return self._iter_receipts_modified_since(int(min_last_modified), min_created=min_created,
+                                                      page_size=page_size, prefetch=prefetch)
+        return self._paginate(
+            lambda limit, offset: self.get_receipts(min_created=min_created, limit=limit, offset=offset,
+                                                    sort_on='created', sort_order='asc'),
+            page_size=page_size, prefetch=prefetch)
+
+    def _iter_receipts_modified_since(self, min_last_modified: int, min_created: Union[int, str] = None,
+                                      page_size: int = 100, prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Keyset pagination over receipts sorted by updated_timestamp. A receipt modified while paging moves to the end
+        of the list, which with offset paging shifts every later receipt back and drops the one at the next page
+        boundary. Instead each page is requested from the last updated_timestamp seen, at offset 0, and receipts
+        already yielded are skipped. Receipts are keyed by (receipt_id, updated_timestamp), so one that is modified
+        again during the run is yielded again with its new state.
+
+        The offset is only used when a full page shares a single updated_timestamp, to step through that second.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        def fetch_page(cursor: int, offset: int) -> Dict[str, Any]:
+            return self.get_receipts(min_created=min_created, limit=page_size, offset=offset, sort_on='updated',
+                                     sort_order='asc', min_last_modified=cursor)
+
+        try:
+            seen = set()
+            cursor, offset = min_last_modified, 0
+            page = fetch_page(cursor, offset)
+            while True:
+                results = page['results']
+                has_more = len(results) == page_size
+                if has_more:
+                    last_modified = results[-1]['updated_timestamp']
+                    if last_modified == cursor:
+                        offset += len(results)
+                    else:
+                        cursor, offset = last_modified, 0
+
+                next_page = executor.submit(fetch_page, cursor, offset) if has_more and prefetch else None
+
+                for receipt in results:
+                    key = (receipt['receipt_id'], receipt.get('updated_timestamp'))
+                    if key not in seen:
+                        seen.add(key)
+                        yield receipt
+
+                if not has_more:
+                    return
+                page = next_page.result() if next_page is not None else fetch_page(cursor, offset)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def get_receipt(self, receipt_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts', str(receipt_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
@@ -274,7 +667,7 @@ class API(Secrets):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts', str(receipt_id),
                            'listings')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
@@ -284,7 +677,7 @@ class API(Secrets):
     def get_listing(self, listing_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'listings', str(listing_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         data = response.json()
         if response.status_code == 200:
@@ -300,49 +693,53 @@ class API(Secrets):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'listings', str(listing_id), 'inventory', 'products',
                            str(product_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_shop(self, shop_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_shop_section(self, shop_id: int, shop_section_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'sections', str(shop_section_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_return_policy(self, shop_id: int, return_policy_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'policies', 'return',
                            str(return_policy_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_shipping_profile(self, shop_id: int, shipping_profile_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles',
                            str(shipping_profile_id))
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
@@ -352,39 +749,42 @@ class API(Secrets):
     def get_shipping_profiles(self, shop_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_production_partners(self, shop_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'production-partners')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_shop_shipping_profile_upgrades(self, shop_id: int, shipping_profile_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles',
                            str(shipping_profile_id), 'upgrades')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    @reference_data
     def get_shop_shipping_profile_destinations(self, shop_id: int, shipping_profile_id: int):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles',
                            str(shipping_profile_id), 'destinations')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
@@ -398,7 +798,7 @@ class API(Secrets):
         """
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts', receipt_id)
 
-        response = requests.put(url, headers=self._signed_header, json=body)
+        response = self._request('PUT', url, headers=self._signed_header, json=body)
 
         if response.status_code == 200:
             return response.json()
@@ -420,7 +820,7 @@ class API(Secrets):
         header = self._signed_header
         header['Content-Type'] = 'application/json'
 
-        response = requests.post(url, headers=header, json=body)
+        response = self._request('POST', url, headers=header, json=body)
 
         if response.status_code == 200:
             return response.json()
@@ -432,7 +832,7 @@ class API(Secrets):
 
         data = {'title': title}
 
-        response = requests.post(url, headers=self._signed_header, data=data)
+        response = self._request('POST', url, headers=self._signed_header, data=data)
 
         if response.status_code == 200:
             return response.json()
@@ -442,9 +842,263 @@ class API(Secrets):
     def get_shop_sections(self, shop_id: str):
         url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'sections')
 
-        response = requests.get(url, headers=self._signed_header)
+        response = self._request('GET', url, headers=self._signed_header)
 
         if response.status_code == 200:
             return response.json()
         else:
-            raise LookupError(response.json())
\ No newline at end of file
+            raise LookupError(response.json())
+
+
+class AsyncAPI(Secrets):
+    """
+    asyncio counterpart of API for the read endpoints used when syncing orders. Requests are sent through one aiohttp
+    session and at most max_concurrency of them are in flight at a time, so independent lookups can be fanned out with
+    asyncio.gather without flooding Etsy.
+
+    The access token is read from etsy_secrets.json, which API keeps current every time it refreshes the token, so create
+    an API first (or pass access_token) when the stored token may have expired. Must be used as an async context manager:
+
+        async with AsyncAPI() as etsy_api:
+            listing, product = await asyncio.gather(etsy_api.get_listing(1), etsy_api.get_listing_product(1, 2))
+    """
+    BASE_ETSY_URL = API.BASE_ETSY_URL
+
+    def __init__(self, access_token: str = None, max_concurrency: int = 8, reference_cache: ReferenceCache = None,
+                 reference_cache_ttl: float = 300, rate_limiter: TokenBucket = None, max_retries: int = 5):
+        super(AsyncAPI, self).__init__()
+        if access_token is not None:
+            self._access_token = access_token
+
+        self.rate_limiter = rate_limiter if rate_limiter is not None else ETSY_RATE_LIMITER
+        self.max_retries = max_retries
+
+        self.reference_cache = reference_cache if reference_cache is not None else ReferenceCache(
+            ttl=reference_cache_ttl)
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._session = None
+        self._signed_header = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "x-api-key": self.keystring,
+            "Authorization": f"Bearer {self._access_token}"
+        }
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._session = aiohttp.ClientSession(
+            headers=self._signed_header, connector=aiohttp.TCPConnector(limit=self._max_concurrency))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    async def _get(self, url: str, params: Dict[str, str] = None):
+        """
+        Rate limited and retried the same way as API._request
+        """
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await asyncio.sleep(self.rate_limiter.reserve())
+                try:
+                    async with self._session.get(url, params=params) as response:
+                        status, headers = response.status, response.headers
+                        data = await response.json(content_type=None)
+                except aiohttp.ClientConnectionError:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(retry_delay(attempt))
+                    continue
+
+                self.rate_limiter.update_from_headers(headers)
+                if status not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return status, data
+
+                delay = retry_delay(attempt, headers)
+                if status == 429:
+                    self.rate_limiter.penalize(delay)
+                else:
+                    await asyncio.sleep(delay)
+
+    async def get_receipts(self, min_created: Union[int, str] = None):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts')
+
+        params = {}
+        if min_created is not None:
+            params['min_created'] = str(min_created)
+
+        status, data = await self._get(url, params=params)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_receipt(self, receipt_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts', str(receipt_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_listings_by_shop_receipt(self, receipt_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', self.store_id, 'receipts', str(receipt_id),
+                           'listings')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_listing(self, listing_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'listings', str(listing_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            if 'error' in data and data['error'].lower() == f'Could not find a Listing with listing_id' \
+                                                            f' = {listing_id}'.lower():
+                return ListingNotFoundError
+            else:
+                raise LookupError(data)
+
+    async def get_listing_product(self, listing_id: int, product_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'listings', str(listing_id), 'inventory', 'products',
+                           str(product_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_listing_images(self, shop_id: str, listing_id: str):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'listings', listing_id,
+                           'images')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_shop_return_policies(self, shop_id):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'policies', 'return')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_shop(self, shop_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_shop_section(self, shop_id: int, shop_section_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'sections', str(shop_section_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_shop_sections(self, shop_id: str):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', shop_id, 'sections')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_return_policy(self, shop_id: int, return_policy_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'policies', 'return',
+                           str(return_policy_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_shipping_profile(self, shop_id: int, shipping_profile_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles',
+                           str(shipping_profile_id))
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    async def get_shipping_profiles(self, shop_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_production_partners(self, shop_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'production-partners')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_shop_shipping_profile_upgrades(self, shop_id: int, shipping_profile_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles',
+                           str(shipping_profile_id), 'upgrades')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
+
+    @async_reference_data
+    async def get_shop_shipping_profile_destinations(self, shop_id: int, shipping_profile_id: int):
+        url = os.path.join(self.BASE_ETSY_URL, 'application', 'shops', str(shop_id), 'shipping-profiles',
+                           str(shipping_profile_id), 'destinations')
+
+        status, data = await self._get(url)
+
+        if status == 200:
+            return data
+        else:
+            raise LookupError(data)
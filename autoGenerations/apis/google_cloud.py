@@ -1,6 +1,8 @@
 import os
+import threading
 import urllib
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Union, Dict, Iterable, List, Tuple, Any, Callable
 
 from google.cloud import storage
 from google.api_core.exceptions import NotFound
@@ -8,6 +10,27 @@ from google.api_core.exceptions import NotFound
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 
+# Blobs are uploaded and downloaded in chunks of this size; setting one makes every upload resumable, so a dropped
+# connection only resends the current chunk. Google requires a multiple of 256 KB
+CHUNK_SIZE_MULTIPLE = 256 * 1024
+DEFAULT_CHUNK_SIZE = 32 * CHUNK_SIZE_MULTIPLE
+
+# Transfers run at once by upload_many / download_many. Kept under the client's HTTP connection pool size of 10
+DEFAULT_TRANSFER_WORKERS = 8
+
+
+class TransferError(Exception):
+    """
+    Raised by upload_many / download_many once every transfer has been tried when some of them failed. failures maps
+    each failed cloud storage path to its exception and results holds the return values of the transfers that succeeded
+    """
+
+    def __init__(self, failures: Dict[str, Exception], results: Dict[str, Any]):
+        super().__init__(f'{len(failures)} transfers failed: ' +
+                         ', '.join(f'{key}: {error!r}' for key, error in failures.items()))
+        self.failures = failures
+        self.results = results
+
 
 class Secrets:
     def __init__(self):
@@ -16,24 +39,100 @@ class Secrets:
 
 
 class Storage(Secrets):
-    def __init__(self):
+    """
+    Args:
+        chunk_size (int): Size of the chunks blobs are transferred in, a multiple of 256 KB. None transfers every blob
+            in a single request
+        max_workers (int): Default number of transfers upload_many / download_many run at once
+    """
+
+    def __init__(self, chunk_size: Union[int, None] = DEFAULT_CHUNK_SIZE, max_workers: int = DEFAULT_TRANSFER_WORKERS):
         super(Storage, self).__init__()
+        if chunk_size is not None and chunk_size % CHUNK_SIZE_MULTIPLE:
+            raise ValueError(f'chunk_size must be a multiple of {CHUNK_SIZE_MULTIPLE} bytes, got {chunk_size}')
         self.client = storage.Client()
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._buckets: Dict[str, storage.Bucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    def bucket(self, bucket_name: str) -> storage.Bucket:
+        """
+        Returns a cached handle to bucket_name. Creating it sends no request, so transfers do not pay for a bucket
+        metadata lookup each time. Use get_bucket to make sure the bucket exists
+        """
+        with self._buckets_lock:
+            if bucket_name not in self._buckets:
+                self._buckets[bucket_name] = self.client.bucket(bucket_name)
+            return self._buckets[bucket_name]
+
+    def _blob(self, cloud_storage_path: str, bucket_name: str) -> storage.Blob:
+        return self.bucket(bucket_name).blob(cloud_storage_path, chunk_size=self.chunk_size)
 
     def upload_image(self, image_path: str, cloud_storage_path: str, bucket_name: str = 'auto_generations_shop') -> str:
-        bucket = self.get_bucket(bucket_name)
-        blob = bucket.blob(cloud_storage_path)
+        blob = self._blob(cloud_storage_path, bucket_name)
         blob.upload_from_filename(image_path)
 
         return urllib.parse.quote(f'https://storage.googleapis.com/{bucket_name}/{cloud_storage_path}')
 
-    def download_image(self, cloud_storage_path: str, out_dir: str, bucket_name: str = 'auto_generations_shop'):
-        bucket = self.get_bucket(bucket_name)
-        blob = bucket.blob(cloud_storage_path)
-        blob.download_to_filename(os.path.join(out_dir, os.path.basename(cloud_storage_path)))
+    def download_image(self, cloud_storage_path: str, out_dir: str, bucket_name: str = 'auto_generations_shop') -> str:
+        blob = self._blob(cloud_storage_path, bucket_name)
+        output_path = os.path.join(out_dir, os.path.basename(cloud_storage_path))
+        blob.download_to_filename(output_path)
+
+        return output_path
+
+    def _run(self, task: Callable[[Any], Any], items: Iterable[Any], key: Callable[[Any], str],
+             max_workers: Union[int, None]) -> Dict[str, Any]:
+        futures: Dict[str, Future] = {}
+        with ThreadPoolExecutor(max_workers=max_workers if max_workers is not None else self.max_workers) as executor:
+            for item in items:
+                futures[key(item)] = executor.submit(task, item)
+
+        results, failures = {}, {}
+        for item_key, future in futures.items():
+            error = future.exception()
+            if error is None:
+                results[item_key] = future.result()
+            else:
+                failures[item_key] = error
+        if failures:
+            raise TransferError(failures, results)
+        return results
+
+    def upload_many(self, files: Iterable[Tuple[str, str]], bucket_name: str = 'auto_generations_shop',
+                    max_workers: int = None) -> Dict[str, str]:
+        """
+        Uploads several files at once
+        Args:
+            files (Iterable[Tuple[str, str]]): (local path, cloud storage path) of every file
+            bucket_name (str):
+            max_workers (int): Number of uploads in flight at once, defaults to self.max_workers
+
+        Returns:
+            Cloud storage path to public URL, like upload_image
+        """
+        return self._run(lambda file: self.upload_image(*file, bucket_name=bucket_name), files,
+                         key=lambda file: file[1], max_workers=max_workers)
+
+    def download_many(self, cloud_storage_paths: Iterable[str], out_dir: str,
+                      bucket_name: str = 'auto_generations_shop', max_workers: int = None) -> Dict[str, str]:
+        """
+        Downloads several blobs at once into out_dir
+        Args:
+            cloud_storage_paths (Iterable[str]):
+            out_dir (str):
+            bucket_name (str):
+            max_workers (int): Number of downloads in flight at once, defaults to self.max_workers
+
+        Returns:
+            Cloud storage path to local path
+        """
+        return self._run(lambda path: self.download_image(path, out_dir, bucket_name=bucket_name),
+                         cloud_storage_paths, key=lambda path: path, max_workers=max_workers)
 
     def download_most_recent_pipeline_image(self, bucket_name: str = 'auto_generations_shop') -> Union[None, str]:
-        bucket = self.get_bucket(bucket_name)
+        bucket = self.bucket(bucket_name)
         blobs = list(bucket.list_blobs(prefix='pipeline'))
 
         if not blobs:
@@ -53,15 +152,19 @@ class Storage(Secrets):
         return output_path
 
     def delete_file(self, file_path: str, bucket_name: str = 'auto_generations_shop'):
-        bucket = self.get_bucket(bucket_name)
-        blob = bucket.blob(file_path)
+        blob = self.bucket(bucket_name).blob(file_path)
         if blob.exists():
             blob.delete()
 
-    def get_bucket(self, bucket_name: str):
+    def get_bucket(self, bucket_name: str) -> storage.Bucket:
+        """
+        Fetches bucket_name, creating it if it does not exist, and caches it for bucket
+        """
         try:
             bucket = self.client.get_bucket(bucket_name)
         except NotFound:
             bucket = self.client.create_bucket(bucket_name)
 
+        with self._buckets_lock:
+            self._buckets[bucket_name] = bucket
         return bucket
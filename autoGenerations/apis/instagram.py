@@ -4,9 +4,12 @@ from typing import List
 
 import urllib.parse
 
+from apis.transport import make_session
+
 class API:
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
         super(API, self).__init__()
+        self._session = session if session is not None else make_session()
         self.BASE_URL = "https://graph.facebook.com/v17.0/"
         self._instagram_user_id = ""  # TODO: Need to get this from secrets file along with token
         self._access_token = ""
@@ -19,7 +22,7 @@ class API:
             url += f"&caption={caption}"
         url += f'&access_token={self._access_token}'
 
-        response = requests.post(url)
+        response = self._session.post(url)
 
         if response.status_code != 400:
             return response.json()
@@ -37,7 +40,7 @@ class API:
         url += f"&media_type=CAROUSEL"
         url += f'&access_token={self._access_token}'
 
-        response = requests.post(url)
+        response = self._session.post(url)
 
         if response.status_code != 400:
             return response.json()
@@ -7,6 +7,7 @@ from database.enums import Prodigi
 
 from datetime import datetime
 import openai
+from apis.transport import make_session
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -29,8 +30,9 @@ class Secrets:
 
 
 class API(Secrets):
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
         super(API, self).__init__()
+        self._session = session if session is not None else make_session()
         self._signed_header = {
             'Authorization': f"Bearer {self._secret_key}"
         }
@@ -48,7 +50,7 @@ class API(Secrets):
 
         print(json.dumps(data))
 
-        response = requests.post(url, headers=self._signed_header, data=json.dumps(data))
+        response = self._session.post(url, headers=self._signed_header, data=json.dumps(data))
 
         if response.status_code == 200:
             return response.json()
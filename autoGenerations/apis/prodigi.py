@@ -1,9 +1,11 @@
 import os
 import json
 import requests
-from typing import List, Dict
+from typing import List, Dict, Any, Iterable, Iterator
 from database.tables import Address, EtsyTransaction, ProdigiRecipient
 from database.enums import Prodigi
+from apis.transport import make_session
+from utilities.iteration import chunked
 
 from datetime import datetime
 
@@ -34,8 +36,9 @@ class Secrets:
 
 
 class API(Secrets):
-    def __init__(self, sandbox_mode: bool = True):
+    def __init__(self, sandbox_mode: bool = True, session: requests.Session = None):
         super(API, self).__init__()
+        self._session = session if session is not None else make_session()
         self.access_key = self.sandbox_key if sandbox_mode else self.prod_key
         self.BASE_URL = "https://api.sandbox.prodigi.com/v4.0/" if sandbox_mode else "https://api.prodigi.com/v4.0"
 
@@ -76,7 +79,7 @@ class API(Secrets):
             "items": items
         }
 
-        response = requests.post(url, headers=headers, json=body)
+        response = self._session.post(url, headers=headers, json=body)
 
         if response.status_code == 200:
             return response.json()
@@ -94,7 +97,7 @@ class API(Secrets):
             "X-API-Key": self.access_key
         }
 
-        response = requests.get(url, headers=headers)
+        response = self._session.get(url, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -131,13 +134,34 @@ class API(Secrets):
         if merchant_references is not None:
             params['merchantReferences'] = merchant_references
 
-        response = requests.get(url, headers=headers, params=params)
+        response = self._session.get(url, headers=headers, params=params)
 
         if response.status_code == 200:
             return response.json()
         else:
             raise LookupError(response.json())
 
+    def iter_orders(self, order_ids: Iterable[str], page_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the orders for order_ids using get_orders, so polling N orders takes about N / page_size calls instead of
+        N get_order calls. The ids are sent page_size at a time and each chunk is paged through until hasMore is false.
+        Orders Prodigi does not return are simply not yielded
+
+        Args:
+            order_ids (Iterable[str]): Prodigi order ids
+            page_size (int): Orders per call, Prodigi allows at most 100
+        """
+        for chunk in chunked(order_ids, page_size):
+            skip = 0
+            while True:
+                response = self.get_orders(top=page_size, skip=skip, order_ids=chunk)
+                orders = response.get('orders') or []
+                yield from orders
+
+                skip += len(orders)
+                if not response.get('hasMore') or not orders:
+                    break
+
     def get_order_actions(self, order_id: str):
         """
         API Reference: https://www.prodigi.com/print-api/docs/reference/#get-actions
@@ -151,7 +175,7 @@ class API(Secrets):
             "Content-Type": "application/json"
         }
 
-        response = requests.get(url, headers=headers)
+        response = self._session.get(url, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -171,7 +195,7 @@ class API(Secrets):
             "Content-Type": "application/json"
         }
 
-        response = requests.post(url, headers=headers)
+        response = self._session.post(url, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -195,7 +219,7 @@ class API(Secrets):
 
         body = {'shippingMethod': new_shipping_method.value}
 
-        response = requests.post(url, headers=headers, json=body)
+        response = self._session.post(url, headers=headers, json=body)
 
         if response.status_code == 200:
             return response.json()
@@ -230,7 +254,7 @@ class API(Secrets):
             }
         }
 
-        response = requests.post(url, headers=headers, json=body)
+        response = self._session.post(url, headers=headers, json=body)
 
         if response.status_code == 200:
             return response.json()
@@ -254,7 +278,7 @@ class API(Secrets):
             "items": items
         }
 
-        response = requests.post(url, headers=headers, json=body)
+        response = self._session.post(url, headers=headers, json=body)
 
         if response.status_code == 200:
             return response.json()
@@ -274,7 +298,7 @@ class API(Secrets):
             "Content-Type": "application/json"
         }
 
-        response = requests.get(url, headers=headers)
+        response = self._session.get(url, headers=headers)
 
         if response.status_code == 200:
             return response.json()
@@ -0,0 +1,125 @@
+import time
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Mapping, Union
+
+# Status codes worth retrying. Anything else is a real answer from the API and is returned to the caller as is
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Methods that can be sent twice with the same effect as once. Other requests may already have been applied when they
+# fail with a 5xx or time out, so they are only retried when they certainly were not
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Once less than this fraction of the daily limit is left, the remaining requests are spread over the rest of the day
+# instead of being spent at full speed
+DAILY_RESERVE_RATIO = 0.1
+
+# Slowest pace the daily budget will push the bucket down to. Once the daily quota is gone Etsy answers with 429s and a
+# retry-after, which is handled by penalize
+MIN_RATE = 0.05
+
+
+def _seconds_until_utc_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Union[float, None]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket that paces requests to an API. Every request takes a token; tokens refill at rate per
+    second up to capacity. When the bucket is empty reserve() returns how long the caller has to wait for its token, so
+    the same bucket can pace both blocking (time.sleep) and asyncio (asyncio.sleep) callers.
+
+    The bucket adapts to the rate limit headers Etsy sends back with every response:
+        x-limit-per-second / x-remaining-this-second: the per second QPS limit and what is left of it
+        x-limit-per-day / x-remaining-today: the daily limit and what is left of it. Once the remaining requests drop
+            below DAILY_RESERVE_RATIO of the limit, the rate is lowered so they are spread over the rest of the (UTC)
+            day instead of running out
+    """
+
+    def __init__(self, rate: float = 10, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._per_second_limit = rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns the number of seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(0.0, self._blocked_until - now)
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self, delay: float):
+        """
+        Holds back every request sharing this bucket for delay seconds, i.e. after a 429
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        limit_per_second = _header_number(headers, 'x-limit-per-second')
+        remaining_this_second = _header_number(headers, 'x-remaining-this-second')
+        limit_per_day = _header_number(headers, 'x-limit-per-day')
+        remaining_today = _header_number(headers, 'x-remaining-today')
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if limit_per_second is not None and limit_per_second > 0:
+                self._per_second_limit = limit_per_second
+                self.capacity = limit_per_second
+
+            rate = self._per_second_limit
+            if remaining_today is not None and limit_per_day and remaining_today < limit_per_day * DAILY_RESERVE_RATIO:
+                rate = min(rate, max(remaining_today / _seconds_until_utc_midnight(), MIN_RATE))
+            self.rate = rate
+
+            # The server's count is the truth, ours only approximates it
+            if remaining_this_second is not None:
+                self._tokens = min(self._tokens, remaining_this_second)
+                if remaining_this_second <= 0:
+                    self._blocked_until = max(self._blocked_until, now + 1)
+
+
+def retry_delay(attempt: int, headers: Mapping[str, str] = None, base: float = 0.5, cap: float = 30) -> float:
+    """
+    Full jitter exponential backoff: a random delay between 0 and base * 2 ** attempt (at most cap) so that clients
+    retrying at the same time spread out. A retry-after header from the server is always respected.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    retry_after = _header_number(headers, 'retry-after') if headers is not None else None
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
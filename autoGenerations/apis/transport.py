@@ -0,0 +1,52 @@
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Defaults for the connection pools shared by every request a client makes. pool_connections is the number of hosts
+# that get their own pool, pool_maxsize is the number of kept-alive connections in each of those pools
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 10
+
+# Upper bound on simultaneous connections to a single host. Requests beyond the limit wait for a free connection
+# instead of opening a new one, which keeps us from tripping the API's own connection limits
+HOST_CONNECTION_LIMITS = {
+    'api.etsy.com': 10,
+    'api.prodigi.com': 10,
+    'api.sandbox.prodigi.com': 10,
+    'api.openai.com': 4,
+    'graph.facebook.com': 4
+}
+
+
+def make_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 host_limits: Dict[str, int] = None, keep_alive: bool = True) -> requests.Session:
+    """
+    Creates a requests Session backed by pooled, kept-alive connections. Calling the module level requests.get/post
+    opens a new TCP + TLS connection for every call; a session reuses the connection for every request to the same
+    host, so only the first call to each API pays for the handshake.
+
+    Args:
+        pool_connections (int): Number of per-host pools to keep for hosts without an explicit limit
+        pool_maxsize (int): Number of connections kept alive in each of those pools
+        host_limits (Dict[str, int]): Maximum simultaneous connections per host. Defaults to HOST_CONNECTION_LIMITS
+        keep_alive (bool): If False, connections are closed after every request
+    """
+    session = requests.Session()
+
+    default_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('https://', default_adapter)
+    session.mount('http://', default_adapter)
+
+    host_limits = HOST_CONNECTION_LIMITS if host_limits is None else host_limits
+    for host, limit in host_limits.items():
+        # pool_block makes requests wait for a free connection rather than opening one past the limit
+        host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=limit, pool_block=True)
+        session.mount(f'https://{host}/', host_adapter)
+        session.mount(f'http://{host}/', host_adapter)
+
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    return session
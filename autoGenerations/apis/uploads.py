@@ -0,0 +1,161 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, IO, Iterable, List, NamedTuple, Union
+
+from apis.etsy import API as EtsyAPI
+
+# Listing images and digital files upload at the same time up to this many. Every request still goes through the
+# API's rate limiter, so this only bounds how many uploads are in flight, not the request rate
+DEFAULT_UPLOAD_WORKERS = 5
+
+# Etsy allows at most 10 images per listing
+MAX_LISTING_IMAGES = 10
+
+
+class UploadPart(NamedTuple):
+    """
+    One image or digital file of a listing
+
+    Args:
+        rank (int): Position of the image / file in the listing, starting at 1
+        name (str): File name sent to Etsy
+        content (Union[str, bytes, IO]): Path to the file, its bytes or an open binary file
+    """
+    rank: int
+    name: str
+    content: Union[str, bytes, IO]
+
+
+class UploadError(Exception):
+    """
+    Raised once every part has been tried when some of them still failed after all attempts. failures maps each failed
+    rank (or image id for deletes) to its last exception and results holds the responses of the parts that succeeded
+    """
+
+    def __init__(self, failures: Dict[Any, Exception], results: Dict[Any, Any]):
+        super().__init__(f'{len(failures)} uploads failed: ' +
+                         ', '.join(f'{key}: {error!r}' for key, error in failures.items()))
+        self.failures = failures
+        self.results = results
+
+
+def parts_from_paths(paths: Iterable[str], first_rank: int = 1) -> List[UploadPart]:
+    return [UploadPart(first_rank + i, os.path.basename(path), path) for i, path in enumerate(paths)]
+
+
+class ListingUploader:
+    """
+    Uploads the images and digital files of a listing, and deletes its old images, several at a time. Uploads that
+    finish out of order can land at other positions than their rank, so once they are all done the listing is checked
+    and any part that is out of place is moved to its rank.
+
+    Retries are left to EtsyAPI._request, so each request is retried in one place only. An image upload overwrites
+    whatever is at its rank, so it is retried like any idempotent request. A digital file upload is not, so it is only
+    retried when Etsy certainly did not receive it, otherwise a retry could add the file twice
+
+    Args:
+        etsy_api (EtsyAPI): API the requests are sent with, its rate limiter paces all of them
+        shop_id (str):
+        listing_id (str):
+        max_workers (int): Number of uploads in flight at once
+    """
+
+    def __init__(self, etsy_api: EtsyAPI, shop_id: str, listing_id: str, max_workers: int = DEFAULT_UPLOAD_WORKERS):
+        self.etsy_api = etsy_api
+        self.shop_id = str(shop_id)
+        self.listing_id = str(listing_id)
+        self.max_workers = max_workers
+
+    def _upload_image(self, part: UploadPart) -> Dict[str, Any]:
+        # Paths are opened by the upload itself, which streams the file and closes it afterwards
+        return self.etsy_api.upload_listing_image(
+            shop_id=self.shop_id, listing_id=self.listing_id,
+            image_data={'image': (part.name, part.content), 'rank': part.rank, 'overwrite': True})
+
+    def _upload_file(self, part: UploadPart) -> Dict[str, Any]:
+        return self.etsy_api.upload_listing_file(
+            shop_id=self.shop_id, listing_id=self.listing_id,
+            file_data={'file': (part.name, part.content, 'multipart/form-data'), 'rank': part.rank}, name=part.name)
+
+    @staticmethod
+    def _misplaced(current_ranks: Dict[int, int], wanted_ranks: Dict[int, int]) -> bool:
+        return any(current_ranks.get(item_id) != rank for item_id, rank in wanted_ranks.items())
+
+    def _order_images(self, results: Dict[int, Dict[str, Any]]):
+        wanted_ranks = {response['listing_image_id']: rank for rank, response in results.items()}
+        images = self.etsy_api.get_listing_images(self.shop_id, self.listing_id)['results']
+        if not self._misplaced({image['listing_image_id']: image['rank'] for image in images}, wanted_ranks):
+            return
+
+        # Moving the images in ascending rank order puts each one in its final place, the ones after it only shift
+        for image_id, rank in sorted(wanted_ranks.items(), key=lambda item: item[1]):
+            self.etsy_api.upload_listing_image(
+                shop_id=self.shop_id, listing_id=self.listing_id,
+                image_data={'listing_image_id': image_id, 'rank': rank, 'overwrite': True})
+
+    def _order_files(self, results: Dict[int, Dict[str, Any]]):
+        wanted_ranks = {response['listing_file_id']: rank for rank, response in results.items()}
+        files = self.etsy_api.get_listing_files(self.shop_id, self.listing_id)['results']
+        if not self._misplaced({file['listing_file_id']: file['rank'] for file in files}, wanted_ranks):
+            return
+
+        names = {response['listing_file_id']: response['filename'] for response in results.values()}
+        for file_id, rank in sorted(wanted_ranks.items(), key=lambda item: item[1]):
+            self.etsy_api.upload_listing_file(
+                shop_id=self.shop_id, listing_id=self.listing_id,
+                file_data={'listing_file_id': file_id, 'rank': rank}, name=names[file_id])
+
+    def _run(self, task: Callable[[Any], Any], items: Iterable[Any], key: Callable[[Any], Any]) -> Dict[Any, Any]:
+        # Items are submitted as the iterable produces them, so parts that are still being rendered upload as soon as
+        # they are ready
+        futures: Dict[Any, Future] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for item in items:
+                futures[key(item)] = executor.submit(task, item)
+
+        results, failures = {}, {}
+        for item_key, future in futures.items():
+            error = future.exception()
+            if error is None:
+                results[item_key] = future.result()
+            else:
+                failures[item_key] = error
+        if failures:
+            raise UploadError(failures, results)
+        return results
+
+    def upload_images(self, parts: Iterable[UploadPart]) -> List[Dict[str, Any]]:
+        """
+        Uploads listing images concurrently, then moves any that landed out of place to their rank. Parts ranked past
+        MAX_LISTING_IMAGES are skipped
+
+        Returns:
+            The upload responses, in rank order
+        """
+        parts = (part for part in parts if part.rank <= MAX_LISTING_IMAGES)
+        results = self._run(self._upload_image, parts, key=lambda part: part.rank)
+        self._order_images(results)
+        return [results[rank] for rank in sorted(results)]
+
+    def upload_files(self, parts: Iterable[UploadPart]) -> List[Dict[str, Any]]:
+        """
+        Uploads digital download files concurrently, then moves any that landed out of place to their rank
+
+        Returns:
+            The upload responses, in rank order
+        """
+        results = self._run(self._upload_file, parts, key=lambda part: part.rank)
+        self._order_files(results)
+        return [results[rank] for rank in sorted(results)]
+
+    def delete_images(self, image_ids: Iterable[Union[str, int]]):
+        self._run(lambda image_id: self.etsy_api.delete_listing_image(self.shop_id, self.listing_id, image_id),
+                  (str(image_id) for image_id in image_ids), key=lambda image_id: image_id)
+
+    def replace_images(self, parts: Iterable[UploadPart]) -> List[Dict[str, Any]]:
+        """
+        Deletes every current image of the listing, then uploads parts
+        """
+        existing_images_response = self.etsy_api.get_listing_images(self.shop_id, self.listing_id)
+        self.delete_images(image['listing_image_id'] for image in existing_images_response['results'])
+        return self.upload_images(parts)
@@ -5,10 +5,12 @@ import argparse
 
 from apis.etsy import API as EtsyAPI
 from apis.openai import API as OpenaiAPI
+from apis.uploads import ListingUploader, UploadPart, parts_from_paths
 import numpy as np
 from PIL import Image
 import tempfile
 from utilities.mockups import create_mockup_images
+from utilities.digital_assets import render_digital_assets, encode_jpeg_under_size, ETSY_MAX_FILE_BYTES
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -78,29 +80,30 @@ def generate_unique_sku(sku_map: Dict[str, Dict[str, str]]):
     return possible_sku
 
 
-def resize_and_compress_image(input_path, output_path, max_size_mb=20):
-    # Load the image
-    img = Image.open(input_path)
+def resize_and_compress_image(input_path, output_path, max_size_mb=20) -> str:
+    """
+    Copies input_path to output_path if it is at most max_size_mb, otherwise writes the highest quality JPEG (scaled
+    down if even low qualities are too big) that fits, next to output_path with a .jpg extension
 
+    Returns:
+        Path of the written image
+    """
     # Calculate the maximum size in bytes
     max_size_bytes = max_size_mb * 1024 * 1024
 
-    # Get the current image size in bytes
-    current_size_bytes = os.path.getsize(input_path)
-
     # If the image is already smaller than the desired size, no need to resize or compress
-    if current_size_bytes <= max_size_bytes:
-        img.save(output_path)
-        return
-    print('resizing')
-    # Calculate the compression quality
-    quality = int(100 * max_size_bytes / current_size_bytes)
+    if os.path.getsize(input_path) <= max_size_bytes:
+        shutil.copyfile(input_path, output_path)
+        return output_path
 
-    # Resize the image while maintaining its aspect ratio
-    img.thumbnail((img.width, img.height))
-    print('saving',quality)
-    # Save the resized and compressed image
-    img.save(output_path, optimize=True, quality=quality)
+    with Image.open(input_path) as img:
+        result = encode_jpeg_under_size(img, max_size_bytes, min_scale=0.5)
+
+    output_path = os.path.splitext(output_path)[0] + '.jpg'
+    print(f'Re-encoded {os.path.basename(input_path)} to fit {max_size_mb} MB: {result}')
+    with open(output_path, 'wb') as f:
+        f.write(result.data)
+    return output_path
 
 
 def resize_with_max_constraint(input_path, output_path, max_constraint=2000):
@@ -130,33 +133,6 @@ def resize_with_max_constraint(input_path, output_path, max_constraint=2000):
     img.save(output_path, ppi=(72, 72))
 
 
-def resize_and_set_dpi(input_path, output_path, dpi=300, width=None, height=None):
-    try:
-        # Open the image
-        image = Image.open(input_path)
-
-        # Resize the image while maintaining the aspect ratio
-        if width and height:
-            image = image.resize((width, height), Image.LANCZOS)
-        elif width:
-            aspect_ratio = width / float(image.size[0])
-            height = int((float(image.size[1]) * float(aspect_ratio)))
-            image = image.resize((width, height), Image.LANCZOS)
-        elif height:
-            aspect_ratio = height / float(image.size[1])
-            width = int((float(image.size[0]) * float(aspect_ratio)))
-            image = image.resize((width, height), Image.LANCZOS)
-
-        # Set the new DPI value
-        image.info['dpi'] = (dpi, dpi)
-
-        # Save the new image with updated DPI metadata
-        image.save(output_path, dpi=(dpi, dpi))
-
-        print(f"Image successfully resized and DPI updated. Saved as {output_path}")
-    except Exception as e:
-        print(f"Error resizing and updating DPI: {e}")
-
 ASPECT_RATIO_SIZES = {
     '2_3_ratio': (7200, 10800),
     '3_4_ratio': (7200, 9600),
@@ -226,23 +202,23 @@ def create_digital_listing(product_image: str, product_title: str, quantity: Uni
     # Resize the image to the maximum of 20 MB
     asset_tempdir = tempfile.mkdtemp()
     smaller_image_path = os.path.join(asset_tempdir, os.path.basename(product_image))
-    resize_and_compress_image(product_image, smaller_image_path)
+    smaller_image_path = resize_and_compress_image(product_image, smaller_image_path)
 
-    # Make the different sizes for each aspect ratio and change the dpi to 300
-    for i, aspect_ratio in enumerate(ASPECT_RATIO_SIZES):
-        file_path = os.path.join(asset_tempdir, os.path.basename(product_image).split('.')[0] + f'_{aspect_ratio}.jpg')
-        pixel_size = ASPECT_RATIO_SIZES[aspect_ratio]
-        resize_and_set_dpi(smaller_image_path, file_path, width=pixel_size[0], height=pixel_size[1])
-        file_data = {
-            'file': (os.path.basename(file_path), open(file_path, 'rb'), 'multipart/form-data'),
-            'rank': i + 1
-        }
+    # Make the different sizes for each aspect ratio and change the dpi to 300. The sizes render in parallel from a
+    # single decode of the image and each one is uploaded as soon as it is written
+    ranks = {aspect_ratio: i + 1 for i, aspect_ratio in enumerate(ASPECT_RATIO_SIZES)}
+    uploader = ListingUploader(etsy_api, str(shop_id), str(listing_id))
 
-        digital_download_file_name = os.path.basename(file_path).split('|')[1] + f'_{aspect_ratio}.jpg' if '|' in\
-                                                                            file_path else os.path.basename(file_path)
+    def asset_parts():
+        for aspect_ratio, file_path in render_digital_assets(smaller_image_path, asset_tempdir, ASPECT_RATIO_SIZES,
+                                                             file_stem=os.path.basename(product_image).split('.')[0],
+                                                             max_bytes=ETSY_MAX_FILE_BYTES):
+            print(f"Image successfully resized and DPI updated. Saved as {file_path}")
+            digital_download_file_name = os.path.basename(file_path).split('|')[1] + f'_{aspect_ratio}.jpg' if \
+                '|' in file_path else os.path.basename(file_path)
+            yield UploadPart(ranks[aspect_ratio], digital_download_file_name, file_path)
 
-        etsy_api.upload_listing_file(shop_id=str(shop_id), listing_id=str(listing_id), file_data=file_data,
-                                     name=digital_download_file_name)
+    uploader.upload_files(asset_parts())
 
     # Upload the mockups and the sizing info image
     if mockup_images is None:
@@ -255,14 +231,7 @@ def create_digital_listing(product_image: str, product_title: str, quantity: Uni
     # Add the product description mockup to the end
     mockup_images.insert(0, os.path.join(PROJECT_DIR, 'data', 'mockup_images', 'digital_mockup.png'))
 
-    for i, image_path in enumerate(mockup_images):
-        image_data = {
-            'image': open(image_path, 'rb'),
-            'rank': i+1,
-            'overwrite': True
-        }
-
-        etsy_api.upload_listing_image(shop_id=str(shop_id), listing_id=str(listing_id), image_data=image_data)
+    uploader.upload_images(parts_from_paths(mockup_images))
 
     # Finally update the listing fields
     etsy_api.update_listing(shop_id=str(shop_id), listing_id=str(listing_id), listing_data={'is_digital': True,
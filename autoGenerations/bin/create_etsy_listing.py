@@ -8,6 +8,7 @@ import tempfile
 from apis.etsy import API as EtsyAPI
 from apis.openai import API as OpenaiAPI
 from apis.google_cloud import Storage
+from apis.uploads import ListingUploader, parts_from_paths, MAX_LISTING_IMAGES
 from print_price import calc_price
 from create_etsy_digital_listing import create_digital_listing
 from utilities.mockups import create_mockup_images
@@ -200,20 +201,10 @@ def create_listing(pipeline: bool, product_image: str, product_title: str, creat
 
     mockup_images.reverse()
 
-    image_ids = []
-    for i, mock_image in enumerate(mockup_images):
-        # Can only have 10 images in listing
-        if i > 9:
-            continue
-
-        image_data = {
-            'image': open(mock_image, 'rb'),
-            'rank': i + 1,
-            'overwrite': True
-        }
-        response = etsy_api.upload_listing_image(shop_id=str(shop_id), listing_id=str(listing_id),
-                                                 image_data=image_data)
-        image_ids.append((mock_image, response['listing_image_id']))
+    # Can only have 10 images in listing. The images upload concurrently, each at its own rank
+    uploader = ListingUploader(etsy_api, str(shop_id), str(listing_id))
+    responses = uploader.upload_images(parts_from_paths(mockup_images[:MAX_LISTING_IMAGES]))
+    image_ids = [(mock_image, response['listing_image_id']) for mock_image, response in zip(mockup_images, responses)]
 
     # Fifth update the SKU map with the new listing info
     for sku in skus:
@@ -8,29 +8,33 @@ from database.tables import ProdigiOrder, ProdigiStatus, ProdigiCharge, ProdigiC
     ProdigiIssue, ProdigiAuthorizationDetails, ProdigiChargeItem, EtsyReceipt, Address
 from database.enums import Prodigi, OrderStatus, Etsy
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, Query
 
 
-def main(in_progress: bool, complete: bool, have_issues: bool):
-    with Session(make_engine()) as session:
-        prodigi_orders = session.query(ProdigiOrder)
+def prodigi_orders_query(session: Session, in_progress: bool, complete: bool, have_issues: bool) -> Query:
+    prodigi_orders = session.query(ProdigiOrder)
 
-        if in_progress:
-            prodigi_orders = prodigi_orders.join(ProdigiStatus).filter(
-                ProdigiStatus.stage == Prodigi.StatusStage.IN_PROGRESS
-            )
+    if in_progress:
+        prodigi_orders = prodigi_orders.join(ProdigiStatus).filter(
+            ProdigiStatus.stage == Prodigi.StatusStage.IN_PROGRESS
+        )
 
-        if complete:
-            prodigi_orders = prodigi_orders.join(ProdigiStatus).filter(
-                ProdigiStatus.stage == Prodigi.StatusStage.COMPLETE
-            )
+    if complete:
+        prodigi_orders = prodigi_orders.join(ProdigiStatus).filter(
+            ProdigiStatus.stage == Prodigi.StatusStage.COMPLETE
+        )
 
-        if have_issues:
-            prodigi_orders = prodigi_orders.join(ProdigiStatus).filter(
-                ProdigiStatus.issues.any()
-            )
+    if have_issues:
+        prodigi_orders = prodigi_orders.join(ProdigiStatus).filter(
+            ProdigiStatus.issues.any()
+        )
 
-        prodigi_orders = prodigi_orders.all()
+    return prodigi_orders
+
+
+def main(in_progress: bool, complete: bool, have_issues: bool):
+    with Session(make_engine()) as session:
+        prodigi_orders = prodigi_orders_query(session, in_progress, complete, have_issues).all()
 
         hdrfmt = "{:15s} | {:25s} | {:25s} | {:15s} | {:15s} | {:20s}"
         fmt = "{:17s} {:27s} {:27s} {:17s} {:17s} {:20s}"
@@ -13,13 +13,27 @@ from database.enums import Prodigi, OrderStatus, Etsy
 from apis.prodigi import API
 from alerts.email import send_mail
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, Query
 import traceback
 
 
 PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)))
 
 
+def unfulfilled_paid_receipts_query(session: Session) -> Query:
+    """
+    Paid receipts that still need a Prodigi order placed
+    """
+    # Receipts will become complete when all transactions for that receipt have been completed
+    return session.query(EtsyReceipt).filter(
+        EtsyReceipt.order_status == OrderStatus.INCOMPLETE
+    ).filter(
+        EtsyReceipt.needs_fulfillment
+    ).filter(
+        EtsyReceipt.status == Etsy.OrderStatus.PAID
+    )
+
+
 def fulfill_orders():
     prodigy_api = API(sandbox_mode=False)
 
@@ -28,14 +42,7 @@ def fulfill_orders():
 
     with Session(make_engine()) as session:
 
-        # Receipts will become complete when all transactions for that receipt have been completed
-        unfulfilled_paid_receipts = session.query(EtsyReceipt).filter(
-            EtsyReceipt.order_status == OrderStatus.INCOMPLETE
-        ).filter(
-            EtsyReceipt.needs_fulfillment
-        ).filter(
-            EtsyReceipt.status == Etsy.OrderStatus.PAID
-        ).all()
+        unfulfilled_paid_receipts = unfulfilled_paid_receipts_query(session).all()
 
         print(f'Fulfilling {len(unfulfilled_paid_receipts)} orders')
 
@@ -1,4 +1,4 @@
-from apis.etsy import API as EtsyAPI
+from apis.etsy import API as EtsyAPI, AsyncAPI as EtsyAsyncAPI, ListingNotFoundError, ReferenceCache
 from database.namespaces import EtsyReceiptShipmentSpace, EtsyProductPropertySpace, EtsyListingSpace, EtsyShopSpace, \
     EtsyShopSectionSpace, EtsyReturnPolicySpace, EtsyShippingProfileSpace, EtsyProductionPartnerSpace, \
     EtsyShippingProfileUpgradeSpace, EtsyShippingProfileDestinationSpace, EtsyProductSpace, EtsyOfferingSpace, \
@@ -6,12 +6,17 @@ from database.namespaces import EtsyReceiptShipmentSpace, EtsyProductPropertySpa
 from database.utils import make_engine
 from database.tables import EtsyReceipt, Address, EtsyReceiptShipment, EtsyTransaction, EtsySeller, EtsyBuyer, \
     EtsyProduct, EtsyProductProperty, EtsyListing, EtsyShop, EtsyShopSection, EtsyReturnPolicy, EtsyShippingProfile, \
-    EtsyProductionPartner, EtsyShippingProfileUpgrade, EtsyShippingProfileDestination, EtsyOffering, EtsyRefund
+    EtsyProductionPartner, EtsyShippingProfileUpgrade, EtsyShippingProfileDestination, EtsyOffering, EtsyRefund, \
+    SyncState
 from database.enums import OrderStatus, Etsy
 from alerts.email import send_mail
+from utilities.iteration import chunked
 
-from sqlalchemy.orm import Session
-from datetime import timezone
+from sqlalchemy.orm import Session, Query
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Union, Iterable, Iterator, Set, Tuple
+import argparse
+import asyncio
 import traceback
 
 response = {'count': 1,
@@ -90,330 +95,462 @@ product_sample = {'product_id': 13311969728, 'sku': 'SKU101', 'is_deleted': Fals
 
 # TODO: Restock listings when they get low. Use listing state SOLD_OUT or quantity below a certain amount
 
-def get_etsy_orders():
-    etsy_api = EtsyAPI()
+async def fetch_transaction_data(etsy_api: EtsyAsyncAPI, transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Makes every Etsy call needed to sync a single transaction. The listing and product lookups don't depend on each
+    other, and once the listing is known none of its shop level lookups depend on each other, so each stage is sent
+    concurrently instead of one round trip at a time.
+    """
+    listing_id = transaction['listing_id']
+    listing_response, product_response = await asyncio.gather(
+        etsy_api.get_listing(listing_id),
+        etsy_api.get_listing_product(listing_id, transaction['product_id'])
+    )
+    if listing_response is ListingNotFoundError:
+        raise ListingNotFoundError(f'Could not find listing {listing_id}')
+
+    listing_space = EtsyListingSpace(listing_response)
+    shop_id = listing_space.shop_id
+
+    lookups = {
+        'shop': etsy_api.get_shop(shop_id),
+        'return_policy': etsy_api.get_return_policy(shop_id, listing_space.return_policy_id),
+        'production_partners': etsy_api.get_production_partners(shop_id)
+    }
+    if listing_space.shop_section_id is not None:
+        lookups['shop_section'] = etsy_api.get_shop_section(shop_id, listing_space.shop_section_id)
+    if listing_space.listing_type == Etsy.ListingType.PHYSICAL:
+        shipping_profile_id = listing_space.shipping_profile_id
+        lookups['shipping_profile'] = etsy_api.get_shipping_profile(shop_id, shipping_profile_id)
+        lookups['shipping_upgrades'] = etsy_api.get_shop_shipping_profile_upgrades(shop_id, shipping_profile_id)
+        lookups['shipping_destinations'] = etsy_api.get_shop_shipping_profile_destinations(shop_id,
+                                                                                           shipping_profile_id)
+
+    responses = await asyncio.gather(*lookups.values())
+
+    transaction_data = dict(zip(lookups.keys(), responses))
+    transaction_data['listing'] = listing_response
+    transaction_data['product'] = product_response
+    return transaction_data
+
+
+async def fetch_receipts_data(receipts: List[Dict[str, Any]], reference_cache: ReferenceCache,
+                              max_concurrency: int) -> List[Union[List[Dict[str, Any]], Exception]]:
+    """
+    Fetches the transaction data for every receipt concurrently. A failed lookup only fails its own receipt; the exception
+    is returned in that receipt's place so it can be reported the same way as any other receipt error.
+    """
+    async def fetch_receipt_data(receipt):
+        return await asyncio.gather(*(fetch_transaction_data(etsy_api, transaction)
+                                      for transaction in receipt['transactions'] or []))
+
+    async with EtsyAsyncAPI(max_concurrency=max_concurrency, reference_cache=reference_cache) as etsy_api:
+        return await asyncio.gather(*(fetch_receipt_data(receipt) for receipt in receipts), return_exceptions=True)
+
+
+def sync_receipt(session: Session, receipt: Dict[str, Any], receipt_data: List[Dict[str, Any]]):
+    """
+    Creates / updates the database records for a receipt and everything it references. receipt_data is the list of
+    prefetched Etsy responses for each of the receipt's transactions, as returned by fetch_transaction_data
+    """
+    receipt_space = EtsyReceipt.create_namespace(receipt)
+
+    # Check if receipt exists
+    receipt_c = EtsyReceipt.get_existing(session, receipt_space.receipt_id)
+
+    # Check if the address exists
+    address = Address.get_existing(session, receipt_space.zip, receipt_space.city, receipt_space.state,
+                                   receipt_space.country, receipt_space.first_line, receipt_space.second_line)
+    if address is None:
+        address = Address.create(receipt)
+        session.add(address)
+        session.flush()
+    else:
+        # Nothing to update, if anything changes it becomes a different address
+        address = address
+
+    # Check if the buyer exists
+    buyer = EtsyBuyer.get_existing(session, receipt_space.buyer_id)
+    if buyer is None:
+        buyer = EtsyBuyer.create(receipt, addresses=[address])
+        session.add(buyer)
+        session.flush()
+    else:
+        if buyer.update(receipt, addresses=[address]):
+            session.flush()
+
+    # Check if the seller exists
+    seller = EtsySeller.get_existing(session, receipt_space.seller_id)
+    if seller is None:
+        seller = EtsySeller.create(receipt)
+        session.add(seller)
+        session.flush()
+    else:
+        if seller.update(receipt):
+            session.flush()
+
+    # Create new shipments
+    receipt_shipments = []
+    for shipment_dict in receipt_space.shipments:
+        shipment_space = EtsyReceiptShipmentSpace(shipment_dict)
+        if shipment_space.receipt_shipping_id is not None:
+            receipt_shipment = EtsyReceiptShipment.get_existing(session, shipment_space.receipt_shipping_id)
+            if receipt_shipment is None:
+                receipt_shipment = EtsyReceiptShipment.create(shipment_space)
+                session.add(receipt_shipment)
+                session.flush()
+            else:
+                if receipt_shipment.update(shipment_space):
+                    session.flush()
+            receipt_shipments.append(receipt_shipment)
+
+    # Create new refunds
+    refunds = []
+    for refund_dict in receipt_space.refunds:
+        refund_space = EtsyRefundSpace(refund_dict)
+        refund = EtsyRefund.create(refund_space)
+        refunds.append(refund)
+
+    # Create new transactions
+    transactions = []
+    for transaction_dict, transaction_data in zip(receipt_space.transactions, receipt_data):
+        transaction_space = EtsyTransaction.create_namespace(transaction_dict)
+
+        # Get list of existing / created product properties
+        product_properties = []
+        for property_data in transaction_space.product_property_data:
+            property_data_space = EtsyProductPropertySpace(property_data)
+            product_property = EtsyProductProperty.get_existing(session, property_data_space.property_id,
+                                                                property_data_space.property_name)
+            if product_property is None:
+                product_property = EtsyProductProperty.create(property_data)
+                session.add(product_property)
+                session.flush()
+            else:
+                if product_property.update(property_data):
+                    session.flush()
+            product_properties.append(product_property)
+
+        # Update / create a listing record from the prefetched listing info
+        listing_response = transaction_data['listing']
+        listing_space = EtsyListingSpace(listing_response)
+        listing = EtsyListing.get_existing(session, listing_space.listing_id)
+        if listing is None:
+            listing = EtsyListing.create(listing_space, seller=seller)
+            session.add(listing)
+            session.flush()
+        else:
+            if listing.update(listing_space, seller=seller):
+                session.flush()
+
+        if listing_space.state in [Etsy.ListingState.EXPIRED, Etsy.ListingState.INACTIVE,
+                                   Etsy.ListingState.SOLD_OUT]:
+            send_mail(f'Listing {listing_space.listing_id} {listing_space.state.value}',
+                      f'The subject listing is {listing_space.state.value}')
+
+        shop_response = transaction_data['shop']
+        shop_space = EtsyShopSpace(shop_response)
+        shop = EtsyShop.get_existing(session, shop_space.shop_id)
+        if shop is None:
+            shop = EtsyShop.create(shop_space, seller=seller, listings=[listing])
+            session.add(shop)
+            session.flush()
+        else:
+            if shop.update(shop_space, seller=seller, listings=[listing]):
+                session.flush()
+
+        # Listing should be part of a section but possible that it isn't
+        if listing_space.shop_section_id is not None:
+            shop_section_response = transaction_data['shop_section']
+            shop_section_space = EtsyShopSectionSpace(shop_section_response)
+            shop_section = EtsyShopSection.get_existing(session, shop_section_space.shop_section_id)
+            if shop_section is None:
+                shop_section = EtsyShopSection.create(shop_section_space, seller=seller, listings=[listing],
+                                                      shop=shop)
+                session.add(shop_section)
+                session.flush()
+            else:
+                if shop_section.update(shop_section_space, seller=seller, listings=[listing], shop=shop):
+                    session.flush()
 
-    # First get the last order that we have received that has not yet been completed
-    with Session(make_engine()) as session:
+        return_policy_response = transaction_data['return_policy']
+        return_policy_space = EtsyReturnPolicySpace(return_policy_response)
+        return_policy = EtsyReturnPolicy.get_existing(session, return_policy_space.return_policy_id)
+        if return_policy is None:
+            return_policy = EtsyReturnPolicy.create(return_policy_space, shop=shop, listings=[listing])
+            session.add(return_policy)
+            session.flush()
+        else:
+            if return_policy.update(return_policy_space, listings=[listing], shop=shop):
+                session.flush()
+
+        shipping_profile = None
+        if listing_space.listing_type == Etsy.ListingType.PHYSICAL:
+            shipping_profile_response = transaction_data['shipping_profile']
+            shipping_profile_space = EtsyShippingProfileSpace(shipping_profile_response)
+            shipping_profile = EtsyShippingProfile.get_existing(session,
+                                                                shipping_profile_space.shipping_profile_id)
+            if shipping_profile is None:
+                shipping_profile = EtsyShippingProfile.create(shipping_profile_space, seller=seller,
+                                                              listings=[listing])
+                session.add(shipping_profile)
+                session.flush()
+            else:
+                if shipping_profile.update(shipping_profile_response, listings=[listing], seller=seller):
+                    session.flush()
+
+        production_partners = EtsyProductionPartner.bulk_upsert(session, [
+            EtsyProductionPartnerSpace(production_partner)
+            for production_partner in transaction_data['production_partners']['results']
+        ])
+
+        # overwrite_list=True will solve the problem of removed production partners
+        listing.update(production_partners=production_partners, overwrite_list=True)
+
+        if listing_space.listing_type == Etsy.ListingType.PHYSICAL:
+            shipping_upgrades = EtsyShippingProfileUpgrade.bulk_upsert(session, [
+                EtsyShippingProfileUpgradeSpace(shipping_upgrade)
+                for shipping_upgrade in transaction_data['shipping_upgrades']['results']
+            ])
+
+            shipping_destinations = EtsyShippingProfileDestination.bulk_upsert(session, [
+                EtsyShippingProfileDestinationSpace(shipping_destination)
+                for shipping_destination in transaction_data['shipping_destinations']['results']
+            ])
+
+            # overwrite_lists=True solves the problem of removed shipping upgrades or destinations
+            shipping_profile.update(upgrades=shipping_upgrades, destinations=shipping_destinations,
+                                    overwrite_lists=True)
+
+        # Update / create a product record from the prefetched product info
+        product_response = transaction_data['product']
+        product_space = EtsyProductSpace(product_response)
+
+        offerings = EtsyOffering.bulk_upsert(session, [EtsyOfferingSpace(offering)
+                                                       for offering in product_space.offerings])
+
+        product = EtsyProduct.get_existing(session, product_space.product_id)
+        if product is None:
+            product = EtsyProduct.create(product_space, properties=product_properties, listings=[listing],
+                                         offerings=offerings)
+            session.add(product)
+            session.flush()
+        else:
+            changed_columns = product.update(product_space, listings=[listing])
+
+            # overwrite_lists=True solves the problem of removed product properties or offerings
+            product.update(properties=product_properties, offerings=offerings, overwrite_lists=True)
+            if changed_columns:
+                session.flush()
+
+        # Check for existing transaction
+        transaction = EtsyTransaction.get_existing(session, transaction_space.transaction_id)
+        if transaction is None:
+            transaction = EtsyTransaction.create(
+                transaction_space,
+                buyer=buyer, seller=seller, product=product, shipping_profile=shipping_profile,
+                product_properties=product_properties)
+            session.add(transaction)
+            session.flush()
+        else:
+            changed_columns = transaction.update(transaction_space, buyer=buyer, seller=seller, product=product,
+                                                 shipping_profile=shipping_profile)
+
+            # overwrite_lists=True solves the problem of removed product properties
+            transaction.update(product_properties=product_properties, overwrite_list=True)
+            if changed_columns:
+                session.flush()
+        transactions.append(transaction)
+
+    order_status = OrderStatus.INCOMPLETE
+    if receipt_space.status == Etsy.OrderStatus.CANCELED:
+        order_status = OrderStatus.CANCELED
+    elif receipt_space.status == Etsy.OrderStatus.COMPLETED:
+        order_status = OrderStatus.COMPLETE
+    needs_fulfillment = order_status == OrderStatus.INCOMPLETE and listing.listing_type.value == 'physical'
+    if receipt_c is None:
+        receipt_c = EtsyReceipt.create(receipt_space, needs_fulfillment=needs_fulfillment,
+                                       order_status=order_status, address=address, buyer=buyer, seller=seller,
+                                       transactions=transactions, refunds=refunds,
+                                       receipt_shipments=receipt_shipments)
+        session.add(receipt_c)
+        session.flush()
+    else:
+        # Updating of the address and cancellation status will be communicated to Prodigi semi-manually
+        changed_columns = receipt_c.update(receipt_space, order_status=order_status,
+                                           address=address, buyer=buyer, seller=seller, transactions=transactions,
+                                           receipt_shipments=receipt_shipments)
+
+        # Refunds don't have an ID so just going to overwrite them every time and delete the orphaned ones
+        receipt_c.update(refunds=refunds, overwrite_list=True)
+        if changed_columns:
+            session.flush()
+
+
+def _fetch_receipts_by_id(etsy_api: EtsyAPI, receipt_ids: Iterable[int]) -> Iterator[Dict[str, Any]]:
+    for receipt_id in receipt_ids:
+        try:
+            yield etsy_api.get_receipt(receipt_id)
+        except Exception as e:
+            send_mail(f"Get Etsy Orders Error for receipt: {receipt_id}", str(traceback.format_exc()))
+
+
+def sync_receipts(session: Session, etsy_api: EtsyAPI, receipts: Iterable[Dict[str, Any]], batch_size: int = 100,
+                  max_concurrency: int = 8, sync_state: SyncState = None) -> Tuple[Set[int], Set[int]]:
+    """
+    Syncs receipts in batches, committing after each batch, and returns the ids of the receipts seen and of the ones
+    that failed.
+
+    Args:
+        session (Session): Database session
+        etsy_api (EtsyAPI): Client the receipts are streamed from, its reference cache is shared with the async client
+        receipts (Iterable[Dict[str, Any]]): Receipts as returned by the Etsy API
+        batch_size (int): Number of receipts fetched and committed together
+        max_concurrency (int): Maximum simultaneous requests while fetching the data for a batch
+        sync_state (SyncState): If given, receipts must arrive least recently modified first. The cursor is moved up to
+            each synced receipt's updated_timestamp but never past a receipt that failed, so the next run retries it
+    """
+    seen_ids = set()
+    failed_ids = set()
+    cursor_blocked = False
+    for batch in chunked(receipts, batch_size):
+        seen_ids.update(int(receipt['receipt_id']) for receipt in batch)
+
+        # Skip any complete or canceled orders before making any calls for them
+        to_sync = []
+        for receipt in batch:
+            receipt_c = EtsyReceipt.get_existing(session, receipt['receipt_id'])
+            if receipt_c is None or receipt_c.order_status == OrderStatus.INCOMPLETE:
+                to_sync.append(receipt)
+
+        print(f"Processing {len(to_sync)} orders")
+        receipts_data = asyncio.run(fetch_receipts_data(to_sync, etsy_api.reference_cache, max_concurrency))
+
+        for receipt, receipt_data in zip(to_sync, receipts_data):
+            try:
+                if isinstance(receipt_data, Exception):
+                    raise receipt_data
+
+                sync_receipt(session, receipt, receipt_data)
+
+            except Exception as e:
+                failed_ids.add(int(receipt['receipt_id']))
+                send_mail(f"Get Etsy Orders Error for receipt: {receipt['receipt_id']}",
+                          str(traceback.format_exc()))
+
+        if sync_state is not None and not cursor_blocked:
+            for receipt in batch:
+                if int(receipt['receipt_id']) in failed_ids:
+                    cursor_blocked = True
+                    break
+                if receipt.get('updated_timestamp') is not None:
+                    sync_state.update(min_last_modified=datetime.utcfromtimestamp(receipt['updated_timestamp']))
+
+        session.commit()
+
+    return seen_ids, failed_ids
 
-        # Our database
-        min_created = None
 
-        earliest_incomplete_order = session.query(EtsyReceipt).filter(
-            EtsyReceipt.order_status == OrderStatus.INCOMPLETE
-        ).order_by(
-            EtsyReceipt.create_timestamp.asc()
-        ).first()
+def incomplete_receipt_ids_query(session: Session) -> Query:
+    return session.query(EtsyReceipt.receipt_id).filter(
+        EtsyReceipt.order_status == OrderStatus.INCOMPLETE
+    )
 
-        if earliest_incomplete_order is None:
-            last_order = session.query(EtsyReceipt).order_by(
-                EtsyReceipt.create_timestamp.desc()
-            ).first()
 
-            if last_order is not None:
-                min_created = last_order.create_timestamp
+def earliest_incomplete_receipt_query(session: Session) -> Query:
+    return session.query(EtsyReceipt).filter(
+        EtsyReceipt.order_status == OrderStatus.INCOMPLETE
+    ).order_by(
+        EtsyReceipt.create_timestamp.asc()
+    )
+
+
+def latest_receipt_query(session: Session) -> Query:
+    return session.query(EtsyReceipt).order_by(
+        EtsyReceipt.create_timestamp.desc()
+    )
+
+
+def get_etsy_orders(max_concurrency: int = 8, batch_size: int = 100, mode: str = 'incremental'):
+    """
+    Syncs Etsy receipts into the database.
+
+    Args:
+        max_concurrency (int): Maximum simultaneous requests to Etsy while fetching the data for a batch of receipts
+        batch_size (int): Number of receipts fetched and committed together
+        mode (str): incremental only fetches the receipts modified since the last run, and refreshes the incomplete
+            receipts that were not among them by id. full fetches every receipt created since the earliest incomplete
+            one. Falls back to full if there has been no successful run yet
+    """
+    # Refreshes the access token that the async client reads from the secrets file
+    etsy_api = EtsyAPI()
+    run_started = datetime.utcnow()
+
+    with Session(make_engine()) as session:
+        sync_state = SyncState.get_existing(session, etsy_api.store_id)
+        if sync_state is None:
+            sync_state = SyncState.create(etsy_api.store_id)
+            session.add(sync_state)
+
+        if mode == 'incremental' and sync_state.min_last_modified is not None:
+            receipts_iter = etsy_api.iter_receipts(
+                min_last_modified=int(sync_state.min_last_modified.replace(tzinfo=timezone.utc).timestamp()),
+                page_size=batch_size, prefetch=True)
+            seen_ids, _ = sync_receipts(session, etsy_api, receipts_iter, batch_size, max_concurrency,
+                                        sync_state=sync_state)
+
+            # Incomplete receipts Etsy has not touched since the last run are refreshed by id, so a stuck order costs
+            # one lookup instead of dragging every receipt created after it into the run
+            incomplete_ids = [receipt_id for receipt_id, in incomplete_receipt_ids_query(session)
+                              if receipt_id not in seen_ids]
+            sync_receipts(session, etsy_api, _fetch_receipts_by_id(etsy_api, incomplete_ids), batch_size,
+                          max_concurrency)
 
         else:
-            min_created = earliest_incomplete_order.create_timestamp
+            # Our database
+            min_created = None
 
-        # Etsy API
-        orders = etsy_api.get_receipts(min_created=min_created.replace(tzinfo=timezone.utc).timestamp()
-            if min_created is not None else None)
+            earliest_incomplete_order = earliest_incomplete_receipt_query(session).first()
 
-        print(f"Processing {orders['count']} orders")
-        for receipt in orders['results']:
-            try:
-                receipt_space = EtsyReceipt.create_namespace(receipt)
-
-                # Check if receipt exists
-                receipt_c = EtsyReceipt.get_existing(session, receipt_space.receipt_id)
-
-                # Skip any complete or canceled orders
-                if receipt_c is not None:
-                    if receipt_c.order_status != OrderStatus.INCOMPLETE:
-                        continue
-
-                # Check if the address exists
-                address = Address.get_existing(session, receipt_space.zip, receipt_space.city, receipt_space.state,
-                                               receipt_space.country, receipt_space.first_line, receipt_space.second_line)
-                if address is None:
-                    address = Address.create(receipt)
-                    session.add(address)
-                    session.flush()
-                else:
-                    # Nothing to update, if anything changes it becomes a different address
-                    address = address
-
-                # Check if the buyer exists
-                buyer = EtsyBuyer.get_existing(session, receipt_space.buyer_id)
-                if buyer is None:
-                    buyer = EtsyBuyer.create(receipt, addresses=[address])
-                    session.add(buyer)
-                    session.flush()
-                else:
-                    buyer.update(receipt, addresses=[address])
-                    session.flush()
+            if earliest_incomplete_order is None:
+                last_order = latest_receipt_query(session).first()
 
-                # Check if the seller exists
-                seller = EtsySeller.get_existing(session, receipt_space.seller_id)
-                if seller is None:
-                    seller = EtsySeller.create(receipt)
-                    session.add(seller)
-                    session.flush()
-                else:
-                    seller.update(receipt)
-                    session.flush()
+                if last_order is not None:
+                    min_created = last_order.create_timestamp
 
-                # Create new shipments
-                receipt_shipments = []
-                for shipment_dict in receipt_space.shipments:
-                    shipment_space = EtsyReceiptShipmentSpace(shipment_dict)
-                    if shipment_space.receipt_shipping_id is not None:
-                        receipt_shipment = EtsyReceiptShipment.get_existing(session, shipment_space.receipt_shipping_id)
-                        if receipt_shipment is None:
-                            receipt_shipment = EtsyReceiptShipment.create(shipment_space)
-                            session.add(receipt_shipment)
-                            session.flush()
-                        else:
-                            receipt_shipment.update(shipment_space)
-                            session.flush()
-                        receipt_shipments.append(receipt_shipment)
-
-                # Create new refunds
-                refunds = []
-                for refund_dict in receipt_space.refunds:
-                    refund_space = EtsyRefundSpace(refund_dict)
-                    refund = EtsyRefund.create(refund_space)
-                    refunds.append(refund)
-
-                # Create new transactions
-                transactions = []
-                for transaction_dict in receipt_space.transactions:
-                    transaction_space = EtsyTransaction.create_namespace(transaction_dict)
-
-                    # Get list of existing / created product properties
-                    product_properties = []
-                    for property_data in transaction_space.product_property_data:
-                        property_data_space = EtsyProductPropertySpace(property_data)
-                        product_property = EtsyProductProperty.get_existing(session, property_data_space.property_id,
-                                                                            property_data_space.property_name)
-                        if product_property is None:
-                            product_property = EtsyProductProperty.create(property_data)
-                            session.add(product_property)
-                            session.flush()
-                        else:
-                            product_property.update(property_data)
-                            session.flush()
-                        product_properties.append(product_property)
-
-                    # Call endpoint to get more info about listing, then update / create a listing record
-                    listing_response = etsy_api.get_listing(transaction_space.listing_id)
-                    listing_space = EtsyListingSpace(listing_response)
-                    listing = EtsyListing.get_existing(session, listing_space.listing_id)
-                    if listing is None:
-                        listing = EtsyListing.create(listing_space, seller=seller)
-                        session.add(listing)
-                        session.flush()
-                    else:
-                        listing.update(listing_space, seller=seller)
-                        session.flush()
-
-                    if listing_space.state in [Etsy.ListingState.EXPIRED, Etsy.ListingState.INACTIVE,
-                                               Etsy.ListingState.SOLD_OUT]:
-                        send_mail(f'Listing {listing_space.listing_id} {listing_space.state.value}',
-                                  f'The subject listing is {listing_space.state.value}')
-
-                    shop_response = etsy_api.get_shop(listing_space.shop_id)
-                    shop_space = EtsyShopSpace(shop_response)
-                    shop = EtsyShop.get_existing(session, shop_space.shop_id)
-                    if shop is None:
-                        shop = EtsyShop.create(shop_space, seller=seller, listings=[listing])
-                        session.add(shop)
-                        session.flush()
-                    else:
-                        shop.update(shop_space, seller=seller, listings=[listing])
-                        session.flush()
-
-                    # Listing should be part of a section but possible that it isn't
-                    if listing_space.shop_section_id is not None:
-                        shop_section_response = etsy_api.get_shop_section(listing_space.shop_id,
-                                                                          listing_space.shop_section_id)
-                        shop_section_space = EtsyShopSectionSpace(shop_section_response)
-                        shop_section = EtsyShopSection.get_existing(session, shop_section_space.shop_section_id)
-                        if shop_section is None:
-                            shop_section = EtsyShopSection.create(shop_section_space, seller=seller, listings=[listing],
-                                                                  shop=shop)
-                            session.add(shop_section)
-                            session.flush()
-                        else:
-                            shop_section.update(shop_section_space, seller=seller, listings=[listing], shop=shop)
-                            session.flush()
-
-                    return_policy_response = etsy_api.get_return_policy(listing_space.shop_id,
-                                                                        listing_space.return_policy_id)
-                    return_policy_space = EtsyReturnPolicySpace(return_policy_response)
-                    return_policy = EtsyReturnPolicy.get_existing(session, return_policy_space.return_policy_id)
-                    if return_policy is None:
-                        return_policy = EtsyReturnPolicy.create(return_policy_space, shop=shop, listings=[listing])
-                        session.add(return_policy)
-                        session.flush()
-                    else:
-                        return_policy.update(return_policy_space, listings=[listing], shop=shop)
-                        session.flush()
-
-                    shipping_profile = None
-                    if listing_space.listing_type == Etsy.ListingType.PHYSICAL:
-                        shipping_profile_response = etsy_api.get_shipping_profile(listing_space.shop_id,
-                                                                                  listing_space.shipping_profile_id)
-                        shipping_profile_space = EtsyShippingProfileSpace(shipping_profile_response)
-                        shipping_profile = EtsyShippingProfile.get_existing(session,
-                                                                            shipping_profile_space.shipping_profile_id)
-                        if shipping_profile is None:
-                            shipping_profile = EtsyShippingProfile.create(shipping_profile_space, seller=seller,
-                                                                          listings=[listing])
-                            session.add(shipping_profile)
-                            session.flush()
-                        else:
-                            shipping_profile.update(shipping_profile_response, listings=[listing], seller=seller)
-                            session.flush()
-
-                    production_partners = []
-                    production_partners_response = etsy_api.get_production_partners(listing_space.shop_id)
-                    for production_partner in production_partners_response['results']:
-                        production_partner_space = EtsyProductionPartnerSpace(production_partner)
-                        production_partner = EtsyProductionPartner.get_existing(
-                            session,
-                            production_partner_space.production_partner_id)
-                        if production_partner is None:
-                            production_partner = EtsyProductionPartner.create(production_partner_space)
-                            session.add(production_partner)
-                            session.flush()
-                        else:
-                            production_partner.update(production_partner)
-                            session.flush()
-                        production_partners.append(production_partner)
-
-                    # overwrite_list=True will solve the problem of removed production partners
-                    listing.update(production_partners=production_partners, overwrite_list=True)
-
-                    if listing_space.listing_type == Etsy.ListingType.PHYSICAL:
-                        shipping_upgrades = []
-                        shipping_upgrades_response = etsy_api.get_shop_shipping_profile_upgrades(
-                            listing_space.shop_id, listing_space.shipping_profile_id)
-                        for shipping_upgrade in shipping_upgrades_response['results']:
-                            shipping_upgrade_space = EtsyShippingProfileUpgradeSpace(shipping_upgrade)
-                            shipping_upgrade = EtsyShippingProfileUpgrade.get_existing(session,
-                                                                                       shipping_upgrade_space.upgrade_id)
-                            if shipping_upgrade is None:
-                                shipping_upgrade = EtsyShippingProfileUpgrade.create(shipping_upgrade_space)
-                                session.add(shipping_upgrade)
-                                session.flush()
-                            else:
-                                shipping_upgrade.update(shipping_upgrade_space)
-                                session.flush()
-                            shipping_upgrades.append(shipping_upgrade)
-
-                        shipping_destinations = []
-                        shipping_destinations_requests = etsy_api.get_shop_shipping_profile_destinations(
-                            listing_space.shop_id, listing_space.shipping_profile_id)
-                        for shipping_destination in shipping_destinations_requests['results']:
-                            shipping_destination_space = EtsyShippingProfileDestinationSpace(shipping_destination)
-                            shipping_destination = EtsyShippingProfileDestination.get_existing(
-                                session, shipping_destination_space.shipping_profile_destination_id)
-                            if shipping_destination is None:
-                                shipping_destination = EtsyShippingProfileDestination.create(shipping_destination_space)
-                                session.add(shipping_destination)
-                                session.flush()
-                            else:
-                                shipping_destination.update(shipping_destination_space)
-                                session.flush()
-                            shipping_destinations.append(shipping_destination)
-
-                        # overwrite_lists=True solves the problem of removed shipping upgrades or destinations
-                        shipping_profile.update(upgrades=shipping_upgrades, destinations=shipping_destinations,
-                                                overwrite_lists=True)
-
-                    # Call endpoint to get more info about the product, then update / create a product record
-                    product_response = etsy_api.get_listing_product(transaction_space.listing_id,
-                                                                    transaction_space.product_id)
-                    product_space = EtsyProductSpace(product_response)
-
-                    offerings = []
-                    for offering in product_space.offerings:
-                        offering_space = EtsyOfferingSpace(offering)
-                        offering = EtsyOffering.get_existing(session, offering_space.offering_id)
-                        if offering is None:
-                            offering = EtsyOffering.create(offering_space)
-                            session.add(offering)
-                            session.flush()
-                        else:
-                            offering.update(offering_space)
-                            session.flush()
-                        offerings.append(offering)
-
-                    product = EtsyProduct.get_existing(session, product_space.product_id)
-                    if product is None:
-                        product = EtsyProduct.create(product_space, properties=product_properties, listings=[listing],
-                                                     offerings=offerings)
-                        session.add(product)
-                        session.flush()
-                    else:
-                        product.update(product_space, listings=[listing])
-
-                        # overwrite_lists=True solves the problem of removed product properties or offerings
-                        product.update(properties=product_properties, offerings=offerings, overwrite_lists=True)
-                        session.flush()
-
-                    # Check for existing transaction
-                    transaction = EtsyTransaction.get_existing(session, transaction_space.transaction_id)
-                    if transaction is None:
-                        transaction = EtsyTransaction.create(
-                            transaction_space,
-                            buyer=buyer, seller=seller, product=product, shipping_profile=shipping_profile,
-                            product_properties=product_properties)
-                        session.add(transaction)
-                        session.flush()
-                    else:
-                        transaction.update(transaction_space, buyer=buyer, seller=seller, product=product,
-                                           shipping_profile=shipping_profile)
-
-                        # overwrite_lists=True solves the problem of removed product properties
-                        transaction.update(product_properties=product_properties, overwrite_list=True)
-                        session.flush()
-                    transactions.append(transaction)
-
-                order_status = OrderStatus.INCOMPLETE
-                if receipt_space.status == Etsy.OrderStatus.CANCELED:
-                    order_status = OrderStatus.CANCELED
-                elif receipt_space.status == Etsy.OrderStatus.COMPLETED:
-                    order_status = OrderStatus.COMPLETE
-                needs_fulfillment = order_status == OrderStatus.INCOMPLETE and listing.listing_type.value == 'physical'
-                if receipt_c is None:
-                    receipt_c = EtsyReceipt.create(receipt_space, needs_fulfillment=needs_fulfillment,
-                                                   order_status=order_status, address=address, buyer=buyer, seller=seller,
-                                                   transactions=transactions, refunds=refunds,
-                                                   receipt_shipments=receipt_shipments)
-                    session.add(receipt_c)
-                    session.flush()
-                else:
-                    # Updating of the address and cancellation status will be communicated to Prodigi semi-manually
-                    receipt_c.update(receipt_space, order_status=order_status,
-                                     address=address, buyer=buyer, seller=seller, transactions=transactions,
-                                     receipt_shipments=receipt_shipments)
-
-                    # Refunds don't have an ID so just going to overwrite them every time and delete the orphaned ones
-                    receipt_c.update(refunds=refunds, overwrite_list=True)
-                    session.flush()
+            else:
+                min_created = earliest_incomplete_order.create_timestamp
 
-            except Exception as e:
-                send_mail(f"Get Etsy Orders Error for receipt: {receipt['receipt_id']}",
-                          str(traceback.format_exc()))
+            # Etsy API. Receipts are streamed a page at a time and synced in batches so memory stays flat however
+            # large the backlog is
+            receipts_iter = etsy_api.iter_receipts(
+                min_created=min_created.replace(tzinfo=timezone.utc).timestamp() if min_created is not None else None,
+                page_size=batch_size, prefetch=True)
+            _, failed_ids = sync_receipts(session, etsy_api, receipts_iter, batch_size, max_concurrency)
+
+            # A clean full run covers everything modified before it started, so incremental runs can pick up from there
+            if not failed_ids:
+                sync_state.update(min_last_modified=run_started)
 
+        sync_state.update(last_run_timestamp=run_started)
         session.commit()
 
+    cache_stats = etsy_api.reference_cache.stats()
+    print(f"Reference data cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', type=str, choices=['incremental', 'full'], default='incremental',
+                        help='incremental only fetches receipts modified since the last run and refreshes incomplete '
+                             'receipts by id. full fetches every receipt created since the earliest incomplete one')
+    parser.add_argument('--batch_size', type=int, default=100,
+                        help='Number of receipts fetched and committed together')
+    parser.add_argument('--max_concurrency', type=int, default=8,
+                        help='Maximum simultaneous requests to Etsy')
+    args = parser.parse_args()
+
     try:
-        get_etsy_orders()
+        get_etsy_orders(max_concurrency=args.max_concurrency, batch_size=args.batch_size, mode=args.mode)
     except Exception as e:
         send_mail('Get Etsy Orders Error', str(e))
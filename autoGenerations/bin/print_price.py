@@ -1,45 +1,132 @@
-from typing import Union
+from typing import Union, List, Dict, Tuple, NamedTuple, Iterator
 import argparse
 import csv
+import json
 import os.path
 import math
 
 PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 
+PRICE_SHEET_PATHS = [
+    os.path.join(PROJECT_DIR, 'prodigi_price_sheets', 'prodigi-prints-photo-art-prints-us.csv'),
+    os.path.join(PROJECT_DIR, 'prodigi_price_sheets', 'prodigi-prints-fine-art-prints-us.csv')
+]
+
+# Parsed price sheets, rebuilt whenever one of the sheets is modified
+PRICE_CATALOG_CACHE_PATH = os.path.join(PROJECT_DIR, 'prodigi_price_sheets', 'price_catalog_cache.json')
+
+# Selling price = ceil((product price + shipping price) * MARKUP * ETSY_FEE_MULTIPLIER) - PRICE_ENDING
+MARKUP = 1.50
+ETSY_FEE_MULTIPLIER = 1.065  # pass on 6.5% etsy charge to customer
+PRICE_ENDING = 0.05
+
+
+class SheetPrice(NamedTuple):
+    product_price: float
+    shipping_price: float
+
+
+class PriceCatalog:
+    """
+    The Prodigi price sheets indexed by (SKU, shipping method, destination country). The sheets are only parsed when
+    they changed since the cache at cache_path was written, every lookup after that is a dict access
+
+    Args:
+        price_sheet_paths (List[str]): Prodigi price sheet CSVs. Rows of earlier sheets win over later ones
+        cache_path (str): JSON cache of the parsed sheets. None disables the cache
+    """
+
+    def __init__(self, price_sheet_paths: List[str] = None, cache_path: Union[str, None] = PRICE_CATALOG_CACHE_PATH):
+        self.price_sheet_paths = list(price_sheet_paths) if price_sheet_paths is not None else PRICE_SHEET_PATHS
+        self.cache_path = cache_path
+        self._prices: Dict[Tuple[str, str, str], SheetPrice] = {}
+
+        sources = {path: os.path.getmtime(path) for path in self.price_sheet_paths}
+        rows = self._read_cache(sources)
+        if rows is None:
+            rows = self._read_sheets()
+            self._write_cache(sources, rows)
+
+        for sku, shipping_method, destination_country, product_price, shipping_price in rows:
+            self._prices.setdefault((sku, shipping_method, destination_country),
+                                    SheetPrice(product_price, shipping_price))
+
+    def __len__(self):
+        return len(self._prices)
+
+    def items(self) -> Iterator[Tuple[Tuple[str, str, str], SheetPrice]]:
+        return iter(self._prices.items())
+
+    def lookup(self, sku: str, shipping_method: str = 'Budget',
+               destination_country: str = 'US') -> Union[SheetPrice, None]:
+        return self._prices.get((sku, shipping_method, destination_country))
+
+    def _read_sheets(self) -> List[list]:
+        rows = []
+        for price_sheet_path in self.price_sheet_paths:
+            with open(price_sheet_path, 'r') as f:
+                for row in csv.DictReader(f):
+                    rows.append([row['SKU'], row['Shipping method'], row['Destination country'],
+                                 float(row['Product price']), float(row['Shipping price'])])
+        return rows
+
+    def _read_cache(self, sources: Dict[str, float]) -> Union[List[list], None]:
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get('sources') != sources:
+            return None
+        return cache['rows']
+
+    def _write_cache(self, sources: Dict[str, float], rows: List[list]):
+        if self.cache_path is None:
+            return
+        # Written to a temporary file first so a concurrent reader never sees half a cache
+        tmp_path = f'{self.cache_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'sources': sources, 'rows': rows}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_path)
+
+
+_catalogs: Dict[Tuple[str, ...], PriceCatalog] = {}
+
+
+def get_price_catalog(price_sheet_paths: List[str] = None) -> PriceCatalog:
+    """
+    Returns the PriceCatalog for price_sheet_paths, loading it on first use so a batch of listings only reads the price
+    sheets once
+    """
+    key = tuple(price_sheet_paths if price_sheet_paths is not None else PRICE_SHEET_PATHS)
+    if key not in _catalogs:
+        _catalogs[key] = PriceCatalog(list(key))
+    return _catalogs[key]
+
 
 def calc_price(prodigi_sku: str, price_sheet_path: str = None) -> Union[str, None]:
-    if price_sheet_path is not None:
-        price_sheet_paths = [price_sheet_path]
-    else:
-        price_sheet_paths = [
-            os.path.join(PROJECT_DIR, 'prodigi_price_sheets', 'prodigi-prints-photo-art-prints-us.csv'),
-            os.path.join(PROJECT_DIR, 'prodigi_price_sheets', 'prodigi-prints-fine-art-prints-us.csv')
-        ]
-
-    for price_sheet_path in price_sheet_paths:
-        with open(price_sheet_path, 'r') as f:
-            dict_reader = csv.DictReader(f)
-            for row in dict_reader:
-                if row['SKU'] == prodigi_sku and row['Shipping method'] == 'Budget':
-                    # Can only have one shipping profile per variation so fix shipping cost to $10 and pass on
-                    # difference
-                    shipping_price = float(row['Shipping price'])
-                    product_price = float(row['Product price'])
-                    total_cost =  product_price + shipping_price
-
-                    # 30% profit
-                    selling_price = total_cost * 1.50
-
-                    # pass on 6.5% etsy charge to customer
-                    selling_price *= 1.065
-
-                    selling_price = math.ceil(selling_price) - 0.05
-
-                    print(f'Selling price: {selling_price}, profit {selling_price - total_cost}')
-                    return str(selling_price)
-
-    print(f'Could not find SKU in {price_sheet_path}')
-    return None
+    price_sheet_paths = [price_sheet_path] if price_sheet_path is not None else PRICE_SHEET_PATHS
+    sheet_price = get_price_catalog(price_sheet_paths).lookup(prodigi_sku, 'Budget')
+    if sheet_price is None:
+        print(f'Could not find SKU in {price_sheet_paths[-1]}')
+        return None
+
+    # Can only have one shipping profile per variation so fix shipping cost to $10 and pass on
+    # difference
+    total_cost = sheet_price.product_price + sheet_price.shipping_price
+
+    # 30% profit
+    selling_price = total_cost * MARKUP
+
+    # pass on 6.5% etsy charge to customer
+    selling_price *= ETSY_FEE_MULTIPLIER
+
+    selling_price = math.ceil(selling_price) - PRICE_ENDING
+
+    print(f'Selling price: {selling_price}, profit {selling_price - total_cost}')
+    return str(selling_price)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,26 @@
+import argparse
+import glob
+import os
+
+from utilities.mockups import create_mockup_images_batch, IMAGE_POSITIONS
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Renders the mockup images of many product images across all cores')
+    parser.add_argument('input_images', type=str, nargs='+', help='Product image paths or glob patterns')
+    parser.add_argument('--out_dir', '-o', type=str, required=True, help='Directory the mockups of each product '
+                                                                         'image are written to, one folder per image')
+    parser.add_argument('--style', type=str, default='simple_2:3', choices=list(IMAGE_POSITIONS.keys()))
+    parser.add_argument('--max_workers', type=int, required=False, help='Number of worker processes. Defaults to the '
+                                                                        'number of cores')
+    args = parser.parse_args()
+
+    input_image_paths = []
+    for pattern in args.input_images:
+        matches = sorted(glob.glob(pattern))
+        input_image_paths += matches if matches else [pattern]
+
+    outpaths = create_mockup_images_batch([os.path.abspath(path) for path in input_image_paths], args.out_dir,
+                                          style=args.style, max_workers=args.max_workers)
+    for input_image_path, image_outpaths in outpaths.items():
+        print(f'{input_image_path}: {len(image_outpaths)} mockups')
@@ -0,0 +1,138 @@
+from typing import List, Dict, Tuple, TextIO
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from bin.print_price import PriceCatalog, MARKUP, ETSY_FEE_MULTIPLIER, PRICE_ENDING, PRICE_SHEET_PATHS
+from database.tables import EtsyOffering, EtsyProduct
+from database.utils import make_engine
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
+
+DIFF_COLUMNS = ['offering_id', 'product_id', 'etsy_sku', 'prodigi_sku', 'current_price', 'new_price']
+PRICE_COLUMNS = ['prodigi_sku', 'shipping_method', 'destination_country', 'total_cost', 'selling_price']
+
+
+def selling_prices(total_costs: np.ndarray) -> np.ndarray:
+    """
+    Vectorized calc_price: the same markup, etsy fee and rounding applied to a whole array of costs at once
+    """
+    return np.ceil(total_costs * MARKUP * ETSY_FEE_MULTIPLIER) - PRICE_ENDING
+
+
+def price_table(catalog: PriceCatalog) -> Tuple[List[Tuple[str, str, str]], np.ndarray, np.ndarray]:
+    """
+    Prices every (SKU, shipping method, destination country) in the catalog in one pass
+
+    Returns:
+        The catalog keys and, aligned with them, the total costs and the selling prices
+    """
+    keys, sheet_prices = zip(*catalog.items())
+    total_costs = np.array(sheet_prices, dtype=np.float64).sum(axis=1)
+    return list(keys), total_costs, selling_prices(total_costs)
+
+
+def offering_diff(session: Session, keys: List[Tuple[str, str, str]], prices: np.ndarray,
+                  sku_map: Dict[str, Dict[str, str]], shipping_method: str = 'Budget',
+                  destination_country: str = 'US') -> Tuple[List[List], int]:
+    """
+    Compares the price of every active EtsyOffering with the price its Prodigi SKU sells for now
+
+    Args:
+        session (Session):
+        keys (List[Tuple[str, str, str]]): Catalog keys from price_table
+        prices (np.ndarray): Selling prices from price_table
+        sku_map (Dict[str, Dict[str, str]]): Etsy SKU to Prodigi SKU mapping (sku_map.json)
+        shipping_method (str): Shipping method the offerings are priced with
+        destination_country (str): Destination country the offerings are priced for
+
+    Returns:
+        One DIFF_COLUMNS row per offering whose price changes and the number of offerings that could not be priced
+    """
+    index = {key: i for i, key in enumerate(keys)}
+
+    offerings = session.execute(
+        select(EtsyOffering.offering_id, EtsyOffering.price, EtsyOffering.price_divisor, EtsyProduct.product_id,
+               EtsyProduct.sku)
+        .join(EtsyOffering.product)
+        .where(or_(EtsyOffering.is_deleted.is_(None), EtsyOffering.is_deleted.is_(False)))
+    ).all()
+
+    priced = []
+    positions = []
+    unpriced = 0
+    for offering in offerings:
+        prodigi_sku = sku_map.get(str(offering.sku), {}).get('prodigi_sku')
+        position = index.get((prodigi_sku, shipping_method, destination_country))
+        if position is None or offering.price is None:
+            unpriced += 1
+            continue
+        priced.append((offering, prodigi_sku))
+        positions.append(position)
+
+    if not priced:
+        return [], unpriced
+
+    current = np.array([offering.price for offering, _ in priced], dtype=np.int64)
+    divisors = np.array([offering.price_divisor or 100 for offering, _ in priced], dtype=np.int64)
+    new = np.rint(prices[np.array(positions)] * divisors).astype(np.int64)
+
+    rows = []
+    for i in np.flatnonzero(current != new):
+        offering, prodigi_sku = priced[i]
+        rows.append([offering.offering_id, offering.product_id, offering.sku, prodigi_sku,
+                     f'{current[i] / divisors[i]:.2f}', f'{new[i] / divisors[i]:.2f}'])
+    return rows, unpriced
+
+
+def write_csv(f: TextIO, columns: List[str], rows):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    writer.writerows(rows)
+
+
+def reprice_catalog(output_path: str = None, prices_output_path: str = None, price_sheet_paths: List[str] = None,
+                    shipping_method: str = 'Budget', destination_country: str = 'US'):
+    catalog = PriceCatalog(price_sheet_paths if price_sheet_paths is not None else PRICE_SHEET_PATHS)
+    keys, total_costs, prices = price_table(catalog)
+    print(f'Priced {len(keys)} SKU / shipping method / country combinations', file=sys.stderr)
+
+    if prices_output_path is not None:
+        with open(prices_output_path, 'w', newline='') as f:
+            write_csv(f, PRICE_COLUMNS, ([*key, f'{cost:.2f}', f'{price:.2f}']
+                                         for key, cost, price in zip(keys, total_costs, prices)))
+
+    with open(os.path.join(PROJECT_DIR, 'sku_map.json'), 'r') as f:
+        sku_map = json.load(f)
+
+    with Session(make_engine()) as session:
+        rows, unpriced = offering_diff(session, keys, prices, sku_map, shipping_method, destination_country)
+
+    if output_path is not None:
+        with open(output_path, 'w', newline='') as f:
+            write_csv(f, DIFF_COLUMNS, rows)
+    else:
+        write_csv(sys.stdout, DIFF_COLUMNS, rows)
+
+    print(f'{len(rows)} offerings need a new price, {unpriced} could not be priced', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reprices every Etsy offering from the Prodigi price sheets and '
+                                                 'writes the offerings whose price changes as CSV')
+    parser.add_argument('--output', '-o', type=str, required=False, help='Path of the diff CSV. Written to stdout if '
+                                                                         'None')
+    parser.add_argument('--prices_output', type=str, required=False, help='Also write the selling price of every '
+                                                                          'catalog entry to this CSV')
+    parser.add_argument('--price_sheet', type=str, action='append', required=False,
+                        help='Path to a Prodigi price sheet, can be repeated. Defaults will be used if None')
+    parser.add_argument('--shipping_method', type=str, default='Budget')
+    parser.add_argument('--destination_country', type=str, default='US')
+    args = parser.parse_args()
+    reprice_catalog(args.output, args.prices_output, args.price_sheet, args.shipping_method, args.destination_country)
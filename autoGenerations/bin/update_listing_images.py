@@ -8,8 +8,9 @@ import tempfile
 from apis.etsy import API as EtsyAPI
 from apis.openai import API as OpenaiAPI
 from apis.google_cloud import Storage
+from apis.uploads import ListingUploader, UploadPart, parts_from_paths
 from bin.print_price import calc_price
-from utilities.mockups import create_listing_images
+from utilities.mockups import iter_mockup_bytes, mockup_variants
 import numpy as np
 import urllib
 
@@ -21,30 +22,15 @@ def update_listing_images(listing_id: str, product_image_path: str, aspect_ratio
     etsy_api = EtsyAPI()
 
     if new_image_dir is None:
-        tempdir = tempfile.mkdtemp(prefix='mockups')
-        mockup_images = create_listing_images(product_image_path, tempdir, style=f'simple_{aspect_ratio}')
-        mockup_images.reverse()
+        # Rendered in memory and uploaded as each one is encoded, nothing is written to disk
+        style = f'simple_{aspect_ratio}'
+        mockup_images = iter_mockup_bytes(product_image_path, style, variants=mockup_variants(style)[::-1])
+        parts = (UploadPart(i + 1, file_name, content) for i, (file_name, content) in enumerate(mockup_images))
     else:
-        mockup_images = [os.path.join(new_image_dir, file) for file in os.listdir(new_image_dir)]
-
-    existing_images_response = etsy_api.get_listing_images(shop_id, listing_id)
-
-    for image in existing_images_response['results']:
-        image_id = str(image['listing_image_id'])
-        etsy_api.delete_listing_image(shop_id, listing_id, image_id)
-
-    for i, mock_image in enumerate(mockup_images):
-        # Can only have 10 images in listing
-        if i > 9:
-            continue
-
-        image_data = {
-            'image': open(mock_image, 'rb'),
-            'rank': i + 1,
-            'overwrite': True
-        }
-        response = etsy_api.upload_listing_image(shop_id=str(shop_id), listing_id=str(listing_id),
-                                                 image_data=image_data)
+        parts = parts_from_paths([os.path.join(new_image_dir, file) for file in os.listdir(new_image_dir)])
+
+    # Old images are deleted and new ones uploaded concurrently. Can only have 10 images in listing
+    ListingUploader(etsy_api, str(shop_id), str(listing_id)).replace_images(parts)
 
 
 if __name__ == '__main__':
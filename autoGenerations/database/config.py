@@ -7,6 +7,9 @@ PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 DATABASE_URL = f"sqlite:///{os.path.join(file, 'database.db')}"
 
+# Schema migrations. Run from the project directory: alembic upgrade head
+ALEMBIC_CONFIG = os.path.join(PROJECT_DIR, 'alembic.ini')
+
 # with open(os.path.join(PROJECT_DIR, 'database_secrets.json'), 'r') as f:
 #     database_secrets = json.load(f)
 
@@ -0,0 +1,23 @@
+"""Baseline: the schema as created by create_database before migrations were introduced
+
+Databases created before then should be stamped with this revision, then upgraded:
+    alembic stamp 0001
+    alembic upgrade head
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
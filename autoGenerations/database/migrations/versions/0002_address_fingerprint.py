@@ -0,0 +1,93 @@
+"""Address fingerprint: hashed lookup key with a unique index
+
+Backfills the fingerprint of every address and merges addresses that turn out to be the same once normalized, pointing
+their receipts, buyers and Prodigi recipients at the address that is kept.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+address = sa.table(
+    'address',
+    sa.column('id', sa.Integer),
+    sa.column('zip_code', sa.String),
+    sa.column('city', sa.String),
+    sa.column('state', sa.String),
+    sa.column('country', sa.String),
+    sa.column('first_line', sa.String),
+    sa.column('second_line', sa.String),
+    sa.column('fingerprint', sa.String)
+)
+receipt = sa.table('etsy_receipt', sa.column('_address_id', sa.Integer))
+buyer_address = sa.table('buyer_address_association_table',
+                         sa.column('buyer_id', sa.Integer), sa.column('address_id', sa.Integer))
+recipient_address = sa.table('recipient_address_association_table',
+                             sa.column('recipient_id', sa.Integer), sa.column('address_id', sa.Integer))
+
+
+def _fingerprint(zip_code, city, state, country, first_line, second_line) -> str:
+    # Frozen copy of Address.make_fingerprint as of this revision
+    fields = [' '.join(str(field).split()).casefold() if field is not None else ''
+              for field in (zip_code, city, state, country, first_line, second_line)]
+    return hashlib.sha256('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('address') as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(64)))
+
+    connection = op.get_bind()
+
+    kept = {}
+    duplicates = {}
+    fingerprints = []
+    for row in connection.execute(sa.select(
+            address.c.id, address.c.zip_code, address.c.city, address.c.state, address.c.country,
+            address.c.first_line, address.c.second_line).order_by(address.c.id)).fetchall():
+        fingerprint = _fingerprint(row.zip_code, row.city, row.state, row.country, row.first_line, row.second_line)
+        if fingerprint in kept:
+            duplicates[row.id] = kept[fingerprint]
+        else:
+            kept[fingerprint] = row.id
+            fingerprints.append({'address_id': row.id, 'address_fingerprint': fingerprint})
+
+    if fingerprints:
+        connection.execute(
+            address.update().where(address.c.id == sa.bindparam('address_id')).values(
+                fingerprint=sa.bindparam('address_fingerprint')),
+            fingerprints)
+
+    for duplicate_id, kept_id in duplicates.items():
+        connection.execute(receipt.update().where(receipt.c._address_id == duplicate_id).values(_address_id=kept_id))
+
+        for association, owner_column in ((buyer_address, buyer_address.c.buyer_id),
+                                          (recipient_address, recipient_address.c.recipient_id)):
+            # Owners already linked to the kept address just lose the duplicate link
+            already_linked = sa.select(owner_column).where(association.c.address_id == kept_id).scalar_subquery()
+            connection.execute(association.delete().where(association.c.address_id == duplicate_id,
+                                                          owner_column.in_(already_linked)))
+            connection.execute(association.update().where(association.c.address_id == duplicate_id).values(
+                address_id=kept_id))
+
+    duplicate_ids = list(duplicates)
+    for start in range(0, len(duplicate_ids), 500):
+        connection.execute(address.delete().where(address.c.id.in_(duplicate_ids[start:start + 500])))
+
+    op.create_index('ix_address_fingerprint', 'address', ['fingerprint'], unique=True)
+
+
+def downgrade():
+    # Merged duplicates are not split back up
+    op.drop_index('ix_address_fingerprint', table_name='address')
+    with op.batch_alter_table('address') as batch_op:
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,33 @@
+"""Indexes for the receipt and Prodigi status filters the bin scripts run on every pass
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_etsy_receipt_order_status_needs_fulfillment_status', 'etsy_receipt',
+     ['order_status', 'needs_fulfillment', 'status']),
+    ('ix_etsy_receipt_order_status_create_timestamp', 'etsy_receipt', ['order_status', 'create_timestamp']),
+    ('ix_etsy_receipt_create_timestamp', 'etsy_receipt', ['create_timestamp']),
+    ('ix_prodigi_order__etsy_receipt_id', 'prodigi_order', ['_etsy_receipt_id']),
+    ('ix_prodigi_status_stage', 'prodigi_status', ['stage']),
+    ('ix_prodigi_status__order_id', 'prodigi_status', ['_order_id']),
+    ('ix_prodigi_issue__status_id', 'prodigi_issue', ['_status_id'])
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
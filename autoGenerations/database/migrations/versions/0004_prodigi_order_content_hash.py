@@ -0,0 +1,24 @@
+"""Prodigi order content hash, so polls that return an unchanged order can be skipped
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left empty for existing orders, which are then fully updated once on their next poll
+    with op.batch_alter_table('prodigi_order') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(64)))
+
+
+def downgrade():
+    with op.batch_alter_table('prodigi_order') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,33 @@
+"""Sync state: high-water mark of the incremental receipt sync
+
+Databases that create_database built after SyncState was added already have the table, so it is only created when it
+is missing.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('sync_state'):
+        return
+
+    op.create_table(
+        'sync_state',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('shop_id', sa.BigInteger, unique=True),
+        sa.Column('min_last_modified', sa.DateTime),
+        sa.Column('last_run_timestamp', sa.DateTime)
+    )
+
+
+def downgrade():
+    op.drop_table('sync_state')
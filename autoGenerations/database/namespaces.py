@@ -1,4 +1,6 @@
-from typing import Dict, List, Any
+import json
+import hashlib
+from typing import Dict, List, Any, Callable, Tuple
 from database.enums import Etsy, Prodigi
 
 from datetime import datetime
@@ -30,6 +32,15 @@ def prodigi_timestamp_to_datetime(timestamp: str) -> datetime:
     return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S")
 
 
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """
+    sha256 of an API payload that does not depend on key order, used to tell whether anything in it changed since the
+    last time it was seen
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+                          ).hexdigest()
+
+
 def parse_value(input_dict: Dict[str, Any], *args):
     input_dict = input_dict
     value = None
@@ -45,574 +56,592 @@ def parse_value(input_dict: Dict[str, Any], *args):
     return value
 
 
-class EtsyReceiptSpace:
-    def __init__(self, receipt: Dict):
-        self.receipt_id = parse_value(receipt, 'receipt_id')
-        self.receipt_type = parse_value(receipt, 'receipt_type')
-        self.buyer_id = parse_value(receipt, 'buyer_user_id')
-        self.buyer_email = parse_value(receipt, 'buyer_email')
-        self.first_line = parse_value(receipt, 'first_line')
-        self.second_line = parse_value(receipt, 'second_line')
-        self.city = parse_value(receipt, 'city')
-        self.state = parse_value(receipt, 'state')
-        self.zip = parse_value(receipt, 'zip')
-        self.country = parse_value(receipt, 'country_iso')
-        self.seller_id = parse_value(receipt, 'seller_user_id')
-        self.seller_email = parse_value(receipt, 'seller_email')
-        self.status = Etsy.OrderStatus(parse_value(receipt, 'status').lower())
-        self.payment_method = parse_value(receipt, 'payment_method')
-        self.message_from_seller = parse_value(receipt, 'message_from_seller')
-        self.message_from_buyer = parse_value(receipt, 'message_from_buyer')
-        self.message_from_payment = parse_value(receipt, 'message_from_payment')
-        self.is_paid = parse_value(receipt, 'is_paid')
-        self.is_shipped = parse_value(receipt, 'is_shipped')
-        self.create_timestamp = datetime.utcfromtimestamp(parse_value(receipt, 'create_timestamp')) if \
-            parse_value(receipt, 'create_timestamp') is not None else None
-        self.created_timestamp = datetime.utcfromtimestamp(parse_value(receipt, 'created_timestamp')
-                                                           ) if parse_value(receipt,
-                                                                            'created_timestamp') is not None else None
-        self.update_timestamp = datetime.utcfromtimestamp(parse_value(receipt, 'update_timestamp')
-                                                          ) if parse_value(receipt,
-                                                                           'update_timestamp') is not None else None
-        self.updated_timestamp = datetime.utcfromtimestamp(parse_value(receipt, 'updated_timestamp')
-                                                           ) if parse_value(receipt,
-                                                                            'updated_timestamp') is not None else None
-        self.is_gift = parse_value(receipt, 'is_gift')
-        self.gift_message = parse_value(receipt, 'gift_message')
-        self.grand_total = parse_value(receipt, 'grandtotal', 'amount')
-        self.grand_total_divisor = parse_value(receipt, 'grandtotal', 'divisor')
-        self.grand_total_currency_code = parse_value(receipt, 'grandtotal', 'currency_code')
-        self.sub_total = parse_value(receipt, 'subtotal', 'amount')
-        self.sub_total_divisor = parse_value(receipt, 'subtotal', 'divisor')
-        self.sub_total_currency_code = parse_value(receipt, 'subtotal', 'currency_code')
-        self.total_price = parse_value(receipt, 'total_price', 'amount')
-        self.total_price_divisor = parse_value(receipt, 'total_price', 'divisor')
-        self.total_price_currency_code = parse_value(receipt, 'total_price', 'currency_code')
-        self.shipping_cost = parse_value(receipt, 'total_shipping_cost', 'amount')
-        self.shipping_cost_divisor = parse_value(receipt, 'total_shipping_cost', 'divisor')
-        self.shipping_cost_currency_code = parse_value(receipt, 'total_shipping_cost', 'currency_code')
-        self.tax_cost = parse_value(receipt, 'total_tax_cost', 'amount')
-        self.tax_cost_divisor = parse_value(receipt, 'total_tax_cost', 'divisor')
-        self.tax_cost_currency_code = parse_value(receipt, 'total_tax_cost', 'currency_code')
-        self.vat_cost = parse_value(receipt, 'total_vat_cost', 'amount')
-        self.vat_cost_divisor = parse_value(receipt, 'total_vat_cost', 'divisor')
-        self.vat_cost_currency_code = parse_value(receipt, 'total_vat_cost', 'currency_code')
-        self.discount = parse_value(receipt, 'discount_amt', 'amount')
-        self.discount_divisor = parse_value(receipt, 'discount_amt', 'divisor')
-        self.discount_currency_code = parse_value(receipt, 'discount_amt', 'currency_code')
-        self.gift_wrap_price = parse_value(receipt, 'gift_wrap_price', 'amount')
-        self.gift_wrap_price_divisor = parse_value(receipt, 'gift_wrap_price', 'divisor')
-        self.gift_wrap_price_currency_code = parse_value(receipt, 'gift_wrap_price', 'currency_code')
-        self.refunds = parse_value(receipt, 'refunds')
-        self.shipments = parse_value(receipt, 'shipments')
-        self.transactions = parse_value(receipt, 'transactions')
-
-
-class EtsyBuyerSpace:
-    def __init__(self, buyer_data: Dict):
-        self.buyer_id = parse_value(buyer_data, 'buyer_user_id')
-        self.email = parse_value(buyer_data, 'buyer_email')
-        self.name = parse_value(buyer_data, 'name')
-
-
-class EtsySellerSpace:
-    def __init__(self, seller_data: Dict):
-        self.seller_id = parse_value(seller_data, 'seller_user_id')
-        self.email = parse_value(seller_data, 'seller_email')
-
-
-class AddressSpace:
-    def __init__(self, address_data: Dict):
-        self.zip = parse_value(address_data, 'zip')
-        self.city = parse_value(address_data, 'city')
-        self.state = parse_value(address_data, 'state')
-        self.country = parse_value(address_data, 'country_iso')
-        self.first_line = parse_value(address_data, 'first_line')
-        self.second_line = parse_value(address_data, 'second_line')
-        self.formatted_address = parse_value(address_data, 'formatted_address')
-
-
-class EtsyTransactionSpace:
-    def __init__(self, transaction: Dict):
-        self.transaction_id = parse_value(transaction, 'transaction_id')
-        self.title = parse_value(transaction, 'title')
-        self.description = parse_value(transaction, 'description')
-        self.seller_user_id = parse_value(transaction, 'seller_user_id')
-        self.buyer_user_id = parse_value(transaction, 'buyer_user_id')
-        self.create_timestamp = datetime.utcfromtimestamp(parse_value(transaction, 'create_timestamp')
-                                                          ) if parse_value(transaction,
-                                                                           'create_timestamp') is not None else None
-        self.created_timestamp = datetime.utcfromtimestamp(parse_value(transaction, 'created_timestamp')
-                                                           ) if parse_value(transaction,
-                                                                            'created_timestamp') is not None else None
-        self.paid_timestamp = datetime.utcfromtimestamp(parse_value(transaction, 'paid_timestamp')
-                                                        ) if parse_value(transaction,
-                                                                         'paid_timestamp') is not None else None
-        self.shipped_timestamp = datetime.utcfromtimestamp(parse_value(transaction, 'shipped_timestamp')
-                                                           ) if parse_value(transaction,
-                                                                            'shipped_timestamp') is not None else None
-        self.quantity = parse_value(transaction, 'quantity')
-        self.listing_image_id = parse_value(transaction, 'listing_image_id')
-        self.receipt_id = parse_value(transaction, 'receipt_id')
-        self.is_digital = parse_value(transaction, 'is_digital')
-        self.file_data = parse_value(transaction, 'file_data')
-        self.listing_id = parse_value(transaction, 'listing_id')
-        self.sku = parse_value(transaction, 'sku')
-        self.product_id = parse_value(transaction, 'product_id')
-        self.transaction_type = parse_value(transaction, 'transaction_type')
-        self.price = parse_value(transaction, 'price', 'amount')
-        self.price_divisor = parse_value(transaction, 'price', 'divisor')
-        self.price_currency_code = parse_value(transaction, 'price', 'currency_code')
-        self.shipping_cost = parse_value(transaction, 'shipping_cost', 'amount')
-        self.shipping_cost_divisor = parse_value(transaction, 'shipping_cost', 'divisor')
-        self.shipping_cost_currency_code = parse_value(transaction, 'shipping_cost', 'currency_code')
-        self.variations = parse_value(transaction, 'variations')
-        self.product_property_data = parse_value(transaction, 'product_data')
-        self.shipping_profile_id = parse_value(transaction, 'shipping_profile_id')
-        self.min_processing_days = parse_value(transaction, 'min_processing_days')
-        self.max_processing_days = parse_value(transaction, 'max_processing_days')
-        self.shipping_method = parse_value(transaction, 'shipping_method')
-        self.shipping_upgrade = parse_value(transaction, 'shipping_upgrade')
-        self.expected_ship_date = datetime.utcfromtimestamp(parse_value(transaction, 'expected_ship_date')
-                                                            ) if parse_value(transaction, 'expected_ship_date') \
-                                                                 is not None else None
-        self.buyer_coupon = parse_value(transaction, 'buyer_coupon')
-        self.shop_coupon = parse_value(transaction, 'shop_coupon')
-
-
-class EtsyReceiptShipmentSpace:
-    def __init__(self, receipt_shipment: Dict):
-        self.receipt_shipping_id = parse_value(receipt_shipment, 'receipt_shipping_id')
-        self.shipment_notification_timestamp = datetime.utcfromtimestamp(
-            parse_value(receipt_shipment, 'shipment_notification_timestamp')
-        ) if parse_value(receipt_shipment, 'shipment_notification_timestamp') is not None else None
-        self.carrier_name = parse_value(receipt_shipment, 'carrier_name')
-        self.tracking_code = parse_value(receipt_shipment, 'tracking_code')
-
-
-class EtsyProductSpace:
-    def __init__(self, product: Dict):
-        self.product_id = parse_value(product, 'product_id')
-        self.sku = parse_value(product, 'sku')
-        self.is_deleted = parse_value(product, 'is_deleted')
-        self.offerings = parse_value(product, 'offerings')
-
-
-class EtsyProductPropertySpace:
-    def __init__(self, product_data: Dict):
-        self.property_id = parse_value(product_data, 'property_id')
-        self.property_name = parse_value(product_data, 'property_name')
-        self.scale_id = parse_value(product_data, 'scale_id')
-        self.scale_name = parse_value(product_data, 'scale_name')
-        self.value_ids = parse_value(product_data, 'value_ids')
-        self.values = parse_value(product_data, 'values')
-
-
-class EtsyShippingProfileSpace:
-    def __init__(self, shipping_profile_data: Dict):
-        self.shipping_profile_id = parse_value(shipping_profile_data, 'shipping_profile_id')
-        self.title = parse_value(shipping_profile_data, 'title')
-        self.user_id = parse_value(shipping_profile_data, 'user_id')
-        self.min_processing_days = parse_value(shipping_profile_data, 'min_processing_days')
-        self.max_processing_days = parse_value(shipping_profile_data, 'max_processing_days')
-        self.processing_days_display_label = parse_value(shipping_profile_data, 'processing_days_display_label')
-        self.origin_country_iso = parse_value(shipping_profile_data, 'origin_country_iso')
-        self.is_deleted = parse_value(shipping_profile_data, 'is_deleted')
-        self.shipping_profile_destinations = parse_value(shipping_profile_data, 'shipping_profile_destinations')
-        self.shipping_profile_upgrades = parse_value(shipping_profile_data, 'shipping_profile_upgrades')
-        self.origin_postal_code = parse_value(shipping_profile_data, 'origin_postal_code')
-        self.profile_type = Etsy.ShippingProfileType(parse_value(shipping_profile_data, 'profile_type').lower()) if \
-            parse_value(shipping_profile_data, 'profile_type') is not None else None
-        self.domestic_handling_fee = parse_value(shipping_profile_data, 'domestic_handling_fee')
-        self.international_handling_fee = parse_value(shipping_profile_data, 'international_handling_fee')
-
-
-class EtsyShippingProfileDestinationSpace:
-    def __init__(self, shipping_profile_destination_data: Dict):
-        self.shipping_profile_destination_id = parse_value(shipping_profile_destination_data,
-                                                           'shipping_profile_destination_id')
-        self.shipping_profile_id = parse_value(shipping_profile_destination_data, 'shipping_profile_id')
-        self.origin_country_iso = parse_value(shipping_profile_destination_data, 'origin_country_iso')
-        self.destination_country_iso = parse_value(shipping_profile_destination_data, 'destination_country_iso')
-        self.destination_region = parse_value(shipping_profile_destination_data, 'destination_region')
-        self.primary_cost = parse_value(shipping_profile_destination_data, 'primary_cost', 'amount')
-        self.primary_cost_divisor = parse_value(shipping_profile_destination_data, 'primary_cost', 'divisor')
-        self.primary_cost_currency_code = parse_value(shipping_profile_destination_data, 'primary_cost', 'currency_code')
-        self.secondary_cost = parse_value(shipping_profile_destination_data, 'secondary_cost', 'amount')
-        self.secondary_cost_divisor = parse_value(shipping_profile_destination_data, 'secondary_cost', 'divisor')
-        self.secondary_cost_currency_code = parse_value(shipping_profile_destination_data, 'secondary_cost',
-                                                        'currency_code')
-        self.shipping_carrier_id = parse_value(shipping_profile_destination_data, 'shipping_carrier_id')
-        self.mail_class = parse_value(shipping_profile_destination_data, 'mail_class')
-        self.min_delivery_days = parse_value(shipping_profile_destination_data, 'min_delivery_days')
-        self.max_delivery_days = parse_value(shipping_profile_destination_data, 'max_delivery_days')
-
-
-class EtsyShippingProfileUpgradeSpace:
-    def __init__(self, shipping_profile_upgrade_data: Dict):
-        self.shipping_profile_id = parse_value(shipping_profile_upgrade_data, 'shipping_profile_id')
-        self.upgrade_id = parse_value(shipping_profile_upgrade_data, 'upgrade_id')
-        self.upgrade_name = parse_value(shipping_profile_upgrade_data, 'upgrade_name')
-        self.type = Etsy.ShippingUpgradeType(parse_value(shipping_profile_upgrade_data, 'type')) if \
-            parse_value(shipping_profile_upgrade_data, 'type') is not None else None
-        self.rank = parse_value(shipping_profile_upgrade_data, 'rank')
-        self.language = parse_value(shipping_profile_upgrade_data, 'language')
-        self.price = parse_value(shipping_profile_upgrade_data, 'price', 'amount')
-        self.price_divisor = parse_value(shipping_profile_upgrade_data, 'price', 'divisor')
-        self.price_currency_code = parse_value(shipping_profile_upgrade_data, 'price', 'currency_code')
-        self.secondary_price = parse_value(shipping_profile_upgrade_data, 'secondary_price', 'amount')
-        self.secondary_price_divisor = parse_value(shipping_profile_upgrade_data, 'secondary_price', 'divisor')
-        self.secondary_price_currency_code = parse_value(shipping_profile_upgrade_data, 'secondary_price',
-                                                         'currency_code')
-        self.shipping_carrier_id = parse_value(shipping_profile_upgrade_data, 'shipping_carrier_id')
-        self.mail_class = parse_value(shipping_profile_upgrade_data, 'mail_class')
-        self.min_delivery_days = parse_value(shipping_profile_upgrade_data, 'min_delivery_days')
-        self.max_delivery_days = parse_value(shipping_profile_upgrade_data, 'max_delivery_days')
-
-
-class EtsyListingSpace:
-    def __init__(self, listing_data: Dict):
-        self.listing_id = parse_value(listing_data, 'listing_id')
-        self.user_id = parse_value(listing_data, 'user_id')
-        self.shop_id = parse_value(listing_data, 'shop_id')
-        self.title = parse_value(listing_data, 'title')
-        self.description = parse_value(listing_data, 'description')
-        self.state = Etsy.ListingState(parse_value(listing_data, 'state').lower()) if parse_value(
-            listing_data, 'state') is not None else None
-        self.creation_timestamp = datetime.utcfromtimestamp(parse_value(listing_data, 'creation_timestamp')
-                                                            ) if parse_value(
-            listing_data, 'creation_timestamp') is not None else None
-        self.created_timestamp = datetime.utcfromtimestamp(parse_value(listing_data, 'created_timestamp')
-                                                           ) if parse_value(
-            listing_data, 'created_timestamp') is not None else None
-        self.ending_timestamp = datetime.utcfromtimestamp(parse_value(listing_data, 'ending_timestamp')
-                                                          ) if parse_value(
-            listing_data, 'ending_timestamp') is not None else None
-        self.original_creation_timestamp = datetime.utcfromtimestamp(
-            parse_value(listing_data, 'original_creation_timestamp')) if parse_value(
-            listing_data, 'original_creation_timestamp') is not None else None
-        self.last_modified_timestamp = datetime.utcfromtimestamp(parse_value(listing_data, 'last_modified_timestamp')
-                                                                 ) if parse_value(
-            listing_data, 'last_modified_timestamp') is not None else None
-        self.updated_timestamp = datetime.utcfromtimestamp(parse_value(listing_data, 'updated_timestamp')
-                                                           ) if parse_value(
-            listing_data, 'updated_timestamp') is not None else None
-        self.state_timestamp = datetime.utcfromtimestamp(parse_value(listing_data, 'state_timestamp')
-                                                         ) if parse_value(
-            listing_data, 'state_timestamp') is not None else None
-        self.quantity = parse_value(listing_data, 'quantity')
-        self.shop_section_id = parse_value(listing_data, 'shop_section_id')
-        self.featured_rank = parse_value(listing_data, 'featured_rank')
-        self.url = parse_value(listing_data, 'url')
-        self.num_favorers = parse_value(listing_data, 'num_favorers')
-        self.non_taxable = parse_value(listing_data, 'non_taxable')
-        self.is_taxable = parse_value(listing_data, 'is_taxable')
-        self.is_customizable = parse_value(listing_data, 'is_customizable')
-        self.is_personalizable = parse_value(listing_data, 'is_personalizable')
-        self.personalization_is_required = parse_value(listing_data, 'personalization_is_required')
-        self.personalization_char_count_max = parse_value(listing_data, 'personalization_char_count_max')
-        self.personalization_instructions = parse_value(listing_data, 'personalization_instructions')
-        self.listing_type = Etsy.ListingType(parse_value(listing_data, 'listing_type').lower()) if parse_value(
-            listing_data, 'listing_type') is not None else None
-        self.tags = list_string_encode(parse_value(listing_data, 'tags'))
-        self.materials = list_string_encode(parse_value(listing_data, 'materials'))
-        self.shipping_profile_id = parse_value(listing_data, 'shipping_profile_id')
-        self.return_policy_id = parse_value(listing_data, 'return_policy_id')
-        self.processing_min = parse_value(listing_data, 'processing_min')
-        self.processing_max = parse_value(listing_data, 'processing_max')
-        self.who_made = parse_value(listing_data, 'who_made')
-        self.when_made = parse_value(listing_data, 'when_made')
-        self.is_supply = parse_value(listing_data, 'is_supply')
-        self.item_weight = parse_value(listing_data, 'item_weight')
-        self.item_weight_unit = Etsy.ItemWeightUnit(parse_value(listing_data, 'item_weight_unit').lower()) if \
-            parse_value(listing_data, 'item_weight_unit') is not None else Etsy.ItemWeightUnit.NONE
-        self.item_length = parse_value(listing_data, 'item_length')
-        self.item_height = parse_value(listing_data, 'item_height')
-        self.item_width = parse_value(listing_data, 'item_width')
-        self.item_dimensions_unit = Etsy.ItemDimensionsUnit(parse_value(
-            listing_data, 'item_dimensions_unit').lower()) if parse_value(
-            listing_data, 'item_dimensions_unit') is not None else Etsy.ItemDimensionsUnit.NONE
-        self.is_private = parse_value(listing_data, 'is_private')
-        self.style = list_string_encode(parse_value(listing_data, 'style'))
-        self.file_data = parse_value(listing_data, 'file_data')
-        self.has_variations = parse_value(listing_data, 'has_variations')
-        self.should_auto_renew = parse_value(listing_data, 'should_auto_renew')
-        self.language = parse_value(listing_data, 'language')
-        self.price = parse_value(listing_data, 'price', 'amount')
-        self.price_divisor = parse_value(listing_data, 'price', 'divisor')
-        self.price_currency_code = parse_value(listing_data, 'price', 'currency_code')
-        self.taxonomy_id = parse_value(listing_data, 'taxonomy_id')
-        self.shipping_profile = parse_value(listing_data, 'shipping_profile')
-        self.user = parse_value(listing_data, 'user')
-        self.shop = parse_value(listing_data, 'shop')
-        self.images = parse_value(listing_data, 'images')
-        self.videos = parse_value(listing_data, 'videos')
-        self.inventory = parse_value(listing_data, 'inventory')
-        self.production_partners = parse_value(listing_data, 'production_partners')
-        self.skus = list_string_encode(parse_value(listing_data, 'skus'))
-        self.translations = parse_value(listing_data, 'translations')
-        self.views = parse_value(listing_data, 'views')
-
-
-class EtsyReturnPolicySpace:
-    def __init__(self, return_policy_data: Dict):
-        self.return_policy_id = parse_value(return_policy_data, 'return_policy_id')
-        self.shop_id = parse_value(return_policy_data, 'shop_id')
-        self.accepts_returns = parse_value(return_policy_data, 'accepts_returns')
-        self.accepts_exchanges = parse_value(return_policy_data, 'accepts_exchanges')
-        self.return_deadline = parse_value(return_policy_data, 'return_deadline')
-
-
-class EtsyShopSectionSpace:
-    def __init__(self, shop_section_data: Dict):
-        self.shop_section_id = parse_value(shop_section_data, 'shop_section_id')
-        self.title = parse_value(shop_section_data, 'title')
-        self.rank = parse_value(shop_section_data, 'rank')
-        self.user_id = parse_value(shop_section_data, 'user_id')
-        self.active_listing_count = parse_value(shop_section_data, 'active_listing_count')
-
-
-class EtsyProductionPartnerSpace:
-    def __init__(self, production_partner: Dict):
-        self.production_partner_id = parse_value(production_partner, 'production_partner_id')
-        self.partner_name = parse_value(production_partner, 'partner_name')
-        self.location = parse_value(production_partner, 'location')
-
-
-class EtsyShopSpace:
-    def __init__(self, etsy_shop_data: Dict):
-        self.shop_id = parse_value(etsy_shop_data, 'shop_id')
-        self.user_id = parse_value(etsy_shop_data, 'user_id')
-        self.shop_name = parse_value(etsy_shop_data, 'shop_name')
-        self.create_date = datetime.utcfromtimestamp(parse_value(etsy_shop_data, 'create_date')
-                                                     ) if parse_value(
-            etsy_shop_data, 'create_date') is not None else None
-        self.title = parse_value(etsy_shop_data, 'title')
-        self.announcement = parse_value(etsy_shop_data, 'announcement')
-        self.currency_code = parse_value(etsy_shop_data, 'currency_code')
-        self.is_vacation = parse_value(etsy_shop_data, 'is_vacation')
-        self.vacation_message = parse_value(etsy_shop_data, 'vacation_message')
-        self.sale_message = parse_value(etsy_shop_data, 'sale_message')
-        self.digital_sale_message = parse_value(etsy_shop_data, 'digital_sale_message')
-        self.update_date = datetime.utcfromtimestamp(parse_value(etsy_shop_data, 'update_date')
-                                                     ) if parse_value(
-            etsy_shop_data, 'update_date') is not None else None
-        self.updated_timestamp = datetime.utcfromtimestamp(parse_value(etsy_shop_data, 'updated_timestamp')
-                                                           ) if parse_value(
-            etsy_shop_data, 'updated_timestamp') is not None else None
-        self.listing_active_count = parse_value(etsy_shop_data, 'listing_active_count')
-        self.digital_listing_count = parse_value(etsy_shop_data, 'digital_listing_count')
-        self.login_name = parse_value(etsy_shop_data, 'login_name')
-        self.accepts_custom_requests = parse_value(etsy_shop_data, 'accepts_custom_requests')
-        self.policy_welcome = parse_value(etsy_shop_data, 'policy_welcome')
-        self.policy_payment = parse_value(etsy_shop_data, 'policy_payment')
-        self.policy_shipping = parse_value(etsy_shop_data, 'policy_shipping')
-        self.policy_refunds = parse_value(etsy_shop_data, 'policy_refunds')
-        self.policy_additional = parse_value(etsy_shop_data, 'policy_additional')
-        self.policy_seller_info = parse_value(etsy_shop_data, 'policy_seller_info')
-        self.policy_update_date = datetime.utcfromtimestamp(parse_value(etsy_shop_data, 'policy_update_date')
-                                                            ) if parse_value(
-            etsy_shop_data, 'policy_update_date') is not None else None
-        self.policy_has_private_receipt_info = parse_value(etsy_shop_data, 'policy_has_private_receipt_info')
-        self.has_unstructured_policies = parse_value(etsy_shop_data, 'has_unstructured_policies')
-        self.policy_privacy = parse_value(etsy_shop_data, 'policy_privacy')
-        self.vacation_autoreply = parse_value(etsy_shop_data, 'vacation_autoreply')
-        self.url = parse_value(etsy_shop_data, 'url')
-        self.image_url_760x100 = parse_value(etsy_shop_data, 'image_url_760x100')
-        self.num_favorers = parse_value(etsy_shop_data, 'num_favorers')
-        self.languages = list_string_encode(parse_value(etsy_shop_data, 'languages'))
-        self.icon_url_fullxfull = parse_value(etsy_shop_data, 'icon_url_fullxfull')
-        self.is_using_structured_policies = parse_value(etsy_shop_data, 'is_using_structured_policies')
-        self.has_onboarded_structured_policies = parse_value(etsy_shop_data, 'has_onboarded_structured_policies')
-        self.include_dispute_form_link = parse_value(etsy_shop_data, 'include_dispute_form_link')
-        self.is_etsy_payments_onboarded = parse_value(etsy_shop_data, 'is_etsy_payments_onboarded')
-        self.is_calculated_eligible = parse_value(etsy_shop_data, 'is_calculated_eligible')
-        self.is_opted_into_buyer_promise = parse_value(etsy_shop_data, 'is_opted_in_to_buyer_promise')
-        self.is_shop_us_based = parse_value(etsy_shop_data, 'is_shop_us_based')
-        self.transaction_sold_count = parse_value(etsy_shop_data, 'transaction_sold_count')
-        self.shipping_from_country_iso = parse_value(etsy_shop_data, 'shipping_from_country_iso')
-        self.shop_location_country_iso = parse_value(etsy_shop_data, 'shop_location_country_iso')
-        self.review_count = parse_value(etsy_shop_data, 'review_count')
-        self.review_average = parse_value(etsy_shop_data, 'review_average')
-
-
-class EtsyOfferingSpace:
-    def __init__(self, offering_data: Dict):
-        self.offering_id = parse_value(offering_data, 'offering_id')
-        self.quantity = parse_value(offering_data, 'quantity')
-        self.is_enabled = parse_value(offering_data, 'is_enabled')
-        self.is_deleted = parse_value(offering_data, 'is_deleted')
-        self.price = parse_value(offering_data, 'price', 'amount')
-        self.price_divisor = parse_value(offering_data, 'price', 'divisor')
-        self.price_currency_code = parse_value(offering_data, 'price', 'currency_code')
-
-
-class EtsyRefundSpace:
-    def __init__(self, refund_data: Dict):
-        self.amount = parse_value(refund_data, 'amount', 'amount')
-        self.amount_divisor = parse_value(refund_data, 'amount', 'divisor')
-        self.amount_currency_code = parse_value(refund_data, 'amount', 'currency_code')
-        self.created_timestamp = datetime.utcfromtimestamp(parse_value(refund_data, 'created_timestamp')
-                                                           ) if parse_value(
-            refund_data, 'created_timestamp') is not None else None
-        self.reason = parse_value(refund_data, 'reason')
-        self.note_from_issuer = parse_value(refund_data, 'note_from_issuer')
-        self.status = parse_value(refund_data, 'status')
-
-
-class ProdigiOrderSpace:
-    def __init__(self, order_data: Dict):
-        print(order_data)
-        self.prodigi_id = parse_value(order_data, 'id')
-        self.created = prodigi_timestamp_to_datetime(parse_value(order_data, 'created').split('.')[0]) if parse_value(
-            order_data, 'created') is not None else None
-        self.last_updated = prodigi_timestamp_to_datetime(parse_value(order_data, 'lastUpdated').split('.')[0]) if \
-            parse_value(order_data, 'lastUpdated') is not None else None
-        self.callback_url = parse_value(order_data, 'callbackUrl')
-        self.merchant_reference = parse_value(order_data, 'merchantReference')
-        self.shipping_method = Prodigi.ShippingMethod(parse_value(order_data, 'shippingMethod').lower()) if \
-            parse_value(order_data, 'shippingMethod') is not None else None
-        self.idempotency_key = parse_value(order_data, 'idempotencyKey')
-        self.status = parse_value(order_data, 'status')
-        self.charges = parse_value(order_data, 'charges')
-        self.shipments = parse_value(order_data, 'shipments')
-        self.recipient = parse_value(order_data, 'recipient')
-        self.items = parse_value(order_data, 'items')
-        self.packing_slip = parse_value(order_data, 'packingSlip')
-        self.metadata = parse_value(order_data, 'metadata')
-
-
-class ProdigiStatusSpace:
-    def __init__(self, status_data: Dict):
-        self.stage = Prodigi.StatusStage(parse_value(status_data, 'stage').lower()) if parse_value(
-            status_data, 'stage') is not None else None
-        self.download_assets = Prodigi.DetailStatus(parse_value(status_data, 'details', 'downloadAssets').lower()) if \
-            parse_value(status_data, 'details', 'downloadAssets') is not None else None
-        self.print_ready_assets_prepared = Prodigi.DetailStatus(
-            parse_value(status_data, 'details', 'printReadyAssetsPrepared').lower()) if \
-            parse_value(status_data, 'details', 'printReadyAssetsPrepared') is not None else None
-        self.allocate_production_location = Prodigi.DetailStatus(
-            parse_value(status_data, 'details', 'allocateProductionLocation').lower()) if \
-            parse_value(status_data, 'details', 'allocateProductionLocation') is not None else None
-        self.in_production = Prodigi.DetailStatus(parse_value(status_data, 'details', 'inProduction').lower()) if \
-            parse_value(status_data, 'details', 'inProduction') is not None else None
-        self.shipping = Prodigi.DetailStatus(parse_value(status_data, 'details', 'shipping').lower()) if \
-            parse_value(status_data, 'details', 'shipping') is not None else None
-        self.issues = parse_value(status_data, 'issues')
-
-
-class ProdigiIssueSpace:
-    def __init__(self, issue_data: Dict):
-        self.object_id = parse_value(issue_data, 'objectId')
-        self.error_code = Prodigi.IssueErrorCode(parse_value(issue_data, 'errorCode').lower()) if parse_value(
-            issue_data, 'errorCode') is not None else None
-        self.description = parse_value(issue_data, 'description')
-        self.authorization_details = parse_value(issue_data, 'authorisationDetails')
-
-
-class ProdigiAuthorizationDetailsSpace:
-    def __init__(self, authorization_details_data: Dict):
-        self.authorization_url = parse_value(authorization_details_data, 'authorisationUrl')
-        self.payment_details = parse_value(authorization_details_data, 'paymentDetails')
-
-
-class ProdigiCostSpace:
-    def __init__(self, cost_data: Dict):
-        self.amount = parse_value(cost_data, 'amount')
-        self.currency = parse_value(cost_data, 'currency')
-
-
-class ProdigiChargeSpace:
-    def __init__(self, charge_data: Dict):
-        self.prodigi_id = parse_value(charge_data, 'id')
-        self.prodigi_invoice_number = parse_value(charge_data, 'prodigiInvoiceNumber')
-        self.total_cost = parse_value(charge_data, 'totalCost')
-        self.items = parse_value(charge_data, 'items')
-
-
-class ProdigiChargeItemSpace:
-    def __init__(self, charge_item_data: Dict):
-        self.prodigi_id = parse_value(charge_item_data, 'id')
-        self.description = parse_value(charge_item_data, 'description') if 'description' in charge_item_data else None
-        self.item_sku = parse_value(charge_item_data, 'itemSku') if 'itemSku' in charge_item_data else None
-        self.shipment_id = parse_value(charge_item_data, 'shipmentId')
-        self.item_id = parse_value(charge_item_data, 'itemId')
-        self.merchant_item_reference = parse_value(charge_item_data,
-            'merchantItemReference') if 'merchantItemReference' in charge_item_data else None
-        self.cost = parse_value(charge_item_data, 'cost')
-
-
-class ProdigiShipmentSpace:
-    def __init__(self, shipment_data: Dict):
-        self.prodigi_id = parse_value(shipment_data, 'id')
-        self.carrier_name = parse_value(shipment_data, 'carrier', 'name')
-        self.carrier_service = parse_value(shipment_data, 'carrier', 'service')
-        self.service = parse_value(shipment_data, 'carrier', 'service')
-        self.tracking_number = parse_value(shipment_data, 'tracking', 'number')
-        self.tracking_url = parse_value(shipment_data, 'tracking', 'url')
-        self.dispatch_date = prodigi_timestamp_to_datetime(parse_value(
-            shipment_data, 'dispatchDate').split('.')[0]) if parse_value(
-            shipment_data, 'dispatchDate') is not None else None
-        self.items = parse_value(shipment_data, 'items')
-        self.fulfillment_location = parse_value(shipment_data, 'fulfillmentLocation')
-
-
-class ProdigiFulfillmentLocationSpace:
-    def __init__(self, fulfillment_location_data: Dict):
-        self.country_code = parse_value(fulfillment_location_data, 'countryCode')
-        self.lab_code = parse_value(fulfillment_location_data, 'labCode')
-
-
-class ProdigiShipmentItemSpace:
-    def __init__(self, shipment_item_data: Dict):
-        self.item_id = parse_value(shipment_item_data, 'itemId')
-
-
-class ProdigiRecipientSpace:
-    def __init__(self, recipient_data: Dict):
-        self.name = parse_value(recipient_data, 'name')
-        self.email = parse_value(recipient_data, 'email')
-        self.phone_number = parse_value(recipient_data, 'phoneNumber')
-        self.address = parse_value(recipient_data, 'address')
-
-
-class ProdigiAddressSpace:
-    def __init__(self, address_data: Dict):
-        self.first_line = parse_value(address_data, 'line1')
-        self.second_line = parse_value(address_data, 'line2')
-        self.zip = parse_value(address_data, 'postalOrZipCode')
-        self.country = parse_value(address_data, 'countryCode')
-        self.city = parse_value(address_data, 'townOrCity')
-        self.state = parse_value(address_data, 'stateOrCounty')
-
-
-class ProdigiItemSpace:
-    def __init__(self, item_data: Dict):
-        self.prodigi_id = parse_value(item_data, 'id')
-        self.merchant_reference = parse_value(item_data, 'merchantReference')
-        self.sku = parse_value(item_data, 'sku')
-        self.copies = parse_value(item_data, 'copies')
-        self.sizing = Prodigi.Sizing(parse_value(item_data, 'sizing').lower())
-        self.recipient_cost = parse_value(item_data, 'recipientCost')
-        self.attributes = parse_value(item_data, 'attributes')
-        self.assets = parse_value(item_data, 'assets')
-
-
-class ProdigiAssetSpace:
-    def __init__(self, asset_data: Dict):
-        self.print_area = parse_value(asset_data, 'printArea')
-        self.url = parse_value(asset_data, 'url')
-
-
-class ProdigiPackingSlipSpace:
-    def __init__(self, packing_slip_data: Dict):
-        self.url = parse_value(packing_slip_data, 'url')
-        self.status = parse_value(packing_slip_data, 'status')
-
-
-class ProdigiShipmentDetailSpace:
-    def __init__(self, shipment_detail_data: Dict):
-        self.shipment_id = parse_value(shipment_detail_data, 'shipmentId')
-        self.successful = parse_value(shipment_detail_data, 'successful')
-        self.error_code = Prodigi.ShipmentUpdateErrorCode(parse_value(shipment_detail_data, 'errorCode').lower())
-        self.description = parse_value(shipment_detail_data, 'description')
+class Field:
+    """
+    One attribute of a namespace: the key path it is read from in the payload and, optionally, a converter. The raw
+    value is read when the namespace is built; the converter only runs the first time the attribute is accessed and its
+    result is cached, so timestamps and enums nobody looks at are never parsed
+
+    Args:
+        *path (str): Keys leading to the value, i.e. ('grandtotal', 'amount'). No keys means the whole payload
+        convert (Callable): Applied to the raw value when it is not None
+        default (Any): Value of the attribute when the raw value is None
+    """
+    __slots__ = ('path', 'convert', 'default', 'name', '_raw', '_cache')
+
+    def __init__(self, *path: str, convert: Callable[[Any], Any] = None, default: Any = None):
+        self.path = path
+        self.convert = convert
+        self.default = default
+        self.name = None
+        self._raw = None
+        self._cache = None
+
+    @property
+    def raw_slot(self) -> str:
+        return self.name if self.convert is None else f'_raw_{self.name}'
+
+    def bind(self, cls: type):
+        self._raw = cls.__dict__[self.raw_slot]
+        self._cache = cls.__dict__[f'_{self.name}']
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return self._cache.__get__(instance, owner)
+        except AttributeError:
+            raw = self._raw.__get__(instance, owner)
+            value = self.convert(raw) if raw is not None else self.default
+            self._cache.__set__(instance, value)
+            return value
+
+
+def _compile_init(cls_name: str, fields: Dict[str, Field]) -> Callable[[Any, Dict], None]:
+    """
+    Generates the namespace's __init__: one pass over its fields, each nested object looked up once and every raw
+    value stored straight into its slot
+    """
+    lines = ['def __init__(self, data):', '    if data is None:', '        data = _EMPTY']
+    holders = {(): 'data'}
+    for field in fields.values():
+        for depth in range(1, len(field.path)):
+            prefix = field.path[:depth]
+            if prefix not in holders:
+                holders[prefix] = f'_{len(holders)}'
+                lines.append(f'    {holders[prefix]} = {holders[prefix[:-1]]}.get({prefix[-1]!r}) or _EMPTY')
+        value = f'{holders[field.path[:-1]]}.get({field.path[-1]!r})' if field.path else 'data'
+        lines.append(f'    self.{field.raw_slot} = {value}')
+
+    namespace = {'_EMPTY': {}}
+    exec(compile('\n'.join(lines), f'<{cls_name}.__init__>', 'exec'), namespace)
+    return namespace['__init__']
+
+
+class NamespaceMeta(type):
+    """
+    Builds a namespace class from its Field declarations: __slots__ for the raw values (and the cached conversions), so
+    instances carry no __dict__, and a generated __init__ that fills them in a single pass over the payload
+    """
+
+    def __new__(mcs, name: str, bases: Tuple[type, ...], attrs: Dict[str, Any]):
+        fields = {}
+        for base in reversed(bases):
+            fields.update(getattr(base, '__fields__', {}))
+
+        own_fields = {key: value for key, value in attrs.items() if isinstance(value, Field)}
+        slots = []
+        for key, field in own_fields.items():
+            field.name = key
+            if field.convert is None:
+                # Plain values are slots themselves, the Field declaration is only needed to build __init__
+                del attrs[key]
+                slots.append(key)
+            else:
+                slots += [field.raw_slot, f'_{key}']
+        fields.update(own_fields)
+
+        attrs['__slots__'] = tuple(slots)
+        attrs['__fields__'] = fields
+        if fields:
+            attrs['__init__'] = _compile_init(name, fields)
+
+        cls = super().__new__(mcs, name, bases, attrs)
+        for field in own_fields.values():
+            if field.convert is not None:
+                field.bind(cls)
+        return cls
+
+
+class Namespace(metaclass=NamespaceMeta):
+    """
+    Base class of the API payload namespaces. Subclasses declare their attributes as Fields
+    """
+    __slots__ = ()
+
+
+def enum_of(enum_cls: type) -> Callable[[str], Any]:
+    """
+    Converter for enum values the APIs send in varying case
+    """
+    return lambda value: enum_cls(value.lower())
+
+
+def prodigi_timestamp(timestamp: str) -> datetime:
+    # Prodigi timestamps can carry fractional seconds, which are dropped
+    return prodigi_timestamp_to_datetime(timestamp.split('.')[0])
+
+
+class EtsyReceiptSpace(Namespace):
+    receipt_id = Field('receipt_id')
+    receipt_type = Field('receipt_type')
+    buyer_id = Field('buyer_user_id')
+    buyer_email = Field('buyer_email')
+    first_line = Field('first_line')
+    second_line = Field('second_line')
+    city = Field('city')
+    state = Field('state')
+    zip = Field('zip')
+    country = Field('country_iso')
+    seller_id = Field('seller_user_id')
+    seller_email = Field('seller_email')
+    status = Field('status', convert=enum_of(Etsy.OrderStatus))
+    payment_method = Field('payment_method')
+    message_from_seller = Field('message_from_seller')
+    message_from_buyer = Field('message_from_buyer')
+    message_from_payment = Field('message_from_payment')
+    is_paid = Field('is_paid')
+    is_shipped = Field('is_shipped')
+    create_timestamp = Field('create_timestamp', convert=datetime.utcfromtimestamp)
+    created_timestamp = Field('created_timestamp', convert=datetime.utcfromtimestamp)
+    update_timestamp = Field('update_timestamp', convert=datetime.utcfromtimestamp)
+    updated_timestamp = Field('updated_timestamp', convert=datetime.utcfromtimestamp)
+    is_gift = Field('is_gift')
+    gift_message = Field('gift_message')
+    grand_total = Field('grandtotal', 'amount')
+    grand_total_divisor = Field('grandtotal', 'divisor')
+    grand_total_currency_code = Field('grandtotal', 'currency_code')
+    sub_total = Field('subtotal', 'amount')
+    sub_total_divisor = Field('subtotal', 'divisor')
+    sub_total_currency_code = Field('subtotal', 'currency_code')
+    total_price = Field('total_price', 'amount')
+    total_price_divisor = Field('total_price', 'divisor')
+    total_price_currency_code = Field('total_price', 'currency_code')
+    shipping_cost = Field('total_shipping_cost', 'amount')
+    shipping_cost_divisor = Field('total_shipping_cost', 'divisor')
+    shipping_cost_currency_code = Field('total_shipping_cost', 'currency_code')
+    tax_cost = Field('total_tax_cost', 'amount')
+    tax_cost_divisor = Field('total_tax_cost', 'divisor')
+    tax_cost_currency_code = Field('total_tax_cost', 'currency_code')
+    vat_cost = Field('total_vat_cost', 'amount')
+    vat_cost_divisor = Field('total_vat_cost', 'divisor')
+    vat_cost_currency_code = Field('total_vat_cost', 'currency_code')
+    discount = Field('discount_amt', 'amount')
+    discount_divisor = Field('discount_amt', 'divisor')
+    discount_currency_code = Field('discount_amt', 'currency_code')
+    gift_wrap_price = Field('gift_wrap_price', 'amount')
+    gift_wrap_price_divisor = Field('gift_wrap_price', 'divisor')
+    gift_wrap_price_currency_code = Field('gift_wrap_price', 'currency_code')
+    refunds = Field('refunds')
+    shipments = Field('shipments')
+    transactions = Field('transactions')
+
+
+class EtsyBuyerSpace(Namespace):
+    buyer_id = Field('buyer_user_id')
+    email = Field('buyer_email')
+    name = Field('name')
+
+
+class EtsySellerSpace(Namespace):
+    seller_id = Field('seller_user_id')
+    email = Field('seller_email')
+
+
+class AddressSpace(Namespace):
+    zip = Field('zip')
+    city = Field('city')
+    state = Field('state')
+    country = Field('country_iso')
+    first_line = Field('first_line')
+    second_line = Field('second_line')
+    formatted_address = Field('formatted_address')
+
+
+class EtsyTransactionSpace(Namespace):
+    transaction_id = Field('transaction_id')
+    title = Field('title')
+    description = Field('description')
+    seller_user_id = Field('seller_user_id')
+    buyer_user_id = Field('buyer_user_id')
+    create_timestamp = Field('create_timestamp', convert=datetime.utcfromtimestamp)
+    created_timestamp = Field('created_timestamp', convert=datetime.utcfromtimestamp)
+    paid_timestamp = Field('paid_timestamp', convert=datetime.utcfromtimestamp)
+    shipped_timestamp = Field('shipped_timestamp', convert=datetime.utcfromtimestamp)
+    quantity = Field('quantity')
+    listing_image_id = Field('listing_image_id')
+    receipt_id = Field('receipt_id')
+    is_digital = Field('is_digital')
+    file_data = Field('file_data')
+    listing_id = Field('listing_id')
+    sku = Field('sku')
+    product_id = Field('product_id')
+    transaction_type = Field('transaction_type')
+    price = Field('price', 'amount')
+    price_divisor = Field('price', 'divisor')
+    price_currency_code = Field('price', 'currency_code')
+    shipping_cost = Field('shipping_cost', 'amount')
+    shipping_cost_divisor = Field('shipping_cost', 'divisor')
+    shipping_cost_currency_code = Field('shipping_cost', 'currency_code')
+    variations = Field('variations')
+    product_property_data = Field('product_data')
+    shipping_profile_id = Field('shipping_profile_id')
+    min_processing_days = Field('min_processing_days')
+    max_processing_days = Field('max_processing_days')
+    shipping_method = Field('shipping_method')
+    shipping_upgrade = Field('shipping_upgrade')
+    expected_ship_date = Field('expected_ship_date', convert=datetime.utcfromtimestamp)
+    buyer_coupon = Field('buyer_coupon')
+    shop_coupon = Field('shop_coupon')
+
+
+class EtsyReceiptShipmentSpace(Namespace):
+    receipt_shipping_id = Field('receipt_shipping_id')
+    shipment_notification_timestamp = Field('shipment_notification_timestamp', convert=datetime.utcfromtimestamp)
+    carrier_name = Field('carrier_name')
+    tracking_code = Field('tracking_code')
+
+
+class EtsyProductSpace(Namespace):
+    product_id = Field('product_id')
+    sku = Field('sku')
+    is_deleted = Field('is_deleted')
+    offerings = Field('offerings')
+
+
+class EtsyProductPropertySpace(Namespace):
+    property_id = Field('property_id')
+    property_name = Field('property_name')
+    scale_id = Field('scale_id')
+    scale_name = Field('scale_name')
+    value_ids = Field('value_ids')
+    values = Field('values')
+
+
+class EtsyShippingProfileSpace(Namespace):
+    shipping_profile_id = Field('shipping_profile_id')
+    title = Field('title')
+    user_id = Field('user_id')
+    min_processing_days = Field('min_processing_days')
+    max_processing_days = Field('max_processing_days')
+    processing_days_display_label = Field('processing_days_display_label')
+    origin_country_iso = Field('origin_country_iso')
+    is_deleted = Field('is_deleted')
+    shipping_profile_destinations = Field('shipping_profile_destinations')
+    shipping_profile_upgrades = Field('shipping_profile_upgrades')
+    origin_postal_code = Field('origin_postal_code')
+    profile_type = Field('profile_type', convert=enum_of(Etsy.ShippingProfileType))
+    domestic_handling_fee = Field('domestic_handling_fee')
+    international_handling_fee = Field('international_handling_fee')
+
+
+class EtsyShippingProfileDestinationSpace(Namespace):
+    shipping_profile_destination_id = Field('shipping_profile_destination_id')
+    shipping_profile_id = Field('shipping_profile_id')
+    origin_country_iso = Field('origin_country_iso')
+    destination_country_iso = Field('destination_country_iso')
+    destination_region = Field('destination_region')
+    primary_cost = Field('primary_cost', 'amount')
+    primary_cost_divisor = Field('primary_cost', 'divisor')
+    primary_cost_currency_code = Field('primary_cost', 'currency_code')
+    secondary_cost = Field('secondary_cost', 'amount')
+    secondary_cost_divisor = Field('secondary_cost', 'divisor')
+    secondary_cost_currency_code = Field('secondary_cost', 'currency_code')
+    shipping_carrier_id = Field('shipping_carrier_id')
+    mail_class = Field('mail_class')
+    min_delivery_days = Field('min_delivery_days')
+    max_delivery_days = Field('max_delivery_days')
+
+
+class EtsyShippingProfileUpgradeSpace(Namespace):
+    shipping_profile_id = Field('shipping_profile_id')
+    upgrade_id = Field('upgrade_id')
+    upgrade_name = Field('upgrade_name')
+    type = Field('type', convert=Etsy.ShippingUpgradeType)
+    rank = Field('rank')
+    language = Field('language')
+    price = Field('price', 'amount')
+    price_divisor = Field('price', 'divisor')
+    price_currency_code = Field('price', 'currency_code')
+    secondary_price = Field('secondary_price', 'amount')
+    secondary_price_divisor = Field('secondary_price', 'divisor')
+    secondary_price_currency_code = Field('secondary_price', 'currency_code')
+    shipping_carrier_id = Field('shipping_carrier_id')
+    mail_class = Field('mail_class')
+    min_delivery_days = Field('min_delivery_days')
+    max_delivery_days = Field('max_delivery_days')
+
+
+class EtsyListingSpace(Namespace):
+    listing_id = Field('listing_id')
+    user_id = Field('user_id')
+    shop_id = Field('shop_id')
+    title = Field('title')
+    description = Field('description')
+    state = Field('state', convert=enum_of(Etsy.ListingState))
+    creation_timestamp = Field('creation_timestamp', convert=datetime.utcfromtimestamp)
+    created_timestamp = Field('created_timestamp', convert=datetime.utcfromtimestamp)
+    ending_timestamp = Field('ending_timestamp', convert=datetime.utcfromtimestamp)
+    original_creation_timestamp = Field('original_creation_timestamp', convert=datetime.utcfromtimestamp)
+    last_modified_timestamp = Field('last_modified_timestamp', convert=datetime.utcfromtimestamp)
+    updated_timestamp = Field('updated_timestamp', convert=datetime.utcfromtimestamp)
+    state_timestamp = Field('state_timestamp', convert=datetime.utcfromtimestamp)
+    quantity = Field('quantity')
+    shop_section_id = Field('shop_section_id')
+    featured_rank = Field('featured_rank')
+    url = Field('url')
+    num_favorers = Field('num_favorers')
+    non_taxable = Field('non_taxable')
+    is_taxable = Field('is_taxable')
+    is_customizable = Field('is_customizable')
+    is_personalizable = Field('is_personalizable')
+    personalization_is_required = Field('personalization_is_required')
+    personalization_char_count_max = Field('personalization_char_count_max')
+    personalization_instructions = Field('personalization_instructions')
+    listing_type = Field('listing_type', convert=enum_of(Etsy.ListingType))
+    tags = Field('tags', convert=list_string_encode)
+    materials = Field('materials', convert=list_string_encode)
+    shipping_profile_id = Field('shipping_profile_id')
+    return_policy_id = Field('return_policy_id')
+    processing_min = Field('processing_min')
+    processing_max = Field('processing_max')
+    who_made = Field('who_made')
+    when_made = Field('when_made')
+    is_supply = Field('is_supply')
+    item_weight = Field('item_weight')
+    item_weight_unit = Field('item_weight_unit', convert=enum_of(Etsy.ItemWeightUnit),
+                             default=Etsy.ItemWeightUnit.NONE)
+    item_length = Field('item_length')
+    item_height = Field('item_height')
+    item_width = Field('item_width')
+    item_dimensions_unit = Field('item_dimensions_unit', convert=enum_of(Etsy.ItemDimensionsUnit),
+                                 default=Etsy.ItemDimensionsUnit.NONE)
+    is_private = Field('is_private')
+    style = Field('style', convert=list_string_encode)
+    file_data = Field('file_data')
+    has_variations = Field('has_variations')
+    should_auto_renew = Field('should_auto_renew')
+    language = Field('language')
+    price = Field('price', 'amount')
+    price_divisor = Field('price', 'divisor')
+    price_currency_code = Field('price', 'currency_code')
+    taxonomy_id = Field('taxonomy_id')
+    shipping_profile = Field('shipping_profile')
+    user = Field('user')
+    shop = Field('shop')
+    images = Field('images')
+    videos = Field('videos')
+    inventory = Field('inventory')
+    production_partners = Field('production_partners')
+    skus = Field('skus', convert=list_string_encode)
+    translations = Field('translations')
+    views = Field('views')
+
+
+class EtsyReturnPolicySpace(Namespace):
+    return_policy_id = Field('return_policy_id')
+    shop_id = Field('shop_id')
+    accepts_returns = Field('accepts_returns')
+    accepts_exchanges = Field('accepts_exchanges')
+    return_deadline = Field('return_deadline')
+
+
+class EtsyShopSectionSpace(Namespace):
+    shop_section_id = Field('shop_section_id')
+    title = Field('title')
+    rank = Field('rank')
+    user_id = Field('user_id')
+    active_listing_count = Field('active_listing_count')
+
+
+class EtsyProductionPartnerSpace(Namespace):
+    production_partner_id = Field('production_partner_id')
+    partner_name = Field('partner_name')
+    location = Field('location')
+
+
+class EtsyShopSpace(Namespace):
+    shop_id = Field('shop_id')
+    user_id = Field('user_id')
+    shop_name = Field('shop_name')
+    create_date = Field('create_date', convert=datetime.utcfromtimestamp)
+    title = Field('title')
+    announcement = Field('announcement')
+    currency_code = Field('currency_code')
+    is_vacation = Field('is_vacation')
+    vacation_message = Field('vacation_message')
+    sale_message = Field('sale_message')
+    digital_sale_message = Field('digital_sale_message')
+    update_date = Field('update_date', convert=datetime.utcfromtimestamp)
+    updated_timestamp = Field('updated_timestamp', convert=datetime.utcfromtimestamp)
+    listing_active_count = Field('listing_active_count')
+    digital_listing_count = Field('digital_listing_count')
+    login_name = Field('login_name')
+    accepts_custom_requests = Field('accepts_custom_requests')
+    policy_welcome = Field('policy_welcome')
+    policy_payment = Field('policy_payment')
+    policy_shipping = Field('policy_shipping')
+    policy_refunds = Field('policy_refunds')
+    policy_additional = Field('policy_additional')
+    policy_seller_info = Field('policy_seller_info')
+    policy_update_date = Field('policy_update_date', convert=datetime.utcfromtimestamp)
+    policy_has_private_receipt_info = Field('policy_has_private_receipt_info')
+    has_unstructured_policies = Field('has_unstructured_policies')
+    policy_privacy = Field('policy_privacy')
+    vacation_autoreply = Field('vacation_autoreply')
+    url = Field('url')
+    image_url_760x100 = Field('image_url_760x100')
+    num_favorers = Field('num_favorers')
+    languages = Field('languages', convert=list_string_encode)
+    icon_url_fullxfull = Field('icon_url_fullxfull')
+    is_using_structured_policies = Field('is_using_structured_policies')
+    has_onboarded_structured_policies = Field('has_onboarded_structured_policies')
+    include_dispute_form_link = Field('include_dispute_form_link')
+    is_etsy_payments_onboarded = Field('is_etsy_payments_onboarded')
+    is_calculated_eligible = Field('is_calculated_eligible')
+    is_opted_into_buyer_promise = Field('is_opted_in_to_buyer_promise')
+    is_shop_us_based = Field('is_shop_us_based')
+    transaction_sold_count = Field('transaction_sold_count')
+    shipping_from_country_iso = Field('shipping_from_country_iso')
+    shop_location_country_iso = Field('shop_location_country_iso')
+    review_count = Field('review_count')
+    review_average = Field('review_average')
+
+
+class EtsyOfferingSpace(Namespace):
+    offering_id = Field('offering_id')
+    quantity = Field('quantity')
+    is_enabled = Field('is_enabled')
+    is_deleted = Field('is_deleted')
+    price = Field('price', 'amount')
+    price_divisor = Field('price', 'divisor')
+    price_currency_code = Field('price', 'currency_code')
+
+
+class EtsyRefundSpace(Namespace):
+    amount = Field('amount', 'amount')
+    amount_divisor = Field('amount', 'divisor')
+    amount_currency_code = Field('amount', 'currency_code')
+    created_timestamp = Field('created_timestamp', convert=datetime.utcfromtimestamp)
+    reason = Field('reason')
+    note_from_issuer = Field('note_from_issuer')
+    status = Field('status')
+
+
+class ProdigiOrderSpace(Namespace):
+    prodigi_id = Field('id')
+    created = Field('created', convert=prodigi_timestamp)
+    last_updated = Field('lastUpdated', convert=prodigi_timestamp)
+    callback_url = Field('callbackUrl')
+    merchant_reference = Field('merchantReference')
+    shipping_method = Field('shippingMethod', convert=enum_of(Prodigi.ShippingMethod))
+    idempotency_key = Field('idempotencyKey')
+    status = Field('status')
+    charges = Field('charges')
+    shipments = Field('shipments')
+    recipient = Field('recipient')
+    items = Field('items')
+    packing_slip = Field('packingSlip')
+    metadata = Field('metadata')
+    payload_hash = Field(convert=payload_hash)
+
+
+class ProdigiStatusSpace(Namespace):
+    stage = Field('stage', convert=enum_of(Prodigi.StatusStage))
+    download_assets = Field('details', 'downloadAssets', convert=enum_of(Prodigi.DetailStatus))
+    print_ready_assets_prepared = Field('details', 'printReadyAssetsPrepared',
+                                        convert=enum_of(Prodigi.DetailStatus))
+    allocate_production_location = Field('details', 'allocateProductionLocation',
+                                         convert=enum_of(Prodigi.DetailStatus))
+    in_production = Field('details', 'inProduction', convert=enum_of(Prodigi.DetailStatus))
+    shipping = Field('details', 'shipping', convert=enum_of(Prodigi.DetailStatus))
+    issues = Field('issues')
+
+
+class ProdigiIssueSpace(Namespace):
+    object_id = Field('objectId')
+    error_code = Field('errorCode', convert=enum_of(Prodigi.IssueErrorCode))
+    description = Field('description')
+    authorization_details = Field('authorisationDetails')
+
+
+class ProdigiAuthorizationDetailsSpace(Namespace):
+    authorization_url = Field('authorisationUrl')
+    payment_details = Field('paymentDetails')
+
+
+class ProdigiCostSpace(Namespace):
+    amount = Field('amount')
+    currency = Field('currency')
+
+
+class ProdigiChargeSpace(Namespace):
+    prodigi_id = Field('id')
+    prodigi_invoice_number = Field('prodigiInvoiceNumber')
+    total_cost = Field('totalCost')
+    items = Field('items')
+
+
+class ProdigiChargeItemSpace(Namespace):
+    prodigi_id = Field('id')
+    description = Field('description')
+    item_sku = Field('itemSku')
+    shipment_id = Field('shipmentId')
+    item_id = Field('itemId')
+    merchant_item_reference = Field('merchantItemReference')
+    cost = Field('cost')
+
+
+class ProdigiShipmentSpace(Namespace):
+    prodigi_id = Field('id')
+    carrier_name = Field('carrier', 'name')
+    carrier_service = Field('carrier', 'service')
+    service = Field('carrier', 'service')
+    tracking_number = Field('tracking', 'number')
+    tracking_url = Field('tracking', 'url')
+    dispatch_date = Field('dispatchDate', convert=prodigi_timestamp)
+    items = Field('items')
+    fulfillment_location = Field('fulfillmentLocation')
+
+
+class ProdigiFulfillmentLocationSpace(Namespace):
+    country_code = Field('countryCode')
+    lab_code = Field('labCode')
+
+
+class ProdigiShipmentItemSpace(Namespace):
+    item_id = Field('itemId')
+
+
+class ProdigiRecipientSpace(Namespace):
+    name = Field('name')
+    email = Field('email')
+    phone_number = Field('phoneNumber')
+    address = Field('address')
+
+
+class ProdigiAddressSpace(Namespace):
+    first_line = Field('line1')
+    second_line = Field('line2')
+    zip = Field('postalOrZipCode')
+    country = Field('countryCode')
+    city = Field('townOrCity')
+    state = Field('stateOrCounty')
+
+
+class ProdigiItemSpace(Namespace):
+    prodigi_id = Field('id')
+    merchant_reference = Field('merchantReference')
+    sku = Field('sku')
+    copies = Field('copies')
+    sizing = Field('sizing', convert=enum_of(Prodigi.Sizing))
+    recipient_cost = Field('recipientCost')
+    attributes = Field('attributes')
+    assets = Field('assets')
+
+
+class ProdigiAssetSpace(Namespace):
+    print_area = Field('printArea')
+    url = Field('url')
+
+
+class ProdigiPackingSlipSpace(Namespace):
+    url = Field('url')
+    status = Field('status')
+
+
+class ProdigiShipmentDetailSpace(Namespace):
+    shipment_id = Field('shipmentId')
+    successful = Field('successful')
+    error_code = Field('errorCode', convert=enum_of(Prodigi.ShipmentUpdateErrorCode))
+    description = Field('description')
@@ -1,6 +1,9 @@
 from __future__ import annotations
+import hashlib
 from typing import List, Union, Dict, Any
-from database.utils import Base, make_engine, merge_lists
+from datetime import datetime
+from database.utils import Base, make_engine, merge_lists, field_map
+from database.config import ALEMBIC_CONFIG
 from database.enums import Etsy, OrderStatus, Prodigi
 from database.namespaces import EtsyReceiptSpace, EtsyReceiptShipmentSpace, EtsySellerSpace, EtsyBuyerSpace, \
     EtsyTransactionSpace, AddressSpace, EtsyProductPropertySpace, EtsyProductSpace, EtsyShippingProfileSpace, \
@@ -11,8 +14,11 @@ from database.namespaces import EtsyReceiptSpace, EtsyReceiptShipmentSpace, Etsy
     ProdigiPackingSlipSpace, ProdigiChargeItemSpace, ProdigiStatusSpace, ProdigiIssueSpace, \
     ProdigiAuthorizationDetailsSpace, ProdigiShipmentDetailSpace, ProdigiAddressSpace
 
+from alembic import command
+from alembic.config import Config
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Float, ForeignKey, Enum, Table, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Float, ForeignKey, Enum, Table, DateTime, Index, \
+    inspect
 
 transaction_product_data_association_table = Table(
     "transaction_product_data_association_table",
@@ -67,6 +73,25 @@ class EtsyReceipt(Base):
     API Reference: https://developer.etsy.com/documentation/reference#operation/getShopReceipt
     """
     __tablename__ = 'etsy_receipt'
+    __natural_key__ = 'receipt_id'
+    __table_args__ = (
+        # Incomplete receipts by fulfillment state: update_incomplete_orders, fulfill_incomplete_orders
+        Index('ix_etsy_receipt_order_status_needs_fulfillment_status', 'order_status', 'needs_fulfillment', 'status'),
+        # Earliest incomplete receipt: get_etsy_orders
+        Index('ix_etsy_receipt_order_status_create_timestamp', 'order_status', 'create_timestamp'),
+        # Latest receipt: get_etsy_orders
+        Index('ix_etsy_receipt_create_timestamp', 'create_timestamp'),
+    )
+    __field_map__ = field_map('receipt_type', 'status', 'payment_method', 'message_from_seller', 'message_from_buyer',
+                              'message_from_payment', 'is_paid', 'is_shipped', 'create_timestamp', 'created_timestamp',
+                              'update_timestamp', 'updated_timestamp', 'is_gift', 'gift_message', 'grand_total',
+                              'grand_total_divisor', 'grand_total_currency_code', 'sub_total', 'sub_total_divisor',
+                              'sub_total_currency_code', 'total_price', 'total_price_divisor',
+                              'total_price_currency_code', 'shipping_cost', 'shipping_cost_divisor',
+                              'shipping_cost_currency_code', 'tax_cost', 'tax_cost_divisor', 'tax_cost_currency_code',
+                              'vat_cost', 'vat_cost_divisor', 'vat_cost_currency_code', 'discount', 'discount_divisor',
+                              'discount_currency_code', 'gift_wrap_price', 'gift_wrap_price_divisor',
+                              'gift_wrap_price_currency_code')
     id = Column(Integer, primary_key=True)
     receipt_id = Column(BigInteger, unique=True)
     receipt_type = Column(Integer)
@@ -219,7 +244,7 @@ class EtsyReceipt(Base):
 
     @staticmethod
     def get_existing(session, receipt_id: int) -> Union[None, EtsyReceipt]:
-        return session.query(EtsyReceipt).filter(EtsyReceipt.receipt_id == int(receipt_id)).first()
+        return EtsyReceipt.get_by_natural_key(session, int(receipt_id))
 
     def update(self, receipt_data: Union[EtsyReceiptSpace, Dict[str, Any]] = None,
                order_status: OrderStatus = None,
@@ -233,86 +258,12 @@ class EtsyReceipt(Base):
                refunds: List[EtsyRefund] = None,
                overwrite_list: bool = False
                ):
+        changed_columns = set()
         if receipt_data is not None:
             if not isinstance(receipt_data, EtsyReceiptSpace):
                 receipt_data = self.create_namespace(receipt_data)
 
-            if self.receipt_type != receipt_data.receipt_type:
-                self.receipt_type = receipt_data.receipt_type
-            if self.status != receipt_data.status:
-                self.status = receipt_data.status
-            if self.payment_method != receipt_data.payment_method:
-                self.payment_method = receipt_data.payment_method
-            if self.message_from_seller != receipt_data.message_from_seller:
-                self.message_from_seller = receipt_data.message_from_seller
-            if self.message_from_buyer != receipt_data.message_from_buyer:
-                self.message_from_buyer = receipt_data.message_from_buyer
-            if self.message_from_payment != receipt_data.message_from_payment:
-                self.message_from_payment = receipt_data.message_from_payment
-            if self.is_paid != receipt_data.is_paid:
-                self.is_paid = receipt_data.is_paid
-            if self.is_shipped != receipt_data.is_shipped:
-                self.is_shipped = receipt_data.is_shipped
-            if self.create_timestamp != receipt_data.create_timestamp:
-                self.create_timestamp = receipt_data.create_timestamp
-            if self.created_timestamp != receipt_data.created_timestamp:
-                self.created_timestamp = receipt_data.created_timestamp
-            if self.update_timestamp != receipt_data.update_timestamp:
-                self.update_timestamp = receipt_data.update_timestamp
-            if self.update_timestamp != receipt_data.updated_timestamp:
-                self.updated_timestamp = receipt_data.updated_timestamp
-            if self.is_gift != receipt_data.is_gift:
-                self.is_gift = receipt_data.is_gift
-            if self.gift_message != receipt_data.gift_message:
-                self.gift_message = receipt_data.gift_message
-            if self.grand_total != receipt_data.grand_total:
-                self.grand_total = receipt_data.grand_total
-            if self.grand_total_divisor != receipt_data.grand_total_divisor:
-                self.grand_total_divisor = receipt_data.grand_total_divisor
-            if self.grand_total_currency_code != receipt_data.grand_total_currency_code:
-                self.grand_total_currency_code = receipt_data.grand_total_currency_code
-            if self.sub_total != receipt_data.sub_total:
-                self.sub_total = receipt_data.sub_total
-            if self.sub_total_divisor != receipt_data.sub_total_divisor:
-                self.sub_total_divisor = receipt_data.sub_total_divisor
-            if self.sub_total_currency_code != receipt_data.sub_total_currency_code:
-                self.sub_total_currency_code = receipt_data.sub_total_currency_code
-            if self.total_price != receipt_data.total_price:
-                self.total_price = receipt_data.total_price
-            if self.total_price_divisor != receipt_data.total_price_divisor:
-                self.total_price_divisor = receipt_data.total_price_divisor
-            if self.total_price_currency_code != receipt_data.total_price_currency_code:
-                self.total_price_currency_code = receipt_data.total_price_currency_code
-            if self.shipping_cost != receipt_data.shipping_cost:
-                self.shipping_cost = receipt_data.shipping_cost
-            if self.shipping_cost_divisor != receipt_data.shipping_cost_divisor:
-                self.shipping_cost_divisor = receipt_data.shipping_cost_divisor
-            if self.shipping_cost_currency_code != receipt_data.shipping_cost_currency_code:
-                self.shipping_cost_currency_code = receipt_data.shipping_cost_currency_code
-            if self.tax_cost != receipt_data.tax_cost:
-                self.tax_cost = receipt_data.tax_cost
-            if self.tax_cost_divisor != receipt_data.tax_cost_divisor:
-                self.tax_cost_divisor = receipt_data.tax_cost_divisor
-            if self.tax_cost_currency_code != receipt_data.tax_cost_currency_code:
-                self.tax_cost_currency_code = receipt_data.tax_cost_currency_code
-            if self.vat_cost != receipt_data.vat_cost:
-                self.vat_cost = receipt_data.vat_cost
-            if self.vat_cost_divisor != receipt_data.vat_cost_divisor:
-                self.vat_cost_divisor = receipt_data.vat_cost_divisor
-            if self.vat_cost_currency_code != receipt_data.vat_cost_currency_code:
-                self.vat_cost_currency_code = receipt_data.vat_cost_currency_code
-            if self.discount != receipt_data.discount:
-                self.discount = receipt_data.discount
-            if self.discount_divisor != receipt_data.discount_divisor:
-                self.discount_divisor = receipt_data.discount_divisor
-            if self.discount_currency_code != receipt_data.discount_currency_code:
-                self.discount_currency_code = receipt_data.discount_currency_code
-            if self.gift_wrap_price != receipt_data.gift_wrap_price:
-                self.gift_wrap_price = receipt_data.gift_wrap_price
-            if self.gift_wrap_price_divisor != receipt_data.gift_wrap_price_divisor:
-                self.gift_wrap_price_divisor = receipt_data.gift_wrap_price_divisor
-            if self.gift_wrap_price_currency_code != receipt_data.gift_wrap_price_currency_code:
-                self.gift_wrap_price_currency_code = receipt_data.gift_wrap_price_currency_code
+            changed_columns = self.apply_changes(receipt_data)
 
         if order_status is not None and self.order_status != order_status:
             self.order_status = order_status
@@ -342,9 +293,13 @@ class EtsyReceipt(Base):
         if refunds is not None:
             self.refunds = refunds if overwrite_list else merge_lists(self.refunds, refunds)
 
+        return changed_columns
+
 
 class EtsySeller(Base):
     __tablename__ = 'etsy_seller'
+    __natural_key__ = 'seller_id'
+    __field_map__ = field_map('email')
     id = Column(Integer, primary_key=True)
     seller_id = Column(BigInteger, unique=True)
     email = Column(String)
@@ -402,9 +357,7 @@ class EtsySeller(Base):
 
     @staticmethod
     def get_existing(session, seller_id: int) -> Union[None, EtsySeller]:
-        return session.query(EtsySeller).filter(
-            EtsySeller.seller_id == int(seller_id)
-        ).first()
+        return EtsySeller.get_by_natural_key(session, int(seller_id))
 
     def update(self, seller_data: Union[EtsySellerSpace, Dict[str, Any]],
                receipts: List[EtsyReceipt] = None,
@@ -417,8 +370,7 @@ class EtsySeller(Base):
         if not isinstance(seller_data, EtsySellerSpace):
             seller_data = self.create_namespace(seller_data)
 
-        if self.email != seller_data.email:
-            self.email = seller_data.email
+        changed_columns = self.apply_changes(seller_data)
 
         if receipts is not None:
             self.receipts = receipts if overwrite_list else merge_lists(self.receipts, receipts)
@@ -439,9 +391,13 @@ class EtsySeller(Base):
         if shops is not None:
             self.shops = shops if overwrite_list else merge_lists(self.shops, shops)
 
+        return changed_columns
+
 
 class EtsyBuyer(Base):
     __tablename__ = 'etsy_buyer'
+    __natural_key__ = 'buyer_id'
+    __field_map__ = field_map('email', 'name')
     id: Mapped[int] = mapped_column(primary_key=True)
     buyer_id = Column(BigInteger, unique=True)
     email = Column(String)
@@ -489,9 +445,7 @@ class EtsyBuyer(Base):
 
     @staticmethod
     def get_existing(session, buyer_id: int) -> Union[None, EtsyBuyer]:
-        return session.query(EtsyBuyer).filter(
-            EtsyBuyer.buyer_id == int(buyer_id)
-        ).first()
+        return EtsyBuyer.get_by_natural_key(session, int(buyer_id))
 
     def update(self, buyer_data: Union[EtsyBuyerSpace, Dict[str, Any]],
                receipts: List[EtsyReceipt] = None,
@@ -501,10 +455,7 @@ class EtsyBuyer(Base):
         if not isinstance(buyer_data, EtsyBuyerSpace):
             buyer_data = self.create_namespace(buyer_data)
 
-        if self.email != buyer_data.email:
-            self.email = buyer_data.email
-        if self.name != buyer_data.name:
-            self.name = buyer_data.name
+        changed_columns = self.apply_changes(buyer_data)
 
         if receipts is not None:
             self.receipts = receipts if overwrite_list else merge_lists(self.receipts, receipts)
@@ -515,9 +466,15 @@ class EtsyBuyer(Base):
         if addresses is not None:
             self.addresses = addresses if overwrite_list else merge_lists(self.addresses, addresses)
 
+        return changed_columns
+
 
 class Address(Base):
     __tablename__ = 'address'
+    __natural_key__ = 'fingerprint'
+    __table_args__ = (
+        Index('ix_address_fingerprint', 'fingerprint', unique=True),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     first_line = Column(String)
     second_line = Column(String)
@@ -527,6 +484,10 @@ class Address(Base):
     country = Column(String)
     formatted = Column(String)
 
+    # sha256 of the normalized address fields, so an address is found with one index probe instead of comparing six
+    # unindexed columns
+    fingerprint = Column(String(64))
+
     # relationships
 
     # one to many
@@ -551,7 +512,9 @@ class Address(Base):
             city=address_data.city,
             state=address_data.state,
             zip_code=address_data.zip,
-            country=address_data.country
+            country=address_data.country,
+            fingerprint=cls.make_fingerprint(address_data.zip, address_data.city, address_data.state,
+                                             address_data.country, address_data.first_line, address_data.second_line)
         )
 
         if hasattr(address_data, 'formatted_address'):
@@ -572,17 +535,22 @@ class Address(Base):
     def create_namespace(address_data: Dict[str, Any]):
         return AddressSpace(address_data)
 
+    @staticmethod
+    def make_fingerprint(zip_code: str, city: str, state: str, country: str, first_line: str,
+                         second_line: str) -> str:
+        """
+        Hash of the address fields after trimming, collapsing whitespace and case folding, so the same address typed
+        slightly differently maps to the same row. Keep in sync with the backfill in migration 0002
+        """
+        fields = [' '.join(str(field).split()).casefold() if field is not None else ''
+                  for field in (zip_code, city, state, country, first_line, second_line)]
+        return hashlib.sha256('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
     @staticmethod
     def get_existing(session, zip_code: str, city: str, state: str, country: str, first_line: str,
                      second_line: str) -> Union[None, Address]:
-        return session.query(Address).filter(
-            Address.zip_code == zip_code,
-            Address.city == city,
-            Address.state == state,
-            Address.country == country,
-            Address.first_line == first_line,
-            Address.second_line == second_line
-        ).first()
+        return Address.get_by_natural_key(
+            session, Address.make_fingerprint(zip_code, city, state, country, first_line, second_line))
 
 
 class EtsyTransaction(Base):
@@ -590,6 +558,13 @@ class EtsyTransaction(Base):
     https://developer.etsy.com/documentation/reference/#operation/getShopReceiptTransaction
     """
     __tablename__ = 'etsy_transaction'
+    __natural_key__ = 'transaction_id'
+    __field_map__ = field_map('title', 'description', 'create_timestamp', 'paid_timestamp', 'shipped_timestamp',
+                              'quantity', 'is_digital', 'file_data', 'transaction_type', 'price', 'price_divisor',
+                              'price_currency_code', 'shipping_cost', 'shipping_cost_divisor',
+                              'shipping_cost_currency_code', 'min_processing_days', 'max_processing_days',
+                              'shipping_method', 'shipping_upgrade', 'expected_ship_date', 'buyer_coupon',
+                              'shop_coupon')
     id: Mapped[int] = mapped_column(primary_key=True)
     transaction_id = Column(BigInteger, unique=True)
     title = Column(String)
@@ -696,9 +671,7 @@ class EtsyTransaction(Base):
 
     @staticmethod
     def get_existing(session, transaction_id: int) -> Union[None, EtsyTransaction]:
-        return session.query(EtsyTransaction).filter(
-            EtsyTransaction.transaction_id == int(transaction_id)
-        ).first()
+        return EtsyTransaction.get_by_natural_key(session, int(transaction_id))
 
     def update(self, transaction_data: Union[EtsyTransactionSpace, Dict[str, Any]] = None,
                buyer: EtsyBuyer = None,
@@ -709,54 +682,12 @@ class EtsyTransaction(Base):
                product_properties: List[EtsyProductProperty] = None,
                overwrite_list: bool = False):
 
+        changed_columns = set()
         if transaction_data is not None:
             if not isinstance(transaction_data, EtsyTransactionSpace):
                 transaction_data = self.create_namespace(transaction_data)
 
-            if self.title != transaction_data.title:
-                self.title = transaction_data.title
-            if self.description != transaction_data.description:
-                self.description = transaction_data.description
-            if self.create_timestamp != transaction_data.create_timestamp:
-                self.create_timestamp = transaction_data.create_timestamp
-            if self.paid_timestamp != transaction_data.paid_timestamp:
-                self.paid_timestamp = transaction_data.paid_timestamp
-            if self.shipped_timestamp != transaction_data.shipped_timestamp:
-                self.shipped_timestamp = transaction_data.shipped_timestamp
-            if self.quantity != transaction_data.quantity:
-                self.quantity = transaction_data.quantity
-            if self.is_digital != transaction_data.is_digital:
-                self.is_digital = transaction_data.is_digital
-            if self.file_data != transaction_data.file_data:
-                self.file_data = transaction_data.file_data
-            if self.transaction_type != transaction_data.transaction_type:
-                self.transaction_type = transaction_data.transaction_type
-            if self.price != transaction_data.price:
-                self.price = transaction_data.price
-            if self.price_divisor != transaction_data.price_divisor:
-                self.price_divisor = transaction_data.price_divisor
-            if self.price_currency_code != transaction_data.price_currency_code:
-                self.price_currency_code = transaction_data.price_currency_code
-            if self.shipping_cost != transaction_data.shipping_cost:
-                self.shipping_cost = transaction_data.shipping_cost
-            if self.shipping_cost_divisor != transaction_data.shipping_cost_divisor:
-                self.shipping_cost_divisor = transaction_data.shipping_cost_divisor
-            if self.shipping_cost_currency_code != transaction_data.shipping_cost_currency_code:
-                self.shipping_cost_currency_code = transaction_data.shipping_cost_currency_code
-            if self.min_processing_days != transaction_data.min_processing_days:
-                self.min_processing_days = transaction_data.min_processing_days
-            if self.max_processing_days != transaction_data.max_processing_days:
-                self.max_processing_days = transaction_data.max_processing_days
-            if self.shipping_method != transaction_data.shipping_method:
-                self.shipping_method = transaction_data.shipping_method
-            if self.shipping_upgrade != transaction_data.shipping_upgrade:
-                self.shipping_upgrade = transaction_data.shipping_upgrade
-            if self.expected_ship_date != transaction_data.expected_ship_date:
-                self.expected_ship_date = transaction_data.expected_ship_date
-            if self.buyer_coupon != transaction_data.buyer_coupon:
-                self.buyer_coupon = transaction_data.buyer_coupon
-            if self.shop_coupon != transaction_data.shop_coupon:
-                self.shop_coupon = transaction_data.shop_coupon
+            changed_columns = self.apply_changes(transaction_data)
 
         if buyer is not None and self.buyer != buyer:
             self.buyer = buyer
@@ -777,12 +708,16 @@ class EtsyTransaction(Base):
             self.product_properties = product_properties if overwrite_list else merge_lists(self.product_properties,
                                                                                             product_properties)
 
+        return changed_columns
+
 
 class EtsyProduct(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getListingProduct
     """
     __tablename__ = 'etsy_product'
+    __natural_key__ = 'product_id'
+    __field_map__ = field_map('sku', 'is_deleted')
     id = Column(Integer, primary_key=True)
     product_id = Column(BigInteger, unique=True)
     sku = Column(Integer)
@@ -839,7 +774,7 @@ class EtsyProduct(Base):
 
     @staticmethod
     def get_existing(session, product_id: int) -> Union[None, EtsyProduct]:
-        return session.query(EtsyProduct).filter(EtsyProduct.product_id == int(product_id)).first()
+        return EtsyProduct.get_by_natural_key(session, int(product_id))
 
     def update(self, product_data: Union[EtsyProductSpace, Dict[str, Any]] = None,
                transactions: List[EtsyTransaction] = None,
@@ -849,14 +784,12 @@ class EtsyProduct(Base):
                overwrite_lists: bool = False
                ):
 
+        changed_columns = set()
         if product_data is not None:
             if not isinstance(product_data, EtsyProductSpace):
                 product_data = self.create_namespace(product_data)
 
-            if self.sku != product_data.sku:
-                self.sku = product_data.sku
-            if self.is_deleted != product_data.is_deleted:
-                self.is_deleted = product_data.is_deleted
+            changed_columns = self.apply_changes(product_data)
 
         if transactions is not None:
             self.transactions = transactions if overwrite_lists else merge_lists(self.transactions, transactions)
@@ -870,12 +803,18 @@ class EtsyProduct(Base):
         if listings is not None:
             self.listings = listings if overwrite_lists else merge_lists(self.listings, listings)
 
+        return changed_columns
+
 
 class EtsyShippingProfile(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getShopShippingProfile
     """
     __tablename__ = 'etsy_shipping_profile'
+    __natural_key__ = 'shipping_profile_id'
+    __field_map__ = field_map('title', 'min_processing_days', 'max_processing_days', 'processing_days_display_label',
+                              'origin_country_iso', 'is_deleted', 'origin_postal_code', 'profile_type',
+                              'domestic_handling_fee', internation_handling_fee='international_handling_fee')
     id = Column(Integer, primary_key=True)
     shipping_profile_id = Column(BigInteger, unique=True)
     title = Column(String)
@@ -951,9 +890,7 @@ class EtsyShippingProfile(Base):
 
     @staticmethod
     def get_existing(session, shipping_profile_id: int) -> Union[None, EtsyShippingProfile]:
-        return session.query(EtsyShippingProfile).filter(
-            EtsyShippingProfile.shipping_profile_id == int(shipping_profile_id)
-        ).first()
+        return EtsyShippingProfile.get_by_natural_key(session, int(shipping_profile_id))
 
     def update(self, shipping_profile_data: Union[EtsyShippingProfile, Dict[str, Any]] = None,
                seller: EtsySeller = None,
@@ -964,30 +901,12 @@ class EtsyShippingProfile(Base):
                overwrite_lists: bool = False
                ):
 
+        changed_columns = set()
         if shipping_profile_data is not None:
             if not isinstance(shipping_profile_data, EtsyShippingProfileSpace):
                 shipping_profile_data = self.create_namespace(shipping_profile_data)
 
-            if self.title != shipping_profile_data.title:
-                self.title = shipping_profile_data.title
-            if self.min_processing_days != shipping_profile_data.min_processing_days:
-                self.min_processing_days = shipping_profile_data.min_processing_days
-            if self.max_processing_days != shipping_profile_data.max_processing_days:
-                self.max_processing_days = shipping_profile_data.max_processing_days
-            if self.processing_days_display_label != shipping_profile_data.processing_days_display_label:
-                self.processing_days_display_label = shipping_profile_data.processing_days_display_label
-            if self.origin_country_iso != shipping_profile_data.origin_country_iso:
-                self.origin_country_iso = shipping_profile_data.origin_country_iso
-            if self.is_deleted != shipping_profile_data.is_deleted:
-                self.is_deleted = shipping_profile_data.is_deleted
-            if self.origin_postal_code != shipping_profile_data.origin_postal_code:
-                self.origin_postal_code = shipping_profile_data.origin_postal_code
-            if self.profile_type != shipping_profile_data.profile_type:
-                self.profile_type = shipping_profile_data.profile_type
-            if self.domestic_handling_fee != shipping_profile_data.domestic_handling_fee:
-                self.domestic_handling_fee = shipping_profile_data.domestic_handling_fee
-            if self.internation_handling_fee != shipping_profile_data.international_handling_fee:
-                self.internation_handling_fee = shipping_profile_data.international_handling_fee
+            changed_columns = self.apply_changes(shipping_profile_data)
 
         if seller is not None and self.seller != seller:
             self.seller = seller
@@ -1004,12 +923,19 @@ class EtsyShippingProfile(Base):
         if listings is not None:
             self.listings = listings if overwrite_lists else merge_lists(self.listings, listings)
 
+        return changed_columns
+
 
 class EtsyShippingProfileDestination(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getShopShippingProfileDestinationsByShippingProfile
     """
     __tablename__ = 'etsy_shipping_profile_destination'
+    __natural_key__ = 'shipping_profile_destination_id'
+    __field_map__ = field_map('origin_country_iso', 'destination_country_iso', 'destination_region', 'primary_cost',
+                              'primary_cost_divisor', 'primary_cost_currency_code', 'secondary_cost',
+                              'secondary_cost_divisor', 'secondary_cost_currency_code', 'shipping_carrier_id',
+                              'mail_class', 'min_delivery_days', 'max_delivery_days')
     id = Column(Integer, primary_key=True)
     shipping_profile_destination_id = Column(BigInteger, unique=True)
     origin_country_iso = Column(String)
@@ -1071,9 +997,7 @@ class EtsyShippingProfileDestination(Base):
 
     @staticmethod
     def get_existing(session, shipping_destination_id: int) -> Union[None, EtsyShippingProfileDestination]:
-        return session.query(EtsyShippingProfileDestination).filter(
-            EtsyShippingProfileDestination.shipping_profile_destination_id == int(shipping_destination_id)
-        ).first()
+        return EtsyShippingProfileDestination.get_by_natural_key(session, int(shipping_destination_id))
 
     def update(self, shipping_destination_data: Union[EtsyShippingProfileDestinationSpace, Dict[str, Any]],
                shipping_profile: EtsyShippingProfile = None
@@ -1081,42 +1005,24 @@ class EtsyShippingProfileDestination(Base):
         if not isinstance(shipping_destination_data, EtsyShippingProfileDestinationSpace):
             shipping_destination_data = self.create_namespace(shipping_destination_data)
 
-        if self.origin_country_iso != shipping_destination_data.origin_country_iso:
-            self.origin_country_iso = shipping_destination_data.origin_country_iso
-        if self.destination_country_iso != shipping_destination_data.destination_country_iso:
-            self.destination_country_iso = shipping_destination_data.destination_country_iso
-        if self.destination_region != shipping_destination_data.destination_region:
-            self.destination_region = shipping_destination_data.destination_region
-        if self.primary_cost != shipping_destination_data.primary_cost:
-            self.primary_cost = shipping_destination_data.primary_cost
-        if self.primary_cost_divisor != shipping_destination_data.primary_cost_divisor:
-            self.primary_cost_divisor = shipping_destination_data.primary_cost_divisor
-        if self.primary_cost_currency_code != shipping_destination_data.primary_cost_currency_code:
-            self.primary_cost_currency_code = shipping_destination_data.primary_cost_currency_code
-        if self.secondary_cost != shipping_destination_data.secondary_cost:
-            self.secondary_cost = shipping_destination_data.secondary_cost
-        if self.secondary_cost_divisor != shipping_destination_data.secondary_cost_divisor:
-            self.secondary_cost_divisor = shipping_destination_data.secondary_cost_divisor
-        if self.secondary_cost_currency_code != shipping_destination_data.secondary_cost_currency_code:
-            self.secondary_cost_currency_code = shipping_destination_data.secondary_cost_currency_code
-        if self.shipping_carrier_id != shipping_destination_data.shipping_carrier_id:
-            self.shipping_carrier_id = shipping_destination_data.shipping_carrier_id
-        if self.mail_class != shipping_destination_data.mail_class:
-            self.mail_class = shipping_destination_data.mail_class
-        if self.min_delivery_days != shipping_destination_data.min_delivery_days:
-            self.min_delivery_days = shipping_destination_data.min_delivery_days
-        if self.max_delivery_days != shipping_destination_data.max_delivery_days:
-            self.max_delivery_days = shipping_destination_data.max_delivery_days
+        changed_columns = self.apply_changes(shipping_destination_data)
 
         if shipping_profile is not None and self.shipping_profile != shipping_profile:
             self.shipping_profile = shipping_profile
 
+        return changed_columns
+
 
 class EtsyShippingProfileUpgrade(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getShopShippingProfileUpgrades
     """
     __tablename__ = 'etsy_shipping_profile_upgrade'
+    __natural_key__ = 'upgrade_id'
+    __field_map__ = field_map('upgrade_name', 'type', 'rank', 'language', 'price', 'price_divisor',
+                              'price_currency_code', 'secondary_price', 'secondary_price_divisor',
+                              'secondary_price_currency_code', 'shipping_carrier_id', 'mail_class', 'min_delivery_days',
+                              'max_delivery_days')
     id = Column(Integer, primary_key=True)
     upgrade_id = Column(BigInteger, unique=True)
     upgrade_name = Column(String)
@@ -1180,9 +1086,7 @@ class EtsyShippingProfileUpgrade(Base):
 
     @staticmethod
     def get_existing(session, shipping_upgrade_id: int) -> Union[None, EtsyShippingProfileUpgrade]:
-        return session.query(EtsyShippingProfileUpgrade).filter(
-            EtsyShippingProfileUpgrade.upgrade_id == int(shipping_upgrade_id)
-        ).first()
+        return EtsyShippingProfileUpgrade.get_by_natural_key(session, int(shipping_upgrade_id))
 
     def update(self, shipping_upgrade_data: Union[EtsyShippingProfileUpgradeSpace, Dict[str, Any]],
                shipping_profile: EtsyShippingProfile = None
@@ -1190,44 +1094,21 @@ class EtsyShippingProfileUpgrade(Base):
         if not isinstance(shipping_upgrade_data, EtsyShippingProfileUpgradeSpace):
             shipping_upgrade_data = self.create_namespace(shipping_upgrade_data)
 
-        if self.upgrade_name != shipping_upgrade_data.upgrade_name:
-            self.upgrade_name = shipping_upgrade_data.upgrade_name
-        if self.type != shipping_upgrade_data.type:
-            self.type = shipping_upgrade_data.type
-        if self.rank != shipping_upgrade_data.rank:
-            self.rank = shipping_upgrade_data.rank
-        if self.language != shipping_upgrade_data.language:
-            self.language = shipping_upgrade_data.language
-        if self.price != shipping_upgrade_data.price:
-            self.price = shipping_upgrade_data.price
-        if self.price_divisor != shipping_upgrade_data.price_divisor:
-            self.price_divisor = shipping_upgrade_data.price_divisor
-        if self.price_currency_code != shipping_upgrade_data.price_currency_code:
-            self.price_currency_code = shipping_upgrade_data.price_currency_code
-        if self.secondary_price != shipping_upgrade_data.secondary_price:
-            self.secondary_price = shipping_upgrade_data.secondary_price
-        if self.secondary_price_divisor != shipping_upgrade_data.secondary_price_divisor:
-            self.secondary_price_divisor = shipping_upgrade_data.secondary_price_divisor
-        if self.secondary_price_currency_code != shipping_upgrade_data.secondary_price_currency_code:
-            self.secondary_price_currency_code = shipping_upgrade_data.secondary_price_currency_code
-        if self.shipping_carrier_id != shipping_upgrade_data.shipping_carrier_id:
-            self.shipping_carrier_id = shipping_upgrade_data.shipping_carrier_id
-        if self.mail_class != shipping_upgrade_data.mail_class:
-            self.mail_class = shipping_upgrade_data.mail_class
-        if self.min_delivery_days != shipping_upgrade_data.min_delivery_days:
-            self.min_delivery_days = shipping_upgrade_data.min_delivery_days
-        if self.max_delivery_days != shipping_upgrade_data.max_delivery_days:
-            self.max_delivery_days = shipping_upgrade_data.max_delivery_days
+        changed_columns = self.apply_changes(shipping_upgrade_data)
 
         if shipping_profile is not None and self.shipping_profile != shipping_profile:
             self.shipping_profile = shipping_profile
 
+        return changed_columns
+
 
 class EtsyReceiptShipment(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getShopReceipt
     """
     __tablename__ = 'etsy_shipment'
+    __natural_key__ = 'receipt_shipping_id'
+    __field_map__ = field_map('shipment_notification_timestamp', 'carrier_name', 'tracking_code')
     id = Column(Integer, primary_key=True)
     receipt_shipping_id = Column(BigInteger, unique=True)
     shipment_notification_timestamp = Column(DateTime)
@@ -1264,25 +1145,20 @@ class EtsyReceiptShipment(Base):
 
     @staticmethod
     def get_existing(session, receipt_shipping_id: int) -> Union[None, EtsyReceiptShipment]:
-        return session.query(EtsyReceiptShipment).filter(
-            EtsyReceiptShipment.receipt_shipping_id == int(receipt_shipping_id)
-        ).first()
+        return EtsyReceiptShipment.get_by_natural_key(session, int(receipt_shipping_id))
 
     def update(self, receipt_shipment_data: Union[EtsyReceiptShipmentSpace, Dict[str, Any]],
                receipt: EtsyReceipt = None):
         if not isinstance(receipt_shipment_data, EtsyReceiptShipmentSpace):
             receipt_shipment_data = self.create_namespace(receipt_shipment_data)
 
-        if self.shipment_notification_timestamp != receipt_shipment_data.shipment_notification_timestamp:
-            self.shipment_notification_timestamp = receipt_shipment_data.shipment_notification_timestamp
-        if self.carrier_name != receipt_shipment_data.carrier_name:
-            self.carrier_name = receipt_shipment_data.carrier_name
-        if self.tracking_code != receipt_shipment_data.tracking_code:
-            self.tracking_code = receipt_shipment_data.tracking_code
+        changed_columns = self.apply_changes(receipt_shipment_data)
 
         if receipt is not None and self.receipt != receipt:
             self.receipt = receipt
 
+        return changed_columns
+
 
 class EtsyVariation(Base):
     __tablename__ = 'etsy_variation'
@@ -1296,6 +1172,9 @@ class EtsyProductProperty(Base):
     https://developer.etsy.com/documentation/reference/#operation/getListingProperties
     """
     __tablename__ = 'etsy_product_property'
+    __natural_key__ = 'property_id'
+    __lookup_key__ = ('property_id', 'property_name')
+    __field_map__ = field_map('property_name', 'scale_id', 'scale_name')
     id: Mapped[int] = mapped_column(primary_key=True)
     property_id = Column(BigInteger, unique=True)
     property_name = Column(String)
@@ -1340,11 +1219,7 @@ class EtsyProductProperty(Base):
 
     @staticmethod
     def get_existing(session, property_id: int, property_name: str) -> Union[None, EtsyProductProperty]:
-        return session.query(EtsyProductProperty).filter(
-            EtsyProductProperty.property_id == int(property_id)
-        ).filter(
-            EtsyProductProperty.property_name == property_name
-        ).first()
+        return EtsyProductProperty.get_by_natural_key(session, int(property_id), property_name)
 
     def update(self, property_data: Union[EtsyProductPropertySpace, Dict[str, Any]],
                transactions: List[EtsyTransaction] = None,
@@ -1352,22 +1227,30 @@ class EtsyProductProperty(Base):
         if not isinstance(property_data, EtsyProductPropertySpace):
             property_data = self.create_namespace(property_data)
 
-        if self.property_name != property_data.property_name:
-            self.property_name = property_data.property_name
-        if self.scale_id != property_data.scale_id:
-            self.scale_id = property_data.scale_id
-        if self.scale_name != property_data.scale_name:
-            self.scale_name = property_data.scale_name
+        changed_columns = self.apply_changes(property_data)
 
         if transactions is not None:
             self.transactions = transactions if overwrite_lists else merge_lists(self.transactions, transactions)
 
+        return changed_columns
+
 
 class EtsyListing(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getListing
     """
     __tablename__ = 'etsy_listing'
+    __natural_key__ = 'listing_id'
+    __field_map__ = field_map('title', 'description', 'state', 'creation_timestamp', 'created_timestamp',
+                              'ending_timestamp', 'original_creation_timestamp', 'last_modified_timestamp',
+                              'updated_timestamp', 'state_timestamp', 'quantity', 'featured_rank', 'url',
+                              'num_favorers', 'non_taxable', 'is_taxable', 'is_customizable', 'is_personalizable',
+                              'personalization_is_required', 'personalization_char_count_max',
+                              'personalization_instructions', 'listing_type', 'tags', 'materials', 'processing_min',
+                              'processing_max', 'who_made', 'when_made', 'is_supply', 'item_weight', 'item_weight_unit',
+                              'item_length', 'item_width', 'item_height', 'item_dimensions_unit', 'is_private', 'style',
+                              'file_data', 'has_variations', 'should_auto_renew', 'language', 'price', 'price_divisor',
+                              'price_currency_code', 'taxonomy_id', 'skus', 'views')
     id: Mapped[int] = mapped_column(primary_key=True)
     listing_id = Column(BigInteger, unique=True)
     title = Column(String)
@@ -1533,9 +1416,7 @@ class EtsyListing(Base):
 
     @staticmethod
     def get_existing(session, listing_id: int) -> Union[None, EtsyListing]:
-        return session.query(EtsyListing).filter(
-            EtsyListing.listing_id == int(listing_id)
-        ).first()
+        return EtsyListing.get_by_natural_key(session, int(listing_id))
 
     def update(self, listing_data: Union[EtsyListingSpace, Dict[str, Any]] = None,
                shipping_profile: EtsyShippingProfile = None,
@@ -1548,104 +1429,12 @@ class EtsyListing(Base):
                overwrite_list: bool = False
                ):
 
+        changed_columns = set()
         if listing_data is not None:
             if not isinstance(listing_data, EtsyListingSpace):
                 listing_data = self.create_namespace(listing_data)
 
-            if self.title != listing_data.title:
-                self.title = listing_data.title
-            if self.description != listing_data.description:
-                self.description = listing_data.description
-            if self.state != listing_data.state:
-                self.state = listing_data.state
-            if self.creation_timestamp != listing_data.creation_timestamp:
-                self.creation_timestamp = listing_data.creation_timestamp
-            if self.created_timestamp != listing_data.created_timestamp:
-                self.created_timestamp = listing_data.created_timestamp
-            if self.ending_timestamp != listing_data.ending_timestamp:
-                self.ending_timestamp = listing_data.ending_timestamp
-            if self.original_creation_timestamp != listing_data.original_creation_timestamp:
-                self.original_creation_timestamp = listing_data.original_creation_timestamp
-            if self.last_modified_timestamp != listing_data.last_modified_timestamp:
-                self.last_modified_timestamp = listing_data.last_modified_timestamp
-            if self.updated_timestamp != listing_data.updated_timestamp:
-                self.updated_timestamp = listing_data.updated_timestamp
-            if self.state_timestamp != listing_data.state_timestamp:
-                self.state_timestamp = listing_data.state_timestamp
-            if self.quantity != listing_data.quantity:
-                self.quantity = listing_data.quantity
-            if self.featured_rank != listing_data.featured_rank:
-                self.featured_rank = listing_data.featured_rank
-            if self.url != listing_data.url:
-                self.url = listing_data.url
-            if self.num_favorers != listing_data.num_favorers:
-                self.num_favorers = listing_data.num_favorers
-            if self.non_taxable != listing_data.non_taxable:
-                self.non_taxable = listing_data.non_taxable
-            if self.is_taxable != listing_data.is_taxable:
-                self.is_taxable = listing_data.is_taxable
-            if self.is_customizable != listing_data.is_customizable:
-                self.is_customizable = listing_data.is_customizable
-            if self.is_personalizable != listing_data.is_personalizable:
-                self.is_personalizable = listing_data.is_personalizable
-            if self.personalization_is_required != listing_data.personalization_is_required:
-                self.personalization_is_required = listing_data.personalization_is_required
-            if self.personalization_char_count_max != listing_data.personalization_char_count_max:
-                self.personalization_char_count_max = listing_data.personalization_char_count_max
-            if self.personalization_instructions != listing_data.personalization_instructions:
-                self.personalization_instructions = listing_data.personalization_instructions
-            if self.listing_type != listing_data.listing_type:
-                self.listing_type = listing_data.listing_type
-            if self.tags != listing_data.tags:
-                self.tags = listing_data.tags
-            if self.materials != listing_data.materials:
-                self.materials = listing_data.materials
-            if self.processing_min != listing_data.processing_min:
-                self.processing_min = listing_data.processing_min
-            if self.processing_max != listing_data.processing_max:
-                self.processing_max = listing_data.processing_max
-            if self.who_made != listing_data.who_made:
-                self.who_made = listing_data.who_made
-            if self.when_made != listing_data.when_made:
-                self.when_made = listing_data.when_made
-            if self.is_supply != listing_data.is_supply:
-                self.is_supply = listing_data.is_supply
-            if self.item_weight != listing_data.item_weight:
-                self.item_weight = listing_data.item_weight
-            if self.item_weight_unit != listing_data.item_weight_unit:
-                self.item_weight_unit = listing_data.item_weight_unit
-            if self.item_length != listing_data.item_length:
-                self.item_length = listing_data.item_length
-            if self.item_width != listing_data.item_width:
-                self.item_width = listing_data.item_width
-            if self.item_height != listing_data.item_height:
-                self.item_height = listing_data.item_height
-            if self.item_dimensions_unit != listing_data.item_dimensions_unit:
-                self.item_dimensions_unit = listing_data.item_dimensions_unit
-            if self.is_private != listing_data.is_private:
-                self.is_private = listing_data.is_private
-            if self.style != listing_data.style:
-                self.style = listing_data.style
-            if self.file_data != listing_data.file_data:
-                self.file_data = listing_data.file_data
-            if self.has_variations != listing_data.has_variations:
-                self.has_variations = listing_data.has_variations
-            if self.should_auto_renew != listing_data.should_auto_renew:
-                self.should_auto_renew = listing_data.should_auto_renew
-            if self.language != listing_data.language:
-                self.language = listing_data.language
-            if self.price != listing_data.price:
-                self.price = listing_data.price
-            if self.price_divisor != listing_data.price_divisor:
-                self.price_divisor = listing_data.price_divisor
-            if self.price_currency_code != listing_data.price_currency_code:
-                self.price_currency_code = listing_data.price_currency_code
-            if self.taxonomy_id != listing_data.taxonomy_id:
-                self.taxonomy_id = listing_data.taxonomy_id
-            if self.skus != listing_data.skus:
-                self.skus = listing_data.skus
-            if self.views != listing_data.views:
-                self.views = listing_data.views
+            changed_columns = self.apply_changes(listing_data)
 
         if shipping_profile is not None and self.shipping_profile != shipping_profile:
             self.shipping_profile = shipping_profile
@@ -1669,12 +1458,16 @@ class EtsyListing(Base):
         if products is not None:
             self.products = products if overwrite_list else merge_lists(self.products, products)
 
+        return changed_columns
+
 
 class EtsyReturnPolicy(Base):
     """
     https://developer.etsy.com/documentation/reference#operation/getShopReturnPolicy
     """
     __tablename__ = 'etsy_return_policy'
+    __natural_key__ = 'return_policy_id'
+    __field_map__ = field_map('accepts_returns', 'accepts_exchanges', 'return_deadline')
     id = Column(Integer, primary_key=True)
     return_policy_id = Column(BigInteger, unique=True)
     accepts_returns = Column(Boolean)
@@ -1718,9 +1511,7 @@ class EtsyReturnPolicy(Base):
 
     @staticmethod
     def get_existing(session, return_policy_id: int) -> Union[None, EtsyReturnPolicy]:
-        return session.query(EtsyReturnPolicy).filter(
-            EtsyReturnPolicy.return_policy_id == int(return_policy_id)
-        ).first()
+        return EtsyReturnPolicy.get_by_natural_key(session, int(return_policy_id))
 
     def update(self, return_policy_data: Union[EtsyReturnPolicySpace, Dict[str, Any]],
                shop: EtsyShop = None,
@@ -1729,12 +1520,7 @@ class EtsyReturnPolicy(Base):
         if not isinstance(return_policy_data, EtsyReturnPolicySpace):
             return_policy_data = self.create_namespace(return_policy_data)
 
-        if self.accepts_returns != return_policy_data.accepts_returns:
-            self.accepts_returns = return_policy_data.accepts_returns
-        if self.accepts_returns != return_policy_data.accepts_returns:
-            self.accepts_exchanges = return_policy_data.accepts_exchanges
-        if self.return_deadline != return_policy_data.return_deadline:
-            self.return_deadline = return_policy_data.return_deadline
+        changed_columns = self.apply_changes(return_policy_data)
 
         if shop is not None and self.shop != shop:
             self.shop = shop
@@ -1742,12 +1528,16 @@ class EtsyReturnPolicy(Base):
         if listings is not None:
             self.listings = listings if overwrite_list else merge_lists(self.listings, listings)
 
+        return changed_columns
+
 
 class EtsyShopSection(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getShopSection
     """
     __tablename__ = 'etsy_shop_section'
+    __natural_key__ = 'shop_section_id'
+    __field_map__ = field_map('title', 'rank', 'active_listing_count')
     id = Column(Integer, primary_key=True)
     shop_section_id = Column(BigInteger, unique=True)
     title = Column(String)
@@ -1796,9 +1586,7 @@ class EtsyShopSection(Base):
 
     @staticmethod
     def get_existing(session, shop_section_id: int) -> Union[None, EtsyShopSection]:
-        return session.query(EtsyShopSection).filter(
-            EtsyShopSection.shop_section_id == int(shop_section_id)
-        ).first()
+        return EtsyShopSection.get_by_natural_key(session, int(shop_section_id))
 
     def update(self, shop_section_data: Union[EtsyShopSectionSpace, Dict[str, Any]],
                seller: EtsySeller = None, shop: EtsyShop = None,
@@ -1807,12 +1595,7 @@ class EtsyShopSection(Base):
         if not isinstance(shop_section_data, EtsyShopSectionSpace):
             shop_section_data = self.create_namespace(shop_section_data)
 
-        if self.title != shop_section_data.title:
-            self.title = shop_section_data.title
-        if self.rank != shop_section_data.rank:
-            self.rank = shop_section_data.rank
-        if self.active_listing_count != shop_section_data.active_listing_count:
-            self.active_listing_count = shop_section_data.active_listing_count
+        changed_columns = self.apply_changes(shop_section_data)
 
         if seller is not None and self.seller != seller:
             self.seller = seller
@@ -1823,12 +1606,16 @@ class EtsyShopSection(Base):
         if listings is not None:
             self.listings = listings if overwrite_list else merge_lists(self.listings, listings)
 
+        return changed_columns
+
 
 class EtsyProductionPartner(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getShopProductionPartners
     """
     __tablename__ = 'etsy_production_partner'
+    __natural_key__ = 'production_partner_id'
+    __field_map__ = field_map('partner_name', 'location')
     id = Column(Integer, primary_key=True)
     production_partner_id = Column(BigInteger, unique=True)
     partner_name = Column(String)
@@ -1864,9 +1651,7 @@ class EtsyProductionPartner(Base):
 
     @staticmethod
     def get_existing(session, production_partner_id: int) -> Union[None, EtsyProductionPartner]:
-        return session.query(EtsyProductionPartner).filter(
-            EtsyProductionPartner.production_partner_id == int(production_partner_id)
-        ).first()
+        return EtsyProductionPartner.get_by_natural_key(session, int(production_partner_id))
 
     def update(self, production_partner_data: Union[EtsyProductionPartnerSpace, Dict[str, Any]],
                listings: List[EtsyListing] = None,
@@ -1874,20 +1659,32 @@ class EtsyProductionPartner(Base):
         if not isinstance(production_partner_data, EtsyProductionPartnerSpace):
             production_partner_data = self.create_namespace(production_partner_data)
 
-        if self.partner_name != production_partner_data.partner_name:
-            self.partner_name = production_partner_data.partner_name
-        if self.location != production_partner_data.location:
-            self.location = production_partner_data.location
+        changed_columns = self.apply_changes(production_partner_data)
 
         if listings is not None:
             self.listings = listings if overwrite_list else merge_lists(self.listings, listings)
 
+        return changed_columns
+
 
 class EtsyShop(Base):
     """
     https://developer.etsy.com/documentation/reference#operation/getShop
     """
     __tablename__ = 'etsy_shop'
+    __natural_key__ = 'shop_id'
+    __field_map__ = field_map('shop_name', 'create_date', 'title', 'announcement', 'currency_code', 'is_vacation',
+                              'vacation_message', 'sale_message', 'digital_sale_message', 'update_date',
+                              'updated_timestamp', 'listing_active_count', 'digital_listing_count', 'login_name',
+                              'accepts_custom_requests', 'policy_welcome', 'policy_payment', 'policy_shipping',
+                              'policy_refunds', 'policy_additional', 'policy_seller_info', 'policy_update_date',
+                              'policy_has_private_receipt_info', 'has_unstructured_policies', 'policy_privacy',
+                              'vacation_autoreply', 'url', 'image_url_760x100', 'num_favorers', 'languages',
+                              'icon_url_fullxfull', 'is_using_structured_policies', 'has_onboarded_structured_policies',
+                              'include_dispute_form_link', 'is_etsy_payments_onboarded', 'is_calculated_eligible',
+                              'is_opted_into_buyer_promise', 'is_shop_us_based', 'transaction_sold_count',
+                              'shipping_from_country_iso', 'shop_location_country_iso', 'review_count',
+                              'review_average')
     id = Column(Integer, primary_key=True)
     shop_id = Column(BigInteger, unique=True)
     shop_name = Column(String)
@@ -2021,9 +1818,7 @@ class EtsyShop(Base):
 
     @staticmethod
     def get_existing(session, shop_id: int) -> Union[None, EtsyShop]:
-        return session.query(EtsyShop).filter(
-            EtsyShop.shop_id == int(shop_id)
-        ).first()
+        return EtsyShop.get_by_natural_key(session, int(shop_id))
 
     def update(self, shop_data: Union[EtsyShopSpace, Dict[str, Any]],
                seller: EtsySeller = None,
@@ -2035,92 +1830,7 @@ class EtsyShop(Base):
         if not isinstance(shop_data, EtsyShopSpace):
             shop_data = self.create_namespace(shop_data)
 
-        if self.shop_name != shop_data.shop_name:
-            self.shop_name = shop_data.shop_name
-        if self.create_date != shop_data.create_date:
-            self.create_date = shop_data.create_date
-        if self.title != shop_data.title:
-            self.title = shop_data.title
-        if self.announcement != shop_data.announcement:
-            self.announcement = shop_data.announcement
-        if self.currency_code != shop_data.currency_code:
-            self.currency_code = shop_data.currency_code
-        if self.is_vacation != shop_data.is_vacation:
-            self.is_vacation = shop_data.is_vacation
-        if self.vacation_message != shop_data.vacation_message:
-            self.vacation_message = shop_data.vacation_message
-        if self.sale_message != shop_data.sale_message:
-            self.sale_message = shop_data.sale_message
-        if self.digital_sale_message != shop_data.digital_sale_message:
-            self.digital_sale_message = shop_data.digital_sale_message
-        if self.update_date != shop_data.update_date:
-            self.update_date = shop_data.update_date
-        if self.updated_timestamp != shop_data.updated_timestamp:
-            self.updated_timestamp = shop_data.updated_timestamp
-        if self.listing_active_count != shop_data.listing_active_count:
-            self.listing_active_count = shop_data.listing_active_count
-        if self.digital_listing_count != shop_data.digital_listing_count:
-            self.digital_listing_count = shop_data.digital_listing_count
-        if self.login_name != shop_data.login_name:
-            self.login_name = shop_data.login_name
-        if self.accepts_custom_requests != shop_data.accepts_custom_requests:
-            self.accepts_custom_requests = shop_data.accepts_custom_requests
-        if self.policy_welcome != shop_data.policy_welcome:
-            self.policy_welcome = shop_data.policy_welcome
-        if self.policy_payment != shop_data.policy_payment:
-            self.policy_payment = shop_data.policy_payment
-        if self.policy_shipping != shop_data.policy_shipping:
-            self.policy_shipping = shop_data.policy_shipping
-        if self.policy_refunds != shop_data.policy_refunds:
-            self.policy_refunds = shop_data.policy_refunds
-        if self.policy_additional != shop_data.policy_additional:
-            self.policy_additional = shop_data.policy_additional
-        if self.policy_seller_info != shop_data.policy_seller_info:
-            self.policy_seller_info = shop_data.policy_seller_info
-        if self.policy_update_date != shop_data.policy_update_date:
-            self.policy_update_date = shop_data.policy_update_date
-        if self.policy_has_private_receipt_info != shop_data.policy_has_private_receipt_info:
-            self.policy_has_private_receipt_info = shop_data.policy_has_private_receipt_info
-        if self.has_unstructured_policies != shop_data.has_unstructured_policies:
-            self.has_unstructured_policies = shop_data.has_unstructured_policies
-        if self.policy_privacy != shop_data.policy_privacy:
-            self.policy_privacy = shop_data.policy_privacy
-        if self.vacation_autoreply != shop_data.vacation_autoreply:
-            self.vacation_autoreply = shop_data.vacation_autoreply
-        if self.url != shop_data.url:
-            self.url = shop_data.url
-        if self.image_url_760x100 != shop_data.image_url_760x100:
-            self.image_url_760x100 = shop_data.image_url_760x100
-        if self.num_favorers != shop_data.num_favorers:
-            self.num_favorers = shop_data.num_favorers
-        if self.languages != shop_data.languages:
-            self.languages = shop_data.languages
-        if self.icon_url_fullxfull != shop_data.icon_url_fullxfull:
-            self.icon_url_fullxfull = shop_data.icon_url_fullxfull
-        if self.is_using_structured_policies != shop_data.is_using_structured_policies:
-            self.is_using_structured_policies = shop_data.is_using_structured_policies
-        if self.has_onboarded_structured_policies != shop_data.has_onboarded_structured_policies:
-            self.has_onboarded_structured_policies = shop_data.has_onboarded_structured_policies
-        if self.include_dispute_form_link != shop_data.include_dispute_form_link:
-            self.include_dispute_form_link = shop_data.include_dispute_form_link
-        if self.is_etsy_payments_onboarded != shop_data.is_etsy_payments_onboarded:
-            self.is_etsy_payments_onboarded = shop_data.is_etsy_payments_onboarded
-        if self.is_calculated_eligible != shop_data.is_calculated_eligible:
-            self.is_calculated_eligible = shop_data.is_calculated_eligible
-        if self.is_opted_into_buyer_promise != shop_data.is_opted_into_buyer_promise:
-            self.is_opted_into_buyer_promise = shop_data.is_opted_into_buyer_promise
-        if self.is_shop_us_based != shop_data.is_shop_us_based:
-            self.is_shop_us_based = shop_data.is_shop_us_based
-        if self.transaction_sold_count != shop_data.transaction_sold_count:
-            self.transaction_sold_count = shop_data.transaction_sold_count
-        if self.shipping_from_country_iso != shop_data.shipping_from_country_iso:
-            self.shipping_from_country_iso = shop_data.shipping_from_country_iso
-        if self.shop_location_country_iso != shop_data.shop_location_country_iso:
-            self.shop_location_country_iso = shop_data.shop_location_country_iso
-        if self.review_count != shop_data.review_count:
-            self.review_count = shop_data.review_count
-        if self.review_average != shop_data.review_average:
-            self.review_average = shop_data.review_average
+        changed_columns = self.apply_changes(shop_data)
 
         if seller is not None and self.seller != seller:
             self.seller = seller
@@ -2135,12 +1845,16 @@ class EtsyShop(Base):
         if shop_sections is not None:
             self.shop_sections = shop_sections if overwrite_list else merge_lists(self.shop_sections, shop_sections)
 
+        return changed_columns
+
 
 class EtsyOffering(Base):
     """
     https://developer.etsy.com/documentation/reference/#operation/getListingOffering
     """
     __tablename__ = 'etsy_offering'
+    __natural_key__ = 'offering_id'
+    __field_map__ = field_map('quantity', 'is_enabled', 'is_deleted', 'price', 'price_divisor', 'price_currency_code')
     id = Column(Integer, primary_key=True)
     offering_id = Column(BigInteger, unique=True)
     quantity = Column(Integer)
@@ -2183,31 +1897,20 @@ class EtsyOffering(Base):
 
     @staticmethod
     def get_existing(session, offering_id: int) -> Union[None, EtsyOffering]:
-        return session.query(EtsyOffering).filter(
-            EtsyOffering.offering_id == int(offering_id)
-        ).first()
+        return EtsyOffering.get_by_natural_key(session, int(offering_id))
 
     def update(self, offering_data: Union[EtsyOfferingSpace, Dict[str, Any]],
                product: EtsyProduct = None):
         if not isinstance(offering_data, EtsyOfferingSpace):
             offering_data = self.create_namespace(offering_data)
 
-        if self.quantity != offering_data.quantity:
-            self.quantity = offering_data.quantity
-        if self.is_enabled != offering_data.is_enabled:
-            self.is_enabled = offering_data.is_enabled
-        if self.is_deleted != offering_data.is_deleted:
-            self.is_deleted = offering_data.is_deleted
-        if self.price != offering_data.price:
-            self.price = offering_data.price
-        if self.price_divisor != offering_data.price_divisor:
-            self.price_divisor = offering_data.price_divisor
-        if self.price_currency_code != offering_data.price_currency_code:
-            self.price_currency_code = offering_data.price_currency_code
+        changed_columns = self.apply_changes(offering_data)
 
         if product is not None and self.product != product:
             self.product = product
 
+        return changed_columns
+
 
 class EtsyRefund(Base):
     __tablename__ = 'etsy_refund'
@@ -2257,6 +1960,12 @@ class ProdigiOrder(Base):
     API Reference: https://www.prodigi.com/print-api/docs/reference/#orders
     """
     __tablename__ = 'prodigi_order'
+    __natural_key__ = 'prodigi_id'
+    __table_args__ = (
+        Index('ix_prodigi_order__etsy_receipt_id', '_etsy_receipt_id'),
+    )
+    __field_map__ = field_map('last_updated', 'callback_url', 'merchant_reference', 'shipping_method',
+                              'idempotency_key')
     id = Column(Integer, primary_key=True)
     prodigi_id = Column(String, unique=True)
     created = Column(DateTime)
@@ -2266,6 +1975,10 @@ class ProdigiOrder(Base):
     shipping_method = Column(Enum(Prodigi.ShippingMethod))
     idempotency_key = Column(String)
 
+    # Hash of the order payload last written to the database. update_incomplete_orders skips orders that come back with
+    # the same hash
+    content_hash = Column(String(64))
+
     # relationships
 
     # one to many
@@ -2304,7 +2017,8 @@ class ProdigiOrder(Base):
             callback_url=order_data.callback_url,
             merchant_reference=order_data.merchant_reference,
             shipping_method=order_data.shipping_method,
-            idempotency_key=order_data.idempotency_key
+            idempotency_key=order_data.idempotency_key,
+            content_hash=order_data.payload_hash
         )
 
         if status is not None:
@@ -2336,7 +2050,7 @@ class ProdigiOrder(Base):
 
     @staticmethod
     def get_existing(session, prodigi_id: str) -> Union[ProdigiOrder, None]:
-        return session.query(ProdigiOrder).filter(ProdigiOrder.prodigi_id == prodigi_id).first()
+        return ProdigiOrder.get_by_natural_key(session, prodigi_id)
 
     def update(self, order_data: Union[ProdigiOrderSpace, Dict[str, Any]],
                status: ProdigiStatus = None,
@@ -2351,16 +2065,7 @@ class ProdigiOrder(Base):
         if not isinstance(order_data, ProdigiOrderSpace):
             order_data = self.create_namespace(order_data)
 
-            if self.last_updated != order_data.last_updated:
-                self.last_updated = order_data.last_updated
-            if self.callback_url != order_data.callback_url:
-                self.callback_url = order_data.callback_url
-            if self.merchant_reference != order_data.merchant_reference:
-                self.merchant_reference = order_data.merchant_reference
-            if self.shipping_method != order_data.shipping_method:
-                self.shipping_method = order_data.shipping_method
-            if self.idempotency_key != order_data.idempotency_key:
-                self.idempotency_key = order_data.idempotency_key
+        changed_columns = self.apply_changes(order_data)
 
         # relationships
         if status is not None and self.status != status:
@@ -2384,12 +2089,15 @@ class ProdigiOrder(Base):
         if items is not None:
             self.items = items if overwrite_list else merge_lists(self.items, items)
 
+        return changed_columns
+
 
 class ProdigiShipmentDetail(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#update-shipping-method
     """
     __tablename__ = 'prodigi_shipment_detail'
+    __field_map__ = field_map('shipment_id', 'successful', 'error_code', 'description')
     id = Column(Integer, primary_key=True)
     shipment_id = Column(String)
     successful = Column(Boolean)
@@ -2443,24 +2151,20 @@ class ProdigiShipmentDetail(Base):
         if not isinstance(shipment_detail_data, ProdigiShipmentDetailSpace):
             shipment_detail_data = self.create_namespace(shipment_detail_data)
 
-        if self.shipment_id != shipment_detail_data.shipment_id:
-            self.shipment_id = shipment_detail_data.shipment_id
-        if self.successful != shipment_detail_data.successful:
-            self.successful = shipment_detail_data.successful
-        if self.error_code != shipment_detail_data.error_code:
-            self.error_code = shipment_detail_data.error_code
-        if self.description != shipment_detail_data.description:
-            self.description = shipment_detail_data.description
+        changed_columns = self.apply_changes(shipment_detail_data)
 
         if shipment is not None and self.shipment != shipment:
             self.shipment = shipment
 
+        return changed_columns
+
 
 class ProdigiPackingSlip(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#order-object-packing-slip
     """
     __tablename__ = 'prodigi_packing_slip'
+    __field_map__ = field_map('url', 'status')
     id = Column(Integer, primary_key=True)
     url = Column(String)
     status = Column(String)
@@ -2496,20 +2200,21 @@ class ProdigiPackingSlip(Base):
         if not isinstance(packing_slip_data, ProdigiPackingSlipSpace):
             packing_slip_data = self.create_namespace(packing_slip_data)
 
-        if self.url != packing_slip_data.url:
-            self.url = packing_slip_data.url
-        if self.status != packing_slip_data.status:
-            self.status = packing_slip_data.status
+        changed_columns = self.apply_changes(packing_slip_data)
 
         if order is not None and self.order != order:
             self.order = order
 
+        return changed_columns
+
 
 class ProdigiItem(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#order-object-item
     """
     __tablename__ = 'prodigi_item'
+    __natural_key__ = 'prodigi_id'
+    __field_map__ = field_map('prodigi_id', 'merchant_reference', 'sku', 'copies', 'sizing')
     id = Column(Integer, primary_key=True)
     prodigi_id = Column(String, unique=True)
     merchant_reference = Column(String)
@@ -2564,7 +2269,7 @@ class ProdigiItem(Base):
 
     @staticmethod
     def get_existing(session, prodigi_id: str) -> ProdigiItem:
-        return session.query(ProdigiItem).filter(ProdigiItem.prodigi_id == prodigi_id).first()
+        return ProdigiItem.get_by_natural_key(session, prodigi_id)
 
     def update(self, item_data: Union[ProdigiItemSpace, Dict[str, Any]],
                order: ProdigiOrder = None,
@@ -2575,16 +2280,7 @@ class ProdigiItem(Base):
         if not isinstance(item_data, ProdigiItemSpace):
             item_data = self.create_namespace(item_data)
 
-        if self.prodigi_id != item_data.prodigi_id:
-            self.prodigi_id = item_data.prodigi_id
-        if self.merchant_reference != item_data.merchant_reference:
-            self.merchant_reference = item_data.merchant_reference
-        if self.sku != item_data.sku:
-            self.sku = item_data.sku
-        if self.copies != item_data.copies:
-            self.copies = item_data.copies
-        if self.sizing != item_data.sizing:
-            self.sizing = item_data.sizing
+        changed_columns = self.apply_changes(item_data)
 
         if order is not None and self.order != order:
             self.order = order
@@ -2595,6 +2291,8 @@ class ProdigiItem(Base):
         if assets is not None:
             self.assets = assets if overwrite_list else merge_lists(self.assets, assets)
 
+        return changed_columns
+
 
 class ProdigiAsset(Base):
     """
@@ -2711,6 +2409,8 @@ class ProdigiShipment(Base):
     API Reference: https://www.prodigi.com/print-api/docs/reference/#order-object-shipment
     """
     __tablename__ = 'prodigi_shipment'
+    __natural_key__ = 'prodigi_id'
+    __field_map__ = field_map('carrier_name', 'carrier_service', 'tracking_number', 'tracking_url', 'dispatch_date')
     id = Column(Integer, primary_key=True)
     prodigi_id = Column(String, unique=True)
     carrier_name = Column(String)
@@ -2769,7 +2469,7 @@ class ProdigiShipment(Base):
 
     @staticmethod
     def get_existing(session, prodigi_id: str) -> Union[None, ProdigiShipment]:
-        return session.query(ProdigiShipment).filter(ProdigiShipment.prodigi_id == prodigi_id).first()
+        return ProdigiShipment.get_by_natural_key(session, prodigi_id)
 
     def update(self, shipment_data: Union[ProdigiShipmentSpace, Dict[str, Any]],
                order: ProdigiOrder = None,
@@ -2780,16 +2480,7 @@ class ProdigiShipment(Base):
         if not isinstance(shipment_data, ProdigiShipmentSpace):
             shipment_data = self.create_namespace(shipment_data)
 
-        if self.carrier_name != shipment_data.carrier_name:
-            self.carrier_name = shipment_data.carrier_name
-        if self.carrier_service != shipment_data.carrier_service:
-            self.carrier_service = shipment_data.carrier_service
-        if self.tracking_number != shipment_data.tracking_number:
-            self.tracking_number = shipment_data.tracking_number
-        if self.tracking_url != shipment_data.tracking_url:
-            self.tracking_url = shipment_data.tracking_url
-        if self.dispatch_date != shipment_data.dispatch_date:
-            self.dispatch_date = shipment_data.dispatch_date
+        changed_columns = self.apply_changes(shipment_data)
 
         if order is not None and self.order != order:
             self.order = order
@@ -2800,12 +2491,15 @@ class ProdigiShipment(Base):
         if shipment_items is not None:
             self.shipment_items = shipment_items if overwrite_list else merge_lists(self.shipment_items, shipment_items)
 
+        return changed_columns
+
 
 class ProdigiFulfillmentLocation(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#order-object-fulfillment-location
     """
     __tablename__ = 'prodigi_fulfillment_location'
+    __field_map__ = field_map('country_code', 'lab_code')
     id = Column(Integer, primary_key=True)
     country_code = Column(String)
     lab_code = Column(String)
@@ -2841,20 +2535,20 @@ class ProdigiFulfillmentLocation(Base):
         if not isinstance(fulfillment_location_data, ProdigiFulfillmentLocationSpace):
             fulfillment_location_data = self.create_namespace(fulfillment_location_data)
 
-        if self.country_code != fulfillment_location_data.country_code:
-            self.country_code = fulfillment_location_data.country_code
-        if self.lab_code != fulfillment_location_data.lab_code:
-            self.lab_code = fulfillment_location_data.lab_code
+        changed_columns = self.apply_changes(fulfillment_location_data)
 
         if shipment is not None and self.shipment != shipment:
             self.shipment = shipment
 
+        return changed_columns
+
 
 class ProdigiShipmentItem(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#order-shipment-item
     """
     __tablename__ = 'prodigi_shipment_item'
+    __natural_key__ = 'item_id'
     id = Column(Integer, primary_key=True)
     item_id = Column(String, unique=True)
 
@@ -2885,7 +2579,7 @@ class ProdigiShipmentItem(Base):
 
     @staticmethod
     def get_existing(session, item_id: str) -> Union[ProdigiShipmentItem, None]:
-        return session.query(ProdigiShipmentItem).filter(ProdigiShipmentItem.item_id == item_id).first()
+        return ProdigiShipmentItem.get_by_natural_key(session, item_id)
 
     def update(self, shipment: ProdigiShipment):
 
@@ -2895,6 +2589,8 @@ class ProdigiShipmentItem(Base):
 
 class ProdigiCharge(Base):
     __tablename__ = 'prodigi_charge'
+    __natural_key__ = 'prodigi_id'
+    __field_map__ = field_map('prodigi_invoice_number')
     id = Column(Integer, primary_key=True)
     prodigi_id = Column(String, unique=True)
     prodigi_invoice_number = Column(String)
@@ -2942,7 +2638,7 @@ class ProdigiCharge(Base):
 
     @staticmethod
     def get_existing(session, prodigi_id: str) -> Union[ProdigiCharge, None]:
-        return session.query(ProdigiCharge).filter(ProdigiCharge.prodigi_id == prodigi_id).first()
+        return ProdigiCharge.get_by_natural_key(session, prodigi_id)
 
     def update(self, charge_data: Union[ProdigiChargeSpace, Dict[str, Any]],
                order: ProdigiOrder = None,
@@ -2953,8 +2649,7 @@ class ProdigiCharge(Base):
         if not isinstance(charge_data, ProdigiChargeSpace):
             charge_data = self.create_namespace(charge_data)
 
-        if self.prodigi_invoice_number != charge_data.prodigi_invoice_number:
-            self.prodigi_invoice_number = charge_data.prodigi_invoice_number
+        changed_columns = self.apply_changes(charge_data)
 
         if order is not None and self.order != order:
             self.order = order
@@ -2965,9 +2660,13 @@ class ProdigiCharge(Base):
         if charge_items is not None:
             self.charge_items = charge_items if overwrite_list else merge_lists(self.charge_items, charge_items)
 
+        return changed_columns
+
 
 class ProdigiChargeItem(Base):
     __tablename__ = 'prodigi_charge_item'
+    __natural_key__ = 'prodigi_id'
+    __field_map__ = field_map('description', 'item_sku', 'shipment_id', 'item_id', 'merchant_item_reference')
     id = Column(Integer, primary_key=True)
     prodigi_id = Column(String, unique=True)
     description = Column(String)
@@ -3017,7 +2716,7 @@ class ProdigiChargeItem(Base):
 
     @staticmethod
     def get_existing(session, prodigi_id: str) -> Union[ProdigiChargeItem, None]:
-        return session.query(ProdigiChargeItem).filter(ProdigiChargeItem.prodigi_id == prodigi_id).first()
+        return ProdigiChargeItem.get_by_natural_key(session, prodigi_id)
 
     def update(self, charge_item_data: Union[ProdigiChargeItemSpace, Dict[str, Any]],
                cost: ProdigiCost = None,
@@ -3026,16 +2725,7 @@ class ProdigiChargeItem(Base):
         if not isinstance(charge_item_data, ProdigiChargeItemSpace):
             charge_item_data = self.create_namespace(charge_item_data)
 
-        if self.description != charge_item_data.description:
-            self.description = charge_item_data.description
-        if self.item_sku != charge_item_data.item_sku:
-            self.item_sku = charge_item_data.item_sku
-        if self.shipment_id != charge_item_data.shipment_id:
-            self.shipment_id = charge_item_data.shipment_id
-        if self.item_id != charge_item_data.item_id:
-            self.item_id = charge_item_data.item_id
-        if self.merchant_item_reference != charge_item_data.merchant_item_reference:
-            self.merchant_item_reference = charge_item_data.merchant_item_reference
+        changed_columns = self.apply_changes(charge_item_data)
 
         if cost is not None and self.cost != cost:
             self.cost = cost
@@ -3043,12 +2733,20 @@ class ProdigiChargeItem(Base):
         if charge is not None and self.charge != charge:
             self.charge = charge
 
+        return changed_columns
+
 
 class ProdigiStatus(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#status
     """
     __tablename__ = 'prodigi_status'
+    __table_args__ = (
+        Index('ix_prodigi_status_stage', 'stage'),
+        Index('ix_prodigi_status__order_id', '_order_id'),
+    )
+    __field_map__ = field_map('stage', 'download_assets', 'print_ready_assets_prepared', 'allocate_production_location',
+                              'in_production', 'shipping')
     id = Column(Integer, primary_key=True)
     stage = Column(Enum(Prodigi.StatusStage))
     download_assets = Column(Enum(Prodigi.DetailStatus))
@@ -3102,18 +2800,7 @@ class ProdigiStatus(Base):
         if not isinstance(status_data, ProdigiStatusSpace):
             status_data = self.create_namespace(status_data)
 
-        if self.stage != status_data.stage:
-            self.stage = status_data.stage
-        if self.download_assets != status_data.download_assets:
-            self.download_assets = status_data.download_assets
-        if self.print_ready_assets_prepared != status_data.print_ready_assets_prepared:
-            self.print_ready_assets_prepared = status_data.print_ready_assets_prepared
-        if self.allocate_production_location != status_data.allocate_production_location:
-            self.allocate_production_location = status_data.allocate_production_location
-        if self.in_production != status_data.allocate_production_location:
-            self.in_production = status_data.allocate_production_location
-        if self.shipping != status_data.shipping:
-            self.shipping = status_data.shipping
+        changed_columns = self.apply_changes(status_data)
 
         if order is not None and self.order != order:
             self.order = order
@@ -3121,12 +2808,18 @@ class ProdigiStatus(Base):
         if issues is not None:
             self.issues = issues if overwrite_list else merge_lists(self.issues, issues)
 
+        return changed_columns
+
 
 class ProdigiIssue(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#status-status-object
     """
     __tablename__ = 'prodigi_issue'
+    __table_args__ = (
+        Index('ix_prodigi_issue__status_id', '_status_id'),
+    )
+    __field_map__ = field_map('object_id', 'error_code', 'description')
     id = Column(Integer, primary_key=True)
     object_id = Column(String)
     error_code = Column(Enum(Prodigi.IssueErrorCode))
@@ -3183,12 +2876,7 @@ class ProdigiIssue(Base):
         if not isinstance(issue_data, ProdigiIssueSpace):
             issue_data = self.create_namespace(issue_data)
 
-        if self.object_id != issue_data.object_id:
-            self.object_id = issue_data.object_id
-        if self.error_code != issue_data.error_code:
-            self.error_code = issue_data.error_code
-        if self.description != issue_data.description:
-            self.description = issue_data.description
+        changed_columns = self.apply_changes(issue_data)
 
         if status is not None and self.status != status:
             self.status = status
@@ -3196,12 +2884,15 @@ class ProdigiIssue(Base):
         if authorization_details is not None and self.authorization_details != authorization_details:
             self.authorization_details = authorization_details
 
+        return changed_columns
+
 
 class ProdigiAuthorizationDetails(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#status-status-authorisation-details
     """
     __tablename__ = 'prodigi_authorization_details'
+    __field_map__ = field_map('authorization_url')
     id = Column(Integer, primary_key=True)
     authorization_url = Column(String)
 
@@ -3246,8 +2937,7 @@ class ProdigiAuthorizationDetails(Base):
         if not isinstance(authorization_detail_data, ProdigiAuthorizationDetails):
             authorization_detail_data = self.create_namespace(authorization_detail_data)
 
-        if self.authorization_url != authorization_detail_data.authorization_url:
-            self.authorization_url = authorization_detail_data.authorization_url
+        changed_columns = self.apply_changes(authorization_detail_data)
 
         if issue is not None and self.issue != issue:
             self.issue = issue
@@ -3255,12 +2945,15 @@ class ProdigiAuthorizationDetails(Base):
         if payment_details is not None and self.payment_details != payment_details:
             self.payment_details = payment_details
 
+        return changed_columns
+
 
 class ProdigiCost(Base):
     """
     API Reference: https://www.prodigi.com/print-api/docs/reference/#order-object
     """
     __tablename__ = 'prodigi_cost'
+    __field_map__ = field_map('amount', 'currency')
     id = Column(Integer, primary_key=True)
     amount = Column(String)
     currency = Column(String)
@@ -3319,10 +3012,7 @@ class ProdigiCost(Base):
         if not isinstance(cost_data, ProdigiCostSpace):
             cost_data = self.create_namespace(cost_data)
 
-        if self.amount != cost_data.amount:
-            self.amount = cost_data.amount
-        if self.currency != cost_data.currency:
-            self.currency = cost_data.currency
+        changed_columns = self.apply_changes(cost_data)
 
         if authorization is not None and self.authorization != authorization:
             self.authorization = authorization
@@ -3336,7 +3026,53 @@ class ProdigiCost(Base):
         if item is not None and self.item != item:
             self.item = item
 
+        return changed_columns
+
+
+class SyncState(Base):
+    """
+    High-water mark of the incremental receipt sync for a shop. min_last_modified is the updated_timestamp of the most
+    recently modified receipt that synced successfully, so the next run only asks Etsy for receipts modified since
+    """
+    __tablename__ = 'sync_state'
+    __natural_key__ = 'shop_id'
+    id = Column(Integer, primary_key=True)
+    shop_id = Column(BigInteger, unique=True)
+    min_last_modified = Column(DateTime)
+    last_run_timestamp = Column(DateTime)
+
+    @classmethod
+    def create(cls, shop_id: int, min_last_modified: datetime = None,
+               last_run_timestamp: datetime = None) -> SyncState:
+        return cls(
+            shop_id=int(shop_id),
+            min_last_modified=min_last_modified,
+            last_run_timestamp=last_run_timestamp
+        )
+
+    @staticmethod
+    def get_existing(session, shop_id: int) -> Union[None, SyncState]:
+        return SyncState.get_by_natural_key(session, int(shop_id))
+
+    def update(self, min_last_modified: datetime = None, last_run_timestamp: datetime = None):
+        if min_last_modified is not None and self.min_last_modified != min_last_modified:
+            self.min_last_modified = min_last_modified
+
+        if last_run_timestamp is not None and self.last_run_timestamp != last_run_timestamp:
+            self.last_run_timestamp = last_run_timestamp
+
 
 def create_database():
     engine = make_engine()
+    config = Config(ALEMBIC_CONFIG)
+
+    # create_all only adds missing tables, never missing columns, so an existing database is brought up to date by the
+    # migrations instead. One from before migrations were introduced starts from the empty 0001 baseline
+    if inspect(engine).get_table_names():
+        command.upgrade(config, 'head')
+        return
+
     Base.metadata.create_all(engine)
+
+    # A new database already has the latest schema, so mark it as migrated to the latest revision
+    command.stamp(config, 'head')
@@ -1,8 +1,212 @@
-from sqlalchemy import create_engine
+import weakref
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Set, Tuple, Union
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session
 from database.config import DATABASE_URL
 
-Base = declarative_base()
+# Dialects with an INSERT ... ON CONFLICT DO UPDATE statement
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+# Bound parameters allowed in a single statement. SQLite builds before 3.32 stop at 999
+MAX_BIND_PARAMETERS = {
+    'sqlite': 999,
+    'postgresql': 65535
+}
+
+# session.info entry holding the rows of the session by (model, natural key). Rows are held weakly, like in the
+# session's identity map, so the index never keeps a row alive after the caller and the session are done with it
+NATURAL_KEY_INDEX = 'natural_key_index'
+
+
+def _natural_key_index(session) -> weakref.WeakValueDictionary:
+    return session.info.setdefault(NATURAL_KEY_INDEX, weakref.WeakValueDictionary())
+
+
+class UpsertMixin:
+    """
+    Bulk loading shared by every model. A model that sets __natural_key__ to its unique column holding the source API's
+    id can prefetch and upsert a whole batch of rows in a few statements, instead of a get_existing / create / update /
+    flush round trip per row
+    """
+    __natural_key__: str = None
+
+    # Columns get_existing looks a row up by, if not just the natural key
+    __lookup_key__: Tuple[str, ...] = None
+
+    @classmethod
+    def lookup_columns(cls) -> Union[Tuple[str, ...], None]:
+        if cls.__lookup_key__ is not None:
+            return cls.__lookup_key__
+        if cls.__natural_key__ is not None:
+            return cls.__natural_key__,
+        return None
+
+    @classmethod
+    def get_by_natural_key(cls, session, *key: Hashable) -> Union[Any, None]:
+        """
+        Returns the row with the given lookup key values, in lookup_columns order. Rows already loaded into or added to
+        the session are served from the session's natural key index; only misses query the database
+        """
+        index = _natural_key_index(session)
+        row = index.get((cls, key))
+        if row is not None:
+            state = inspect(row)
+            if state.session_id == session.hash_key and not state.deleted and not state.was_deleted:
+                return row
+            del index[(cls, key)]
+
+        row = session.query(cls).filter(
+            *(getattr(cls, column) == value for column, value in zip(cls.lookup_columns(), key))
+        ).first()
+        if row is not None:
+            index[(cls, key)] = row
+        return row
+
+    @classmethod
+    def prefetch_existing(cls, session, keys: Iterable[Hashable], chunk_size: int = 500) -> Dict[Hashable, Any]:
+        """
+        Loads the existing rows for keys with one IN query per chunk_size keys, mapped by natural key
+        """
+        column = getattr(cls, cls.__natural_key__)
+        keys = list({key for key in keys if key is not None})
+
+        existing = {}
+        for start in range(0, len(keys), chunk_size):
+            for row in session.query(cls).filter(column.in_(keys[start:start + chunk_size])):
+                existing[getattr(row, cls.__natural_key__)] = row
+        return existing
+
+    @classmethod
+    def bulk_upsert(cls, session, namespaces: Iterable[Any]) -> List[Any]:
+        """
+        Inserts or updates a row for each namespace and returns the rows in the same order. Only the columns create()
+        sets from the namespace are written; relationships are left to the caller. Rows that already hold the same
+        values are not written at all.
+
+        Args:
+            session: Database session
+            namespaces (Iterable[Any]): Namespaces, or API response dicts, accepted by the model's create()
+        """
+        key_name = cls.__natural_key__
+        if key_name is None:
+            raise TypeError(f'{cls.__name__} has no __natural_key__ to upsert on')
+        columns = {column.key for column in cls.__table__.columns if not column.primary_key and not column.foreign_keys}
+
+        keys = []
+        rows = {}
+        for namespace in namespaces:
+            row = cls.create(namespace)
+            values = {name: value for name, value in inspect(row).dict.items() if name in columns}
+            if values.get(key_name) is None:
+                raise ValueError(f'{cls.__name__} row without a {key_name} can not be upserted')
+            keys.append(values[key_name])
+            rows[values[key_name]] = values
+
+        existing = cls.prefetch_existing(session, rows.keys())
+        changed = [values for key, values in rows.items() if key not in existing or
+                   any(getattr(existing[key], name) != value for name, value in values.items())]
+
+        if changed:
+            dialect = session.get_bind().dialect.name
+            if dialect in UPSERT_INSERTS:
+                cls._execute_upsert(session, changed, dialect)
+
+                # Bring the rows already in the session up to date with what was just written
+                column = getattr(cls, key_name)
+                changed_keys = [values[key_name] for values in changed]
+                for start in range(0, len(changed_keys), 500):
+                    for row in session.query(cls).populate_existing().filter(
+                            column.in_(changed_keys[start:start + 500])):
+                        existing[getattr(row, key_name)] = row
+            else:
+                for values in changed:
+                    row = existing.get(values[key_name])
+                    if row is None:
+                        row = cls(**values)
+                        session.add(row)
+                        existing[values[key_name]] = row
+                    else:
+                        for name, value in values.items():
+                            if getattr(row, name) != value:
+                                setattr(row, name, value)
+
+        return [existing[key] for key in keys]
+
+    @classmethod
+    def _execute_upsert(cls, session, rows: List[Dict[str, Any]], dialect: str):
+        insert = UPSERT_INSERTS[dialect]
+
+        # A multi row VALUES clause needs the same columns in every row
+        groups = {}
+        for values in rows:
+            groups.setdefault(tuple(sorted(values)), []).append(values)
+
+        for names, group in groups.items():
+            chunk_size = max(1, MAX_BIND_PARAMETERS[dialect] // len(names))
+            for start in range(0, len(group), chunk_size):
+                statement = insert(cls.__table__).values(group[start:start + chunk_size])
+                update_columns = {name: statement.excluded[name] for name in names if name != cls.__natural_key__}
+                if update_columns:
+                    statement = statement.on_conflict_do_update(index_elements=[cls.__natural_key__],
+                                                                set_=update_columns)
+                else:
+                    statement = statement.on_conflict_do_nothing(index_elements=[cls.__natural_key__])
+                session.execute(statement)
+
+
+def field_map(*columns: str, **renamed: str) -> Dict[str, str]:
+    """
+    Builds a __field_map__: columns are filled from the namespace attribute of the same name, renamed maps a column to
+    a differently named attribute
+    """
+    mapping = {column: column for column in columns}
+    mapping.update(renamed)
+    return mapping
+
+
+def compile_diff(model_name: str, mapping: Dict[str, str]) -> Callable[[Any, Any], Set[str]]:
+    """
+    Generates the diff function for a field map: one unrolled compare and assign per column, which avoids the getattr /
+    setattr loop a generic implementation would run for every row
+    """
+    lines = ['def apply_changes(self, data):', '    changed = set()']
+    for column, attribute in mapping.items():
+        if not column.isidentifier() or not attribute.isidentifier():
+            raise ValueError(f'{model_name}.__field_map__ entry {column!r}: {attribute!r} is not an attribute name')
+        lines += [f'    value = data.{attribute}',
+                  f'    if self.{column} != value:',
+                  f'        self.{column} = value',
+                  f'        changed.add({column!r})']
+    lines.append('    return changed')
+
+    namespace = {}
+    exec(compile('\n'.join(lines), f'<{model_name}.apply_changes>', 'exec'), namespace)
+    return namespace['apply_changes']
+
+
+class FieldMapMixin:
+    """
+    Models set __field_map__ to the columns update() copies from their namespace, mapped to the namespace attribute
+    each one comes from. apply_changes is compiled from it once, when the model class is created; it writes only the
+    columns whose value differs, so unchanged rows are never marked dirty, and returns the names of the changed columns
+    """
+    __field_map__: Dict[str, str] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if '__field_map__' in cls.__dict__ and cls.__field_map__ is not None:
+            cls.apply_changes = compile_diff(cls.__name__, cls.__field_map__)
+
+    def apply_changes(self, data: Any) -> Set[str]:
+        raise NotImplementedError(f'{type(self).__name__} has no __field_map__')
+
+
+Base = declarative_base(cls=(UpsertMixin, FieldMapMixin))
 
 
 def make_engine():
@@ -28,3 +232,39 @@ def overwrite_relationship_list(session, parent_table, relationship_attr: str, n
 
 def merge_lists(list1, list2):
     return list1 + [i for i in list2 if i not in list1]
+
+
+def _natural_key(instance) -> Union[Tuple[Any, ...], None]:
+    columns = instance.lookup_columns() if isinstance(instance, UpsertMixin) else None
+    if columns is None:
+        return None
+
+    # Read the instance dict directly so an expired attribute is never loaded just to index the row
+    values = inspect(instance).dict
+    if any(column not in values for column in columns):
+        return None
+    key = tuple(values[column] for column in columns)
+    return None if all(value is None for value in key) else key
+
+
+@event.listens_for(Session, 'transient_to_pending')
+@event.listens_for(Session, 'loaded_as_persistent')
+def _index_natural_key(session, instance):
+    key = _natural_key(instance)
+    if key is not None:
+        _natural_key_index(session)[(type(instance), key)] = instance
+
+
+@event.listens_for(Session, 'persistent_to_deleted')
+@event.listens_for(Session, 'persistent_to_detached')
+@event.listens_for(Session, 'pending_to_transient')
+def _unindex_natural_key(session, instance):
+    key = _natural_key(instance)
+    index = session.info.get(NATURAL_KEY_INDEX)
+    if key is not None and index is not None and index.get((type(instance), key)) is instance:
+        del index[(type(instance), key)]
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_natural_key_index(session):
+    session.info.pop(NATURAL_KEY_INDEX, None)
@@ -0,0 +1,54 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from utilities.digital_assets import encode_jpeg_under_size
+
+
+@pytest.fixture(scope='module')
+def image() -> Image.Image:
+    # Noise barely compresses, so every quality step changes the size
+    return Image.fromarray(np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8))
+
+
+def jpeg_size(image: Image.Image, quality: int) -> int:
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return len(buffer.getvalue())
+
+
+def test_fits_at_max_quality_in_one_encode(image):
+    result = encode_jpeg_under_size(image, jpeg_size(image, 95))
+
+    assert result.quality == 95 and result.scale == 1.0
+    assert len(result.attempts) == 1
+
+
+@pytest.mark.parametrize('quality', [31, 60, 94])
+def test_returns_the_highest_quality_that_fits(image, quality):
+    max_bytes = jpeg_size(image, quality)
+    result = encode_jpeg_under_size(image, max_bytes)
+
+    assert result.size_bytes <= max_bytes
+    assert result.quality >= quality
+    assert jpeg_size(image, result.quality + 1) > max_bytes
+    assert result.scale == 1.0
+    assert result.data == encode_jpeg_under_size(image, result.size_bytes, max_quality=result.quality).data
+
+
+def test_scales_down_when_min_quality_does_not_fit(image):
+    max_bytes = jpeg_size(image, 30) // 2
+    result = encode_jpeg_under_size(image, max_bytes, min_scale=0.25)
+
+    assert result.size_bytes <= max_bytes
+    assert result.scale < 1.0
+    assert any(attempt.scale == 1.0 and attempt.quality == 30 for attempt in result.attempts)
+    with Image.open(io.BytesIO(result.data)) as encoded:
+        assert encoded.size == (round(256 * result.scale), round(256 * result.scale))
+
+
+def test_raises_when_nothing_fits(image):
+    with pytest.raises(ValueError):
+        encode_jpeg_under_size(image, jpeg_size(image, 30) // 2)
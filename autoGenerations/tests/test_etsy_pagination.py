@@ -0,0 +1,67 @@
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from apis.etsy import API
+
+
+class FakeShop(API):
+    """
+    Serves get_receipts from a list of receipts the way Etsy does: modified since min_last_modified, sorted by
+    updated_timestamp, then sliced by offset and limit. on_page runs after each page, to modify receipts mid sync
+    """
+
+    def __init__(self, receipts: List[Dict[str, Any]], on_page: Callable[['FakeShop', int], None] = None):
+        self.receipts = receipts
+        self.on_page = on_page
+        self.requests = []
+
+    def get_receipts(self, min_created=None, limit=None, offset=None, sort_on=None, sort_order=None,
+                     min_last_modified=None):
+        assert (sort_on, sort_order) == ('updated', 'asc')
+        self.requests.append((min_last_modified, offset))
+        matching = sorted((receipt for receipt in self.receipts if receipt['updated_timestamp'] >= min_last_modified),
+                          key=lambda receipt: receipt['updated_timestamp'])
+        page = [dict(receipt) for receipt in matching[offset:offset + limit]]
+        if self.on_page is not None:
+            self.on_page(self, len(self.requests))
+        return {'count': len(matching), 'results': page}
+
+
+def receipts(*timestamps: int) -> List[Dict[str, Any]]:
+    return [{'receipt_id': receipt_id, 'updated_timestamp': timestamp}
+            for receipt_id, timestamp in enumerate(timestamps, start=1)]
+
+
+@pytest.fixture(params=[False, True], ids=['sequential', 'prefetch'])
+def prefetch(request):
+    return request.param
+
+
+def synced(api: FakeShop, page_size: int, prefetch: bool) -> List[tuple]:
+    return [(receipt['receipt_id'], receipt['updated_timestamp'])
+            for receipt in api.iter_receipts(min_last_modified=0, page_size=page_size, prefetch=prefetch)]
+
+
+def test_duplicate_timestamps_across_page_boundaries(prefetch):
+    api = FakeShop(receipts(1, 2, 2, 2, 3, 3, 3, 4))
+
+    assert synced(api, 3, prefetch) == [(1, 1), (2, 2), (3, 2), (4, 2), (5, 3), (6, 3), (7, 3), (8, 4)]
+
+
+def test_full_page_sharing_one_timestamp_steps_by_offset(prefetch):
+    api = FakeShop(receipts(5, 5, 5, 5, 5, 6))
+
+    assert synced(api, 2, prefetch) == [(1, 5), (2, 5), (3, 5), (4, 5), (5, 5), (6, 6)]
+    assert api.requests[:3] == [(0, 0), (5, 0), (5, 2)]
+
+
+def test_receipt_modified_while_paging():
+    def modify_first_receipt(api: FakeShop, page_number: int):
+        # Once the first page is out, receipt 1 is modified and moves to the end of the list. With offset paging the
+        # receipts after it shift back by one and the one at the next page boundary is never returned
+        if page_number == 1:
+            api.receipts[0]['updated_timestamp'] = 10
+
+    api = FakeShop(receipts(1, 2, 3, 4, 5), on_page=modify_first_receipt)
+    assert synced(api, 2, prefetch=False) == [(1, 1), (2, 2), (3, 3), (4, 4), (5, 5), (1, 10)]
@@ -0,0 +1,68 @@
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from database.config import ALEMBIC_CONFIG
+from database.utils import Base
+import database.tables  # noqa: F401 registers the models on Base.metadata
+
+
+@pytest.fixture
+def baseline_database(tmp_path):
+    """
+    A file database with the schema from before revision 0002, stamped at the 0001 baseline
+    """
+    url = f"sqlite:///{tmp_path / 'database.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_address_fingerprint'))
+        connection.execute(text('ALTER TABLE address DROP COLUMN fingerprint'))
+
+    config = Config(ALEMBIC_CONFIG)
+    config.set_main_option('sqlalchemy.url', url)
+    command.stamp(config, '0001')
+    yield engine, config
+    engine.dispose()
+
+
+def test_0002_merges_duplicate_addresses(baseline_database):
+    engine, config = baseline_database
+    with engine.begin() as connection:
+        # 1 and 2 are the same address once case and whitespace are normalized, 3 is another one
+        connection.execute(text(
+            "INSERT INTO address (id, first_line, city, zip_code, country) VALUES "
+            "(1, '1 Main St', 'Springfield', '12345', 'US'), "
+            "(2, ' 1  MAIN st', 'springfield ', '12345', 'us'), "
+            "(3, '2 Main St', 'Springfield', '12345', 'US')"))
+        connection.execute(text("INSERT INTO etsy_receipt (id, receipt_id, _address_id) VALUES "
+                                "(1, 101, 1), (2, 102, 2), (3, 103, 3)"))
+        connection.execute(text("INSERT INTO etsy_buyer (id, buyer_id) VALUES (1, 201), (2, 202)"))
+        # Buyer 1 is linked to both copies, buyer 2 only to the duplicate
+        connection.execute(text("INSERT INTO buyer_address_association_table (buyer_id, address_id) VALUES "
+                                "(1, 1), (1, 2), (2, 2), (2, 3)"))
+        connection.execute(text("INSERT INTO prodigi_recipient (id) VALUES (1)"))
+        connection.execute(text("INSERT INTO recipient_address_association_table (recipient_id, address_id) "
+                                "VALUES (1, 2)"))
+
+    command.upgrade(config, '0002')
+
+    with engine.connect() as connection:
+        addresses = connection.execute(text('SELECT id, fingerprint FROM address ORDER BY id')).fetchall()
+        receipts = connection.execute(text('SELECT receipt_id, _address_id FROM etsy_receipt ORDER BY id')).fetchall()
+        buyer_links = connection.execute(text(
+            'SELECT buyer_id, address_id FROM buyer_address_association_table ORDER BY buyer_id, address_id'
+        )).fetchall()
+        recipient_links = connection.execute(text(
+            'SELECT recipient_id, address_id FROM recipient_address_association_table')).fetchall()
+
+    assert [row.id for row in addresses] == [1, 3]
+    assert all(row.fingerprint for row in addresses)
+    assert addresses[0].fingerprint != addresses[1].fingerprint
+    assert [tuple(row) for row in receipts] == [(101, 1), (102, 1), (103, 3)]
+    assert [tuple(row) for row in buyer_links] == [(1, 1), (2, 1), (2, 3)]
+    assert [tuple(row) for row in recipient_links] == [(1, 1)]
+
+    indexes = {index['name']: index for index in inspect(engine).get_indexes('address')}
+    assert indexes['ix_address_fingerprint']['unique']
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from utilities.mockups import apply_watermark, WATERMARK_FONT_PATH
+
+WATERMARK_TEXT = '© AutoGenerations'
+
+
+def original_add_watermark(image: Image.Image, watermark_text: str) -> Image.Image:
+    # add_watermark as it was before the watermark was cached, minus the file I/O. To keep the test fast, the rotation
+    # is reused once another draw no longer changes the layer, and only the rotated layer's non transparent box is
+    # pasted. Pasting fully transparent pixels with themselves as the mask changes nothing, so neither affects the output
+    watermark = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    font = ImageFont.truetype(WATERMARK_FONT_PATH, 30)
+    text_box = (0, 0) + font.getbbox(watermark_text)[2:]
+    previous, rotated_watermark, box = None, None, None
+    for x_ratio in np.linspace(0, 1.1, 10):
+        for y_ratio in np.linspace(0, 2, 20):
+            x = int(image.width * x_ratio)
+            y = int(image.height * y_ratio)
+            draw = ImageDraw.Draw(watermark)
+            draw.text((0, 0), watermark_text, font=font, fill=(255, 255, 255, 80))
+            current = watermark.crop(text_box).tobytes()
+            if current != previous:
+                rotated_watermark = watermark.rotate(45, expand=True)
+                box = rotated_watermark.getbbox()
+                rotated_watermark = rotated_watermark.crop(box)
+                previous = current
+            image.paste(rotated_watermark, (x + box[0], y - image.width + box[1]), mask=rotated_watermark)
+    return image
+
+
+@pytest.mark.parametrize('size, mode', [
+    ((2000, 3000), 'RGB'),
+    ((2000, 3000), 'RGBA'),
+    ((2000, 2000), 'RGB'),
+    ((601, 397), 'RGB')
+])
+def test_watermark_matches_original(size, mode):
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (size[1], size[0], len(mode)), dtype=np.uint8), mode)
+
+    expected = np.array(original_add_watermark(image.copy(), WATERMARK_TEXT))
+    actual = np.array(apply_watermark(image.copy(), WATERMARK_TEXT))
+
+    assert np.array_equal(actual, expected)
@@ -0,0 +1,36 @@
+from typing import List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+
+from bin.database_cli import prodigi_orders_query
+from bin.fulfill_incomplete_orders import unfulfilled_paid_receipts_query
+from bin.get_etsy_orders import incomplete_receipt_ids_query, earliest_incomplete_receipt_query, latest_receipt_query
+from bin.update_incomplete_orders import incomplete_fulfilled_receipts_query
+
+# The queries the bin scripts run on every pass, built by the scripts' own code
+HOT_QUERIES = {
+    'update_incomplete_orders': incomplete_fulfilled_receipts_query,
+    'fulfill_incomplete_orders': unfulfilled_paid_receipts_query,
+    'get_etsy_orders: incomplete ids': incomplete_receipt_ids_query,
+    'get_etsy_orders: earliest incomplete': lambda session: earliest_incomplete_receipt_query(session).limit(1),
+    'get_etsy_orders: latest': lambda session: latest_receipt_query(session).limit(1),
+    'database_cli: in progress': lambda session: prodigi_orders_query(session, True, False, False)
+}
+
+
+def query_plan(session: Session, query: Query) -> List[str]:
+    sql = query.statement.compile(session.get_bind(), compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_an_index(session, name):
+    plan = query_plan(session, HOT_QUERIES[name](session))
+
+    # SEARCH ... USING INDEX probes an index and SCAN ... USING INDEX walks one in order, a bare SCAN reads the whole
+    # table
+    assert plan
+    full_scans = [step for step in plan if step.startswith('SCAN') and 'USING' not in step]
+    assert not full_scans, plan
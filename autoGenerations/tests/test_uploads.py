@@ -0,0 +1,104 @@
+import itertools
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+from apis.uploads import ListingUploader, UploadPart
+
+
+class FakeListing:
+    """
+    Stands in for the Etsy API of one listing. Like Etsy, an image or file posted at a rank past the end of the list
+    lands at the end, and one re-posted by id moves to its rank. Uploads finish in completion_order, by rank, however
+    the uploader schedules them
+    """
+
+    def __init__(self, completion_order: List[int]):
+        self.completion_order = completion_order
+        self.turn = threading.Condition()
+        self.finished = 0
+        self.ids = itertools.count(100)
+        self.images: List[int] = []
+        self.files: List[Dict[str, Any]] = []
+        self.reposts = 0
+
+    def _wait_for_turn(self, rank: int):
+        with self.turn:
+            self.turn.wait_for(lambda: self.completion_order[self.finished] == rank, timeout=5)
+
+    def _finish_turn(self):
+        with self.turn:
+            self.finished += 1
+            self.turn.notify_all()
+
+    @staticmethod
+    def _place(items: List[Any], item: Any, rank: int) -> int:
+        if item in items:
+            items.remove(item)
+        position = min(rank, len(items) + 1)
+        items.insert(position - 1, item)
+        return position
+
+    def upload_listing_image(self, shop_id, listing_id, image_data):
+        if 'listing_image_id' in image_data:
+            self.reposts += 1
+            image_id = image_data['listing_image_id']
+            return {'listing_image_id': image_id, 'rank': self._place(self.images, image_id, image_data['rank'])}
+
+        self._wait_for_turn(image_data['rank'])
+        try:
+            image_id = next(self.ids)
+            return {'listing_image_id': image_id, 'rank': self._place(self.images, image_id, image_data['rank'])}
+        finally:
+            self._finish_turn()
+
+    def upload_listing_file(self, shop_id, listing_id, file_data, name):
+        if 'listing_file_id' in file_data:
+            self.reposts += 1
+            file = next(file for file in self.files if file['listing_file_id'] == file_data['listing_file_id'])
+            return dict(file, rank=self._place(self.files, file, file_data['rank']))
+
+        self._wait_for_turn(file_data['rank'])
+        try:
+            file = {'listing_file_id': next(self.ids), 'filename': name}
+            return dict(file, rank=self._place(self.files, file, file_data['rank']))
+        finally:
+            self._finish_turn()
+
+    def get_listing_images(self, shop_id, listing_id):
+        return {'results': [{'listing_image_id': image_id, 'rank': rank}
+                            for rank, image_id in enumerate(self.images, start=1)]}
+
+    def get_listing_files(self, shop_id, listing_id):
+        return {'results': [dict(file, rank=rank) for rank, file in enumerate(self.files, start=1)]}
+
+
+def parts(count: int) -> List[UploadPart]:
+    return [UploadPart(rank, f'{rank}.jpg', b'') for rank in range(1, count + 1)]
+
+
+@pytest.mark.parametrize('completion_order', [[4, 3, 2, 1], [4, 2, 3, 1], [3, 4, 2, 1]])
+def test_images_out_of_order_are_moved_to_their_rank(completion_order):
+    api = FakeListing(completion_order)
+    results = ListingUploader(api, 1, 1, max_workers=4).upload_images(parts(4))
+
+    assert api.images == [response['listing_image_id'] for response in results]
+
+
+@pytest.mark.parametrize('completion_order', [[4, 3, 2, 1], [3, 4, 2, 1]])
+def test_files_out_of_order_are_moved_to_their_rank(completion_order):
+    api = FakeListing(completion_order)
+    results = ListingUploader(api, 1, 1, max_workers=4).upload_files(parts(4))
+
+    assert [file['filename'] for file in api.files] == ['1.jpg', '2.jpg', '3.jpg', '4.jpg']
+    assert [file['listing_file_id'] for file in api.files] == [response['listing_file_id'] for response in results]
+
+
+@pytest.mark.parametrize('completion_order', [[1, 2, 3, 4], [3, 1, 4, 2]])
+def test_uploads_already_in_place_are_not_moved(completion_order):
+    # Finishing 3, 1, 4, 2 still leaves every image at its rank
+    api = FakeListing(completion_order)
+    ListingUploader(api, 1, 1, max_workers=4).upload_images(parts(4))
+
+    assert api.reposts == 0
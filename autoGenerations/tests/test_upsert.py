@@ -0,0 +1,106 @@
+import gc
+from typing import List
+
+import pytest
+from sqlalchemy import event
+
+from database.tables import EtsyBuyer
+from database.utils import NATURAL_KEY_INDEX, UPSERT_INSERTS
+
+
+def buyer(buyer_id: int, name: str) -> dict:
+    return {'buyer_user_id': buyer_id, 'buyer_email': f'{buyer_id}@example.com', 'name': name}
+
+
+def record_statements(engine) -> List[str]:
+    statements = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda connection, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+@pytest.fixture(params=['on conflict', 'orm'])
+def upsert_path(request, monkeypatch):
+    # Dialects without ON CONFLICT fall back to adding and updating the rows through the session
+    if request.param == 'orm':
+        monkeypatch.delitem(UPSERT_INSERTS, 'sqlite')
+    return request.param
+
+
+def test_bulk_upsert_inserts_then_updates(session, upsert_path):
+    first = EtsyBuyer.bulk_upsert(session, [buyer(1, 'Ann'), buyer(2, 'Bob')])
+    session.flush()
+    assert [row.buyer_id for row in first] == [1, 2]
+
+    second = EtsyBuyer.bulk_upsert(session, [buyer(3, 'Cy'), buyer(1, 'Anne'), buyer(2, 'Bob')])
+    session.flush()
+
+    assert [row.buyer_id for row in second] == [3, 1, 2]
+    assert second[1] is first[0] and second[2] is first[1]
+    assert [row.name for row in second] == ['Cy', 'Anne', 'Bob']
+    assert session.query(EtsyBuyer).count() == 3
+
+    session.expire_all()
+    assert {row.buyer_id: row.name for row in session.query(EtsyBuyer)} == {1: 'Anne', 2: 'Bob', 3: 'Cy'}
+
+
+def test_bulk_upsert_skips_unchanged_rows(session, engine, upsert_path):
+    EtsyBuyer.bulk_upsert(session, [buyer(1, 'Ann'), buyer(2, 'Bob')])
+    session.flush()
+
+    statements = record_statements(engine)
+    EtsyBuyer.bulk_upsert(session, [buyer(1, 'Ann'), buyer(2, 'Bob')])
+    session.flush()
+
+    assert [statement for statement in statements if not statement.startswith('SELECT')] == []
+
+
+def test_bulk_upsert_requires_the_natural_key(session):
+    with pytest.raises(ValueError):
+        EtsyBuyer.bulk_upsert(session, [buyer(None, 'Ann')])
+
+
+def test_natural_key_index_serves_session_rows(session, engine):
+    pending = EtsyBuyer.create(buyer(1, 'Ann'))
+    session.add(pending)
+    session.flush()
+
+    statements = record_statements(engine)
+    assert EtsyBuyer.get_existing(session, 1) is pending
+    assert statements == []
+
+    # A miss queries the database and indexes the loaded row
+    session.expunge(pending)
+    loaded = EtsyBuyer.get_existing(session, 1)
+    assert loaded is not pending and loaded.buyer_id == 1
+    assert len(statements) == 1
+    assert EtsyBuyer.get_existing(session, 1) is loaded
+    assert len(statements) == 1
+
+
+def test_natural_key_index_forgets_deleted_rows(session):
+    row = EtsyBuyer.create(buyer(1, 'Ann'))
+    session.add(row)
+    session.flush()
+
+    session.delete(row)
+    session.flush()
+    assert EtsyBuyer.get_existing(session, 1) is None
+
+
+def test_natural_key_index_holds_rows_weakly(session):
+    session.add(EtsyBuyer.create(buyer(1, 'Ann')))
+    session.commit()
+
+    # Committed rows are only weakly referenced by the session, so once the caller drops them the index does too
+    gc.collect()
+    assert (EtsyBuyer, (1,)) not in session.info[NATURAL_KEY_INDEX]
+
+
+def test_natural_key_index_is_cleared_on_rollback(session):
+    session.add(EtsyBuyer.create(buyer(1, 'Ann')))
+    session.flush()
+    session.rollback()
+
+    assert NATURAL_KEY_INDEX not in session.info
+    assert EtsyBuyer.get_existing(session, 1) is None
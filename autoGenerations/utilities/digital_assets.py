@@ -0,0 +1,169 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Tuple, Iterator, List, NamedTuple
+
+import numpy as np
+from PIL import Image
+
+Image.MAX_IMAGE_PIXELS = 1278956970
+
+# Largest file Etsy accepts for a listing image or digital download file
+ETSY_MAX_FILE_BYTES = 20 * 1024 * 1024
+
+
+class EncodeAttempt(NamedTuple):
+    quality: int
+    scale: float
+    size_bytes: int
+    seconds: float
+
+
+class EncodeResult:
+    """
+    Output of encode_jpeg_under_size: the encoded bytes, the quality and scale that produced them and every encode it
+    took to find them
+    """
+
+    def __init__(self, data: bytes, quality: int, scale: float, attempts: List[EncodeAttempt]):
+        self.data = data
+        self.quality = quality
+        self.scale = scale
+        self.attempts = attempts
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def encode_seconds(self) -> float:
+        return sum(attempt.seconds for attempt in self.attempts)
+
+    def __repr__(self):
+        return f'EncodeResult(size_bytes={self.size_bytes}, quality={self.quality}, scale={self.scale:.3f}, ' \
+               f'encodes={len(self.attempts)}, encode_seconds={self.encode_seconds:.2f})'
+
+
+def encode_jpeg_under_size(image: Image.Image, max_bytes: int = ETSY_MAX_FILE_BYTES, max_quality: int = 95,
+                           min_quality: int = 30, min_scale: float = 1.0, scale_step: float = 0.85,
+                           **save_kwargs) -> EncodeResult:
+    """
+    Encodes image as the highest quality JPEG that fits in max_bytes. max_quality is tried first, since most images
+    fit and then need one encode, after that the quality is binary searched. If not even min_quality fits, the image
+    is scaled down by scale_step and searched again, as long as the scale stays above min_scale. Every attempt is
+    encoded to memory, nothing is written to disk
+    Args:
+        image (Image): Image to encode, it is converted to RGB if needed
+        max_bytes (int): Size the encoded JPEG must not exceed
+        max_quality (int): Highest JPEG quality to use
+        min_quality (int): Lowest JPEG quality to accept before scaling down
+        min_scale (float): Smallest scale factor to try. 1.0 never resizes the image
+        scale_step (float): Factor the scale is multiplied by each time the image has to shrink
+        **save_kwargs: Passed on to Image.save, i.e. dpi
+    """
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    attempts = []
+
+    def encode(candidate: Image.Image, quality: int, scale: float) -> bytes:
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        candidate.save(buffer, format='JPEG', quality=quality, **save_kwargs)
+        data = buffer.getvalue()
+        attempts.append(EncodeAttempt(quality, scale, len(data), time.perf_counter() - start))
+        return data
+
+    scale = 1.0
+    candidate = image
+    while True:
+        data = encode(candidate, max_quality, scale)
+        if len(data) <= max_bytes:
+            return EncodeResult(data, max_quality, scale, attempts)
+
+        best = None
+        low, high = min_quality, max_quality - 1
+        while low <= high:
+            quality = (low + high) // 2
+            data = encode(candidate, quality, scale)
+            if len(data) <= max_bytes:
+                best = (quality, data)
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is not None:
+            return EncodeResult(best[1], best[0], scale, attempts)
+
+        if scale * scale_step < min_scale:
+            raise ValueError(f'Could not encode a {image.width}x{image.height} image under {max_bytes} bytes, the '
+                             f'smallest attempt was {min(attempt.size_bytes for attempt in attempts)} bytes')
+        scale *= scale_step
+        candidate = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.LANCZOS)
+
+
+def _render_asset(shm_name: str, shape: Tuple[int, ...], size: Tuple[int, int], output_path: str, dpi: int,
+                  max_bytes: int = None) -> str:
+    """
+    Worker side of render_digital_assets: resizes the decoded source held in shared memory and writes it as a JPEG
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        source = Image.fromarray(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+        image = source.resize(size, Image.LANCZOS)
+        del source
+    finally:
+        shm.close()
+
+    if max_bytes is None:
+        image.save(output_path, dpi=(dpi, dpi))
+    else:
+        # The pixel size is what the customer buys, so only the quality may give. 75 is Pillow's default quality
+        result = encode_jpeg_under_size(image, max_bytes, max_quality=75, dpi=(dpi, dpi))
+        with open(output_path, 'wb') as f:
+            f.write(result.data)
+        print(f'{os.path.basename(output_path)}: {result}')
+    return output_path
+
+
+def render_digital_assets(source_path: str, out_dir: str, sizes: Dict[str, Tuple[int, int]], file_stem: str,
+                          dpi: int = 300, max_workers: int = None,
+                          max_bytes: int = None) -> Iterator[Tuple[str, str]]:
+    """
+    Renders every size of a digital download from one decode of the source image. The decoded pixels are put in shared
+    memory once and each size is resized and written by its own worker process. Sizes are yielded as soon as their
+    file is written, so the caller can upload one while the others are still rendering
+    Args:
+        source_path (str): Image to render the assets from
+        out_dir (str): Directory the JPEGs are written to, as {file_stem}_{size name}.jpg
+        sizes (Dict[str, Tuple[int, int]]): Size name to (width, height) in pixels
+        file_stem (str): Start of the output file names
+        dpi (int): DPI written to the JPEGs
+        max_workers (int): Number of worker processes, defaults to one per size up to the number of cores
+        max_bytes (int): If set, sizes whose JPEG would be larger are encoded at the highest quality that fits
+
+    Returns:
+        (size name, output path) in the order the sizes finish
+    """
+    with Image.open(source_path) as image:
+        # JPEG has no alpha or palette
+        pixels = np.asarray(image if image.mode in ('RGB', 'L') else image.convert('RGB'))
+
+    shm = shared_memory.SharedMemory(create=True, size=pixels.nbytes)
+    try:
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=shm.buf)[:] = pixels
+        shape = pixels.shape
+        del pixels
+
+        max_workers = max_workers if max_workers is not None else min(len(sizes), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_render_asset, shm.name, shape, size,
+                                       os.path.join(out_dir, f'{file_stem}_{name}.jpg'), dpi, max_bytes): name
+                       for name, size in sizes.items()}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    finally:
+        shm.close()
+        shm.unlink()
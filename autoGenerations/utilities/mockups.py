@@ -1,5 +1,13 @@
+from __future__ import annotations
+import io
 import os.path
-from typing import List, Union
+import math
+import hashlib
+import threading
+from collections import OrderedDict, Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import List, Union, Tuple, Dict, Any, Iterator
 
 from PIL import Image
 from tqdm.auto import tqdm
@@ -10,6 +18,9 @@ import numpy as np
 PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
 Image.MAX_IMAGE_PIXELS = 278956970
 
+# Upper bound on the memory held by decoded mockup templates, MOCKUP_TEMPLATE_CACHE_MB in the environment overrides it
+TEMPLATE_CACHE_BYTES = int(os.environ.get('MOCKUP_TEMPLATE_CACHE_MB', 512)) * 1024 * 1024
+
 IMAGE_POSITIONS = {
     'simple_2:3': [
         {
@@ -151,6 +162,69 @@ IMAGE_POSITIONS = {
 }
 
 
+class TemplateCache:
+    """
+    Process wide LRU cache of decoded mockup templates, so a batch of product images decodes each template once. The
+    least recently used templates are dropped once the decoded pixels take more than max_bytes. Callers get a copy
+    they are free to draw on
+
+    Args:
+        max_bytes (int): Memory cap for the decoded templates
+    """
+
+    def __init__(self, max_bytes: int = TEMPLATE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._templates: OrderedDict[str, Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _image_bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, path: str) -> Image.Image:
+        with self._lock:
+            template = self._templates.get(path)
+            if template is not None:
+                self._templates.move_to_end(path)
+                return template.copy()
+
+        template = Image.open(path)
+        template.load()
+        image_bytes = self._image_bytes(template)
+        if image_bytes > self.max_bytes:
+            return template
+
+        with self._lock:
+            if path not in self._templates:
+                self._templates[path] = template
+                self.size_bytes += image_bytes
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._templates.popitem(last=False)
+                self.size_bytes -= self._image_bytes(evicted)
+        return template.copy()
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self.size_bytes = 0
+
+
+template_cache = TemplateCache()
+
+
+def open_template(path: str) -> Image.Image:
+    """
+    Decoded copy of the mockup template at path, served from template_cache
+    """
+    return template_cache.get(path)
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font_path, font_size)
+
+
 def zoom_at(img, x, y, zoom):
     w, h = img.size
     zoom2 = zoom * 2
@@ -159,43 +233,128 @@ def zoom_at(img, x, y, zoom):
     return img.resize((w, h), Image.LANCZOS)
 
 
-def add_watermark(input_image_path, output_image_path, watermark_text):
-    # Open the input image
-    image = Image.open(input_image_path)
-    # Create a transparent layer for the watermark
-    watermark = Image.new("RGBA", image.size, (0, 0, 0, 0))
-    # Choose a font and font size for the watermark
-    font = ImageFont.truetype(os.path.join(PROJECT_DIR, 'data', 'fonts', "Nunito-Italic-VariableFont_wght.ttf"), 30)
-    # Calculate the position to place the watermark (centered)
+WATERMARK_FONT_PATH = os.path.join(PROJECT_DIR, 'data', 'fonts', "Nunito-Italic-VariableFont_wght.ttf")
+WATERMARK_FONT_SIZE = 30
+WATERMARK_FILL = (255, 255, 255, 80)
+WATERMARK_ANGLE = 45
+
+
+@lru_cache(maxsize=1)
+def watermark_ink_table() -> np.ndarray:
+    """
+    The original implementation drew the text onto the same layer again before every paste, and each draw blends the
+    anti-aliased glyph edges further towards WATERMARK_FILL's alpha, so the k-th watermark was bolder than the first.
+    Row k - 1 maps a glyph coverage value to the alpha it has after k draws. Pillow's own blend is used to build the
+    table, so the values match it exactly. Rows stop once another draw no longer changes anything
+    """
+    coverage = Image.fromarray(np.arange(256, dtype=np.uint8).reshape(1, 256), mode='L')
+    layer = Image.new("RGBA", (256, 1), (0, 0, 0, 0))
+    rows = []
+    while True:
+        layer.paste(WATERMARK_FILL, (0, 0), mask=coverage)
+        row = np.array(layer.getchannel('A'))[0]
+        if rows and np.array_equal(row, rows[-1]):
+            break
+        rows.append(row)
+    table = np.stack(rows)
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=16)
+def watermark_tile(watermark_text: str, size: Tuple[int, int], font_path: str = WATERMARK_FONT_PATH,
+                   font_size: int = WATERMARK_FONT_SIZE) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Renders the glyph coverage of watermark_text on a layer of the image's size and rotates it once, exactly like the
+    original implementation rotated its text layer, then crops it to the text. Pillow's nearest neighbour rotation
+    accumulates its sample coordinates across the whole output, so rotating a smaller layer rounds some edge pixels
+    differently; rotating the full layer once per image size keeps every pixel. Since the sampling is nearest
+    neighbour, mapping the coverage through watermark_ink_table afterwards gives the same alpha as rotating the drawn
+    text
+
+    Returns:
+        The rotated coverage of the text and its offset in the rotated full-size layer
+    """
+    font = load_font(font_path, font_size)
+    text_layer = Image.new("L", size, 0)
+    ImageDraw.Draw(text_layer).text((0, 0), watermark_text, font=font, fill=255)
+    rotated = text_layer.rotate(WATERMARK_ANGLE, expand=True)
+
+    left, top, right, bottom = rotated.getbbox()
+    tile = np.array(rotated.crop((left, top, right, bottom)))
+    tile.setflags(write=False)
+    return tile, (left, top)
+
+
+def watermark_stamps(size: Tuple[int, int], watermark_text: str, font_path: str = WATERMARK_FONT_PATH,
+                     font_size: int = WATERMARK_FONT_SIZE) -> Iterator[Tuple[Image.Image, Tuple[int, int]]]:
+    """
+    The grid of rotated watermarks for an image of the given size, in the order the original implementation pasted
+    them. Each is only as big as its text, where the original pasted a rotated layer larger than the image every time
+
+    Returns:
+        (white RGBA stamp, position to paste it at with itself as the mask)
+    """
+    width, height = size
+    coverage, (offset_x, offset_y) = watermark_tile(watermark_text, size, font_path, font_size)
+    ink_table = watermark_ink_table()
+    stamp_height, stamp_width = coverage.shape
+
+    draws = 0
     for x_ratio in np.linspace(0, 1.1, 10):
         for y_ratio in np.linspace(0, 2, 20):
-            x = int(image.width * x_ratio)
-            y = int(image.height * y_ratio)
-            draw = ImageDraw.Draw(watermark)
-            draw.text((0, 0), watermark_text, font=font, fill=(255, 255, 255, 80))
-            rotated_watermark = watermark.rotate(45, expand=True)
-            image.paste(rotated_watermark, (x, y - image.width), mask=rotated_watermark)
+            draws += 1
+            # The original implementation pasted the rotated full-size layer at (x, y - width)
+            x = int(width * x_ratio) + offset_x
+            y = int(height * y_ratio) - width + offset_y
+            if x >= width or y >= height or x + stamp_width <= 0 or y + stamp_height <= 0:
+                continue
+            # Stamps closer together than their size overlap, pasting them one by one compounds the overlap like the
+            # original did
+            stamp = Image.new("RGBA", (stamp_width, stamp_height), WATERMARK_FILL[:3] + (0,))
+            stamp.putalpha(Image.fromarray(ink_table[min(draws, len(ink_table)) - 1][coverage], mode='L'))
+            yield stamp, (x, y)
+
+
+def apply_watermark(image: Image.Image, watermark_text: str, font_path: str = WATERMARK_FONT_PATH,
+                    font_size: int = WATERMARK_FONT_SIZE) -> Image.Image:
+    for stamp, position in watermark_stamps(image.size, watermark_text, font_path, font_size):
+        image.paste(stamp, position, mask=stamp)
+    return image
+
+
+def add_watermark(input_image_path, output_image_path, watermark_text, font_path: str = WATERMARK_FONT_PATH,
+                  font_size: int = WATERMARK_FONT_SIZE):
+    # Open the input image
+    image = Image.open(input_image_path)
+    apply_watermark(image, watermark_text, font_path, font_size)
     # Save the watermarked image
     image.save(output_image_path)
-    
-def add_copyright(input_image_path, copyright_text: str, height_ratio: float  = 0.965):
-    input_image = Image.open(input_image_path)
-    copyright = Image.new("RGBA", input_image.size, (0, 0, 0, 0))
-    font = ImageFont.truetype(os.path.join(PROJECT_DIR, 'data', 'fonts', 'IBMPlexMono-Bold.ttf'), 50)
+
+
+def apply_copyright(image: Image.Image, copyright_text: str, height_ratio: float = 0.965) -> Image.Image:
+    copyright = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    font = load_font(os.path.join(PROJECT_DIR, 'data', 'fonts', 'IBMPlexMono-Bold.ttf'), 50)
     draw = ImageDraw.Draw(copyright)
     draw.text((0, 0), copyright_text, font=font, fill=(0, 0, 0, 255))
     text_width, text_height = draw.textsize(copyright_text, font)
-    input_image.paste(copyright, ((input_image.width - text_width) // 2, int(input_image.height * height_ratio)),
-                      mask=copyright)
+    image.paste(copyright, ((image.width - text_width) // 2, int(image.height * height_ratio)), mask=copyright)
+    return image
+
+
+def add_copyright(input_image_path, copyright_text: str, height_ratio: float  = 0.965):
+    input_image = Image.open(input_image_path)
+    apply_copyright(input_image, copyright_text, height_ratio)
     input_image.save(input_image_path)
 
+
 def add_frame(mockup_info, image_type: str, out_dir: str) -> str:
     # Define the coordinates of the white rectangle
     top_left = mockup_info[image_type]['frame_position']
     frame_dimensions = mockup_info[image_type]['frame_dimensions']
     placeholder_image = mockup_info[image_type]['path']
 
-    image = Image.open(placeholder_image)
+    image = open_template(placeholder_image)
 
     # Create a draw object
     draw = ImageDraw.Draw(image)
@@ -212,21 +371,26 @@ def add_frame(mockup_info, image_type: str, out_dir: str) -> str:
 
     return outpath
 
-def create_mockup(mockup_info, dimension: str, product_image: Image, out_dir: str) -> str:
+
+def render_mockup(mockup_info, dimension: str, product_image: Image) -> Image.Image:
     dim = mockup_info[dimension]['placeholder_dimensions']
     resized_image = product_image.resize(dim, Image.LANCZOS)
 
-    mock_image_path = mockup_info[dimension]['path']
-    mockup_image = Image.open(mock_image_path)
+    mockup_image = open_template(mockup_info[dimension]['path'])
     top_left = (mockup_info[dimension]['position'][0], mockup_info[dimension]['position'][1])
     mockup_image.paste(resized_image, top_left, mask=resized_image)
+    return mockup_image
 
-    outpath = os.path.join(out_dir, os.path.basename(mock_image_path))
+
+def create_mockup(mockup_info, dimension: str, product_image: Image, out_dir: str) -> str:
+    mockup_image = render_mockup(mockup_info, dimension, product_image)
+
+    outpath = os.path.join(out_dir, os.path.basename(mockup_info[dimension]['path']))
     mockup_image.save(outpath)
     return outpath
 
 
-def create_zoomed_image(mockup_info, image_type: str, product_image: Image, out_dir: str) -> str:
+def render_zoomed_image(mockup_info, image_type: str, product_image: Image) -> Image.Image:
     w = product_image.size[0]
     h = product_image.size[1]
     ratios = mockup_info[image_type]['position_ratios']
@@ -235,7 +399,11 @@ def create_zoomed_image(mockup_info, image_type: str, product_image: Image, out_
     nw = 2000 if w < h else int(2000 * (w/h))
     nh = 2000 if h < w else int(2000 * (h/w))
     print(f'resizing to {(nw, nh)}')
-    zoomed_image = zoomed_image.resize((nw, nh))
+    return zoomed_image.resize((nw, nh))
+
+
+def create_zoomed_image(mockup_info, image_type: str, product_image: Image, out_dir: str) -> str:
+    zoomed_image = render_zoomed_image(mockup_info, image_type, product_image)
 
     mock_image_path = mockup_info[image_type]['path']
     outpath = os.path.join(out_dir, os.path.basename(mock_image_path))
@@ -243,40 +411,196 @@ def create_zoomed_image(mockup_info, image_type: str, product_image: Image, out_
     zoomed_image.save(outpath, ppi=(72, 72))
     return outpath
 
+
+class MockupPipeline:
+    """
+    Chains the mockup stages on a single in-memory image and encodes it once at the end, either to a file or to bytes
+    that can go straight to an upload:
+
+        MockupPipeline.mockup(mockup_info, '8x12', product_image).copyright(text).watermark(text).save(outpath)
+
+    Args:
+        image (Image): Image the stages are applied to, it is modified in place
+        filename (str): Name of the encoded image, its extension picks the format
+        save_kwargs (Dict[str, Any]): Extra arguments for Image.save
+    """
+
+    def __init__(self, image: Image.Image, filename: str, save_kwargs: Dict[str, Any] = None):
+        self.image = image
+        self.filename = filename
+        self.save_kwargs = save_kwargs if save_kwargs is not None else {}
+
+    @classmethod
+    def mockup(cls, mockup_info, dimension: str, product_image: Image) -> MockupPipeline:
+        return cls(render_mockup(mockup_info, dimension, product_image),
+                   os.path.basename(mockup_info[dimension]['path']))
+
+    @classmethod
+    def zoomed(cls, mockup_info, image_type: str, product_image: Image) -> MockupPipeline:
+        return cls(render_zoomed_image(mockup_info, image_type, product_image),
+                   os.path.basename(mockup_info[image_type]['path']), {'ppi': (72, 72)})
+
+    @classmethod
+    def variant(cls, product_image: Image, style: str, index: int, image_type: str) -> MockupPipeline:
+        """
+        The full pipeline create_mockup_images runs for one entry of IMAGE_POSITIONS[style]
+        """
+        mockup_info = IMAGE_POSITIONS[style][index]
+        if 'placeholder_dimensions' in mockup_info[image_type]:
+            pipeline = cls.mockup(mockup_info, image_type, product_image)
+            if not (style == 'simple_3:2' and image_type == 'gray_logo'):
+                pipeline.copyright('\u00A9 2023 AutoGenerations')
+        else:
+            pipeline = cls.zoomed(mockup_info, image_type, product_image)
+        return pipeline.watermark('AutoGenerations')
+
+    @property
+    def format(self) -> str:
+        return Image.registered_extensions()[os.path.splitext(self.filename)[1].lower()]
+
+    def copyright(self, copyright_text: str, height_ratio: float = 0.965) -> MockupPipeline:
+        apply_copyright(self.image, copyright_text, height_ratio)
+        return self
+
+    def watermark(self, watermark_text: str, font_path: str = WATERMARK_FONT_PATH,
+                  font_size: int = WATERMARK_FONT_SIZE) -> MockupPipeline:
+        apply_watermark(self.image, watermark_text, font_path, font_size)
+        return self
+
+    def save(self, out_dir: str) -> str:
+        outpath = os.path.join(out_dir, self.filename)
+        self.image.save(outpath, format=self.format, **self.save_kwargs)
+        return outpath
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        self.image.save(buffer, format=self.format, **self.save_kwargs)
+        return buffer.getvalue()
+
+
+def mockup_variants(style: str) -> List[Tuple[int, str]]:
+    """
+    (index into IMAGE_POSITIONS[style], image type) of every image create_mockup_images renders for style, in order
+    """
+    variants = []
+    for index, mockup_info in enumerate(IMAGE_POSITIONS[style]):
+        for image_type, image_info in mockup_info.items():
+            if 'placeholder_dimensions' in image_info or 'zoom' in image_info:
+                variants.append((index, image_type))
+    return variants
+
+
+def _decode_product_image(input_image_path: str, mtime_ns: int = None) -> Image.Image:
+    with Image.open(input_image_path) as image:
+        return image.convert("RGBA")
+
+
+# Set by _init_render_worker in pool workers only, so the variants a worker renders share one decode of their product
+# image. In this process the decoded image is released as soon as the call that needed it returns
+_worker_product_images = None
+
+
+def _init_render_worker():
+    global _worker_product_images
+    _worker_product_images = lru_cache(maxsize=1)(_decode_product_image)
+
+
+def _load_product_image(input_image_path: str) -> Image.Image:
+    if _worker_product_images is None:
+        return _decode_product_image(input_image_path)
+    # The stages never modify the image. Keyed on the modification time too, so a rewritten file is decoded again
+    return _worker_product_images(input_image_path, os.stat(input_image_path).st_mtime_ns)
+
+
+def render_variant(input_image_path: str, style: str, index: int, image_type: str, out_dir: str) -> str:
+    """
+    Renders and saves one mockup variant of a product image. The stages pass the image along in memory and only the
+    finished image is written. Top level so it can run in a worker process, where the decoded product image is shared
+    by the variants the worker renders
+    """
+    product_image = _load_product_image(input_image_path)
+    return MockupPipeline.variant(product_image, style, index, image_type).save(out_dir)
+
+
+def iter_mockup_bytes(input_image_path: str, style: str = 'simple_2:3',
+                      variants: List[Tuple[int, str]] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Renders the mock images of a product image without touching the disk, yielding each one's file name and encoded
+    bytes as soon as it is done so it can be uploaded while the next one renders
+    Args:
+        input_image_path (str): Path to the product image to create mockups for
+        style (str): Key of IMAGE_POSITIONS to render
+        variants (List[Tuple[int, str]]): Variants to render, in order. Defaults to mockup_variants(style)
+    """
+    product_image = _load_product_image(input_image_path)
+    for index, image_type in (variants if variants is not None else mockup_variants(style)):
+        pipeline = MockupPipeline.variant(product_image, style, index, image_type)
+        yield pipeline.filename, pipeline.to_bytes()
+
+
 def create_mockup_images(input_image_path: str, out_dir: str, style: str = 'simple_2:3') -> List[str]:
     """
     Generates mock images for an input product image. Specify the output directory where you would like the files
-    written to. This directory will be made if it does not already exist.
+    written to. This directory will be made if it does not already exist. The variants are rendered in this process from
+    one decode of the product image; a process pool does not pay off for the few variants of one image, so use
+    create_mockup_images_batch to render many images in parallel
     Args:
         input_image_path (str): Path to the product image to create mockups for
         out_dir (str): Path to the directory where the output mock images will be written
+        style (str): Key of IMAGE_POSITIONS to render
     """
     os.makedirs(out_dir, exist_ok=True)
 
-    product_image = Image.open(input_image_path).convert("RGBA")
-
-    mockup_images = IMAGE_POSITIONS[style]
-
-    outpaths = []
-    for mockup_info in tqdm(mockup_images):
-        images = list(mockup_info.keys())
-        for image in tqdm(images):
-            image_info = list(mockup_info[image].keys())
-            # if 'frame_position' in image_info:
-            #     outpath = add_frame(mockup_info, image, out_dir)
+    product_image = _load_product_image(input_image_path)
+    outpaths = [MockupPipeline.variant(product_image, style, index, image_type).save(out_dir)
+                for index, image_type in tqdm(mockup_variants(style))]
 
-            if 'placeholder_dimensions' in image_info:
-                outpath = create_mockup(mockup_info, image, product_image, out_dir)
-                if not (style == 'simple_3:2' and image == 'gray_logo'):
-                    add_copyright(outpath, '\u00A9 2023 AutoGenerations')
+    print(f'Finished writing images to {out_dir}')
+    return outpaths
 
-            elif 'zoom' in image_info:
-                outpath = create_zoomed_image(mockup_info, image, product_image, out_dir)
-            else:
-                continue
 
-            add_watermark(outpath, outpath, 'AutoGenerations')
-            outpaths.append(outpath)
+def create_mockup_images_batch(input_image_paths: List[str], out_dir: str, style: str = 'simple_2:3',
+                               max_workers: int = None) -> Dict[str, List[str]]:
+    """
+    Generates the mock images of many product images across all cores. Every (product image, variant) pair is a
+    separate task, so the pool stays busy even with few variants per image. The mockups of each product image are
+    written to a subdirectory of out_dir named after the image, plus a hash of its path when several images share a
+    file name
+    Args:
+        input_image_paths (List[str]): Paths to the product images to create mockups for
+        out_dir (str): Path to the directory the per image directories are created in
+        style (str): Key of IMAGE_POSITIONS to render
+        max_workers (int): Number of worker processes, None uses every core
 
+    Returns:
+        The output mock image paths of each input image
+    """
+    input_image_paths = list(dict.fromkeys(input_image_paths))
+    stems = [os.path.splitext(os.path.basename(input_image_path))[0] for input_image_path in input_image_paths]
+    stem_counts = Counter(stems)
+
+    image_dirs = {}
+    for input_image_path, stem in zip(input_image_paths, stems):
+        # Images with the same file name in different folders would overwrite each other's mockups, so their
+        # directories also get a hash of the full path
+        if stem_counts[stem] > 1:
+            stem = f'{stem}_{hashlib.sha1(os.path.abspath(input_image_path).encode()).hexdigest()[:8]}'
+        image_dir = os.path.join(out_dir, stem)
+        os.makedirs(image_dir, exist_ok=True)
+        image_dirs[input_image_path] = image_dir
+
+    variants = mockup_variants(style)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker) as executor:
+        # Submitted image by image so a worker tends to get the variants of the image it already decoded
+        futures = {input_image_path: [executor.submit(render_variant, input_image_path, style, index, image_type,
+                                                      image_dirs[input_image_path])
+                                      for index, image_type in variants]
+                   for input_image_path in input_image_paths}
+        for _ in tqdm(as_completed([f for image_futures in futures.values() for f in image_futures]),
+                      total=len(input_image_paths) * len(variants)):
+            pass
+
+    outpaths = {input_image_path: [future.result() for future in image_futures]
+                for input_image_path, image_futures in futures.items()}
     print(f'Finished writing images to {out_dir}')
     return outpaths